@@ -0,0 +1,282 @@
+"""API HTTP/JSON local com os agregados do painel, para outras ferramentas.
+
+Os filtros são os mesmos da barra lateral da segunda_analise.py, passados
+como parâmetros (vários valores separados por vírgula ou repetindo o nome):
+
+    GET  /status_por_ano?sexo=F&ano_letivo_ini=2019,2020
+    GET  /box?x=status&y=coeficiente_rendimento&desc_cor=Parda
+    POST /lote  {"consultas": [{"consulta": "municipios", "filtros": {"sexo": ["F"]}}, ...]}
+
+Consultas: filtros, total, status_por_ano, sexo_por_ano, municipios, box.
+As respostas saem do cubo de contagens e do índice de filtros (montados
+uma vez por versão do CSV) e ficam em cache já serializadas. Cada resposta
+leva um ETag; com If-None-Match igual (ou "etag" no item do lote) a resposta
+é 304 / "nao_modificado".
+
+Uso: python app/api.py --porta 8502
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from cache_figuras import CacheLRU, normalizar_selecao
+from carga import CAMINHO_CSV, ativar_copy_on_write, carregar_particoes, versao_arquivo
+from cubo import CuboContagens
+from filtros import DIMENSOES_FILTRO, IndiceFiltros
+from graficos import estatisticas_box, proporcao_por_ano
+
+ANO_INICIAL = 2014
+LIMITE_MB = float(os.environ.get("PAINEL_CACHE_API_MB", 32))
+
+CONSULTAS = ["filtros", "total", "status_por_ano", "sexo_por_ano", "municipios", "box"]
+EIXOS_BOX = ["status", "sexo", "grupo", "desc_cor", "desc_tipo_escola_origem", "desc_sit_matricula"]
+MEDIDAS_BOX = ["coeficiente_rendimento", "tempo_permanencia"]
+
+
+class ErroConsulta(ValueError):
+    """Filtro ou parâmetro inválido (resposta 400)."""
+
+
+class ConsultaDesconhecida(ErroConsulta):
+    """Nome de consulta que não existe (resposta 404)."""
+
+
+def _registros(df):
+    # to_json cuida de NaN -> null e dos tipos numpy
+    return json.loads(df.to_json(orient="records", force_ascii=False))
+
+
+def _status_por_ano(cubo, selecao):
+    status_ano = cubo.contar(['ano_letivo_ini', 'status'], selecao).reset_index(name='quantidade')
+    total_por_ano = status_ano.groupby('ano_letivo_ini')['quantidade'].transform('sum')
+    status_ano['percentual'] = (status_ano['quantidade'] / total_por_ano * 100).round(1)
+    return _registros(status_ano)
+
+
+def _sexo_por_ano(cubo, selecao):
+    sexo_ano = proporcao_por_ano(cubo.contar(['ano_letivo_ini', 'sexo'], selecao))
+    return _registros(sexo_ano.drop(columns='rotulo'))
+
+
+def _municipios(cubo, selecao):
+    por_ibge = cubo.contagem("cod_ibge", selecao).rename_axis("cod_ibge").reset_index(name="frequencia")
+    por_cidade = cubo.contagem("cidade", selecao).rename_axis("cidade").reset_index(name="frequencia")
+    return {"por_cod_ibge": _registros(por_ibge), "por_cidade": _registros(por_cidade)}
+
+
+class Servico:
+    """Dados preparados + respostas em cache, recarregados quando o CSV muda."""
+
+    def __init__(self, caminho=CAMINHO_CSV):
+        self.caminho = caminho
+        self.respostas = CacheLRU(int(LIMITE_MB * 1024 * 1024))
+        self._trava = threading.Lock()
+        self._estado = None
+        self._atualizar()
+
+    def _atualizar(self):
+        versao = versao_arquivo(self.caminho)
+        if self._estado is not None and self._estado[0] == versao:
+            return self._estado
+        with self._trava:
+            if self._estado is None or self._estado[0] != versao:
+                # Só as partições a partir de ANO_INICIAL são lidas
+                df = carregar_particoes(self.caminho, ano_minimo=ANO_INICIAL)
+                # Trocado de uma vez: as threads em andamento seguem com o estado antigo
+                self._estado = (versao, df, IndiceFiltros(df), CuboContagens(df))
+        return self._estado
+
+    @staticmethod
+    def _selecao(indice, filtros):
+        """{dimensão: [texto]} -> seleção com os valores tipados do índice."""
+        desconhecidos = set(filtros) - set(DIMENSOES_FILTRO)
+        if desconhecidos:
+            raise ErroConsulta(f"filtros desconhecidos: {sorted(desconhecidos)}")
+        selecao = {}
+        for dim in DIMENSOES_FILTRO:
+            por_texto = {str(valor): valor for valor in indice.valores(dim)}
+            textos = [str(valor) for valor in filtros.get(dim, [])]
+            invalidos = [texto for texto in textos if texto not in por_texto]
+            if invalidos:
+                raise ErroConsulta(f"valores inválidos para {dim}: {invalidos}")
+            selecao[dim] = [por_texto[texto] for texto in textos]
+        return selecao
+
+    def _dados(self, consulta, estado, selecao, parametros):
+        _, df, indice, cubo = estado
+        if consulta == "filtros":
+            return {dim: [str(v) for v in indice.valores(dim)] for dim in DIMENSOES_FILTRO}
+        if consulta == "total":
+            return {"matriculas": cubo.total(selecao)}
+        if consulta == "status_por_ano":
+            return _status_por_ano(cubo, selecao)
+        if consulta == "sexo_por_ano":
+            return _sexo_por_ano(cubo, selecao)
+        if consulta == "municipios":
+            return _municipios(cubo, selecao)
+        if consulta == "box":
+            x, y = parametros["x"], parametros["y"]
+            stats, outliers = estatisticas_box(indice.filtrar(df, selecao), x, y)
+            return {
+                "grupos": _registros(stats.rename_axis(x).reset_index()),
+                "outliers": _registros(outliers[[x, y]]),
+            }
+
+    def preparar(self, consulta, filtros=None, parametros=None):
+        """Devolve (etag, gerar), onde gerar() produz o corpo JSON em bytes.
+
+        O ETag depende só da versão dos dados, da consulta e dos parâmetros,
+        então um 304 não precisa calcular nada.
+        """
+        if consulta not in CONSULTAS:
+            raise ConsultaDesconhecida(f"consulta desconhecida: {consulta}; use uma de {CONSULTAS}")
+        if not isinstance(filtros or {}, dict) or not isinstance(parametros or {}, dict):
+            raise ErroConsulta("filtros e parametros devem ser objetos {nome: valores}")
+        parametros = {chave: str(valor) for chave, valor in (parametros or {}).items()}
+        if consulta == "box":
+            parametros = {"x": "status", "y": "coeficiente_rendimento", **parametros}
+            if parametros["x"] not in EIXOS_BOX or parametros["y"] not in MEDIDAS_BOX:
+                raise ErroConsulta(f"box aceita x em {EIXOS_BOX} e y em {MEDIDAS_BOX}")
+        estado = self._atualizar()
+        selecao = self._selecao(estado[2], filtros or {})
+        chave = (estado[0], consulta, normalizar_selecao(selecao), tuple(sorted(parametros.items())))
+        etag = '"' + hashlib.sha1(repr(chave).encode()).hexdigest()[:20] + '"'
+
+        def gerar():
+            return self.respostas.obter(
+                chave,
+                lambda: json.dumps(self._dados(consulta, estado, selecao, parametros), ensure_ascii=False).encode(),
+                tamanho=len
+            )
+        return etag, gerar
+
+    def lote(self, consultas):
+        """Várias consultas numa requisição; itens com "etag" atual voltam sem dados.
+
+        Itens mal formados ou com filtro inválido viram {"erro": ...}; falhas
+        inesperadas não são escondidas e sobem para quem chamou.
+        """
+        partes = []
+        for item in consultas:
+            try:
+                if not isinstance(item, dict) or "consulta" not in item:
+                    raise ErroConsulta('item esperado: {"consulta": ..., "filtros": {...}}')
+                etag, gerar = self.preparar(item["consulta"], item.get("filtros"), item.get("parametros"))
+            except ErroConsulta as erro:
+                partes.append(json.dumps({"erro": str(erro)}, ensure_ascii=False).encode())
+                continue
+            if item.get("etag") == etag:
+                partes.append(json.dumps({"etag": etag, "nao_modificado": True}).encode())
+            else:
+                partes.append(b'{"etag": ' + json.dumps(etag).encode() + b', "dados": ' + gerar() + b'}')
+        return b'{"respostas": [' + b", ".join(partes) + b']}'
+
+
+def _filtros_da_url(parametros_url):
+    """Separa os filtros (vírgula ou repetição = vários valores) dos demais parâmetros."""
+    filtros, parametros = {}, {}
+    for nome, valores in parametros_url.items():
+        if nome in DIMENSOES_FILTRO:
+            filtros[nome] = [v for valor in valores for v in valor.split(",") if v]
+        else:
+            parametros[nome] = valores[-1]
+    return filtros, parametros
+
+
+class Manipulador(BaseHTTPRequestHandler):
+    servico = None
+    protocol_version = "HTTP/1.1"
+
+    def _enviar(self, status, corpo=b"", etag=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(corpo)))
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def _erro(self, status, mensagem):
+        self._enviar(status, json.dumps({"erro": mensagem}, ensure_ascii=False).encode())
+
+    def _erro_interno(self, erro):
+        """Falha inesperada: 500 em JSON para o cliente e o traceback no terminal."""
+        traceback.print_exc(file=sys.stderr)
+        self._erro(500, f"erro interno: {type(erro).__name__}: {erro}")
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        filtros, parametros = _filtros_da_url(parse_qs(url.query))
+        try:
+            etag, gerar = self.servico.preparar(url.path.strip("/"), filtros, parametros)
+            if self.headers.get("If-None-Match") == etag:
+                self._enviar(304, etag=etag)
+            else:
+                self._enviar(200, gerar(), etag=etag)
+        except ConsultaDesconhecida as erro:
+            self._erro(404, str(erro))
+        except ErroConsulta as erro:
+            self._erro(400, str(erro))
+        except ConnectionError:
+            # Cliente desconectou: não há a quem responder
+            raise
+        except Exception as erro:
+            self._erro_interno(erro)
+
+    def do_POST(self):
+        if urlparse(self.path).path.strip("/") != "lote":
+            return self._erro(404, "use POST /lote")
+        try:
+            corpo = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            consultas = corpo["consultas"]
+        except (ValueError, KeyError, TypeError):
+            return self._erro(400, 'corpo esperado: {"consultas": [...]}')
+        if not isinstance(consultas, list):
+            return self._erro(400, 'corpo esperado: {"consultas": [...]}')
+        try:
+            corpo = self.servico.lote(consultas)
+        except Exception as erro:
+            return self._erro_interno(erro)
+        self._enviar(200, corpo)
+
+    def log_message(self, formato, *args):
+        # Sem uma linha por requisição no terminal (atrapalha o teste de carga)
+        pass
+
+
+class Servidor(ThreadingHTTPServer):
+    # A fila padrão (5) recusa conexões sob carga e o cliente só tenta de novo após ~1 s
+    request_queue_size = 128
+
+
+def criar_servidor(porta=8502, host="127.0.0.1", servico=None):
+    """Servidor com uma thread por conexão; porta=0 escolhe uma porta livre.
+
+    Liga o copy-on-write do pandas: as threads compartilham os mesmos dados.
+    """
+    ativar_copy_on_write()
+    manipulador = type("ManipuladorPainel", (Manipulador,), {"servico": servico or Servico()})
+    servidor = Servidor((host, porta), manipulador)
+    servidor.daemon_threads = True
+    return servidor
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API JSON local com os agregados do painel")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8502)
+    args = parser.parse_args()
+
+    servidor = criar_servidor(args.porta, args.host)
+    print(f"API em http://{args.host}:{servidor.server_address[1]}/ (Ctrl+C para sair)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        servidor.server_close()
@@ -0,0 +1,230 @@
+"""Benchmark do pipeline do painel com dados sintéticos.
+
+Gera CSVs com o mesmo layout do export de matrículas (latin-1, separador
+';', "Evento: dd/mm/aaaa", vírgula decimal) em vários tamanhos e mede tempo
+e pico de memória de cada etapa separadamente.
+
+Uso: python app/benchmark.py --linhas 10000 100000 1000000 --saida benchmark.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+import folium
+import numpy as np
+import pandas as pd
+
+from carga import ativar_copy_on_write
+from cubo import CuboContagens
+from filtros import IndiceFiltros
+from graficos import (
+    abandono_por_ano, barras_cor, barras_escola, box_agregado, cursando_por_ano,
+    distribuicao_grupo, distribuicao_idade, distribuicao_sexo, distribuicao_status,
+    proporcao_cor_ano, proporcao_sexo_ano, status_por_ano
+)
+from mapa import CENTRO_CEARA, ZOOM_INICIAL, camada_frequencias, carregar_geojson, mapa_classico
+from municipios import associar_ibge
+from snapshot import CAMINHO_CSV, construir_snapshot_em_blocos, ler_csv
+from transformacoes import calcular_idade, derivar_colunas
+
+TAMANHOS_PADRAO = [10_000, 100_000, 1_000_000, 10_000_000]
+LINHAS_POR_BLOCO = 200_000
+
+
+# -------------------------------------------------------------------------
+# Gerador sintético
+# -------------------------------------------------------------------------
+def _datas(rng, n, inicio, fim):
+    dias = rng.integers(pd.Timestamp(inicio).value // 86_400_000_000_000,
+                        pd.Timestamp(fim).value // 86_400_000_000_000, n)
+    return pd.Series(pd.to_datetime(dias, unit="D").strftime("%d/%m/%Y"))
+
+
+def gerar_sintetico(n_linhas, destino, referencia=CAMINHO_CSV, semente=0):
+    """Grava `n_linhas` linhas sintéticas no layout do CSV de referência.
+
+    Cada coluna é sorteada da distribuição empírica do CSV de referência;
+    datas, último evento e coeficiente são gerados para terem cardinalidade
+    realista em volumes grandes.
+    """
+    rng = np.random.default_rng(semente)
+    base = pd.read_csv(referencia, sep=';', encoding='latin', dtype=str, keep_default_na=False)
+    eventos = base["Ultimo_Evento_Matricula"].str.split(":", n=1).str[0].replace("", "Renovou matrícula")
+    distribuicoes = {col: base[col].value_counts(normalize=True) for col in base.columns}
+
+    with open(destino, "w", encoding="latin-1", newline="") as saida:
+        saida.write(";".join(base.columns) + "\n")
+        for inicio in range(0, n_linhas, LINHAS_POR_BLOCO):
+            n = min(LINHAS_POR_BLOCO, n_linhas - inicio)
+            bloco = {}
+            for col, dist in distribuicoes.items():
+                bloco[col] = rng.choice(dist.index.to_numpy(), size=n, p=dist.to_numpy())
+            bloco["cod_matricula"] = np.arange(inicio, inicio + n) + 1
+            bloco["Dt_Nascimento"] = _datas(rng, n, "1960-01-01", "2008-12-31")
+            bloco["dt_matricula"] = _datas(rng, n, "2010-01-01", "2025-06-30")
+            bloco["Ultimo_Evento_Matricula"] = (
+                pd.Series(rng.choice(eventos.unique(), size=n)) + ": " + _datas(rng, n, "2010-01-01", "2025-06-30")
+            )
+            notas = rng.normal(6.5, 1.8, n).clip(0, 10)
+            bloco["Coeficiente_Rendimento"] = pd.Series(np.char.mod("%.2f", notas)).str.replace(".", ",", regex=False)
+            pd.DataFrame(bloco, columns=base.columns).to_csv(
+                saida, sep=";", header=False, index=False, encoding="latin-1", errors="replace"
+            )
+    return destino
+
+
+# -------------------------------------------------------------------------
+# Medição
+# -------------------------------------------------------------------------
+class Medidor:
+    """Guarda tempo e pico de memória (tracemalloc) de cada etapa.
+
+    O tracemalloc deixa o código Python mais lento; com memoria=False só
+    o tempo é medido.
+    """
+
+    def __init__(self, linhas, memoria=True):
+        self.linhas = linhas
+        self.memoria = memoria
+        self.registros = []
+
+    @contextmanager
+    def etapa(self, nome):
+        if self.memoria:
+            tracemalloc.start()
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            segundos = time.perf_counter() - inicio
+            pico = None
+            if self.memoria:
+                pico = round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 3)
+                tracemalloc.stop()
+            self.registros.append({
+                "linhas": self.linhas,
+                "etapa": nome,
+                "segundos": round(segundos, 6),
+                "pico_mb": pico,
+            })
+            print(f"{self.linhas:>10} {nome:<40} {segundos:9.3f}s {pico if pico is not None else '-':>9} MB")
+
+
+GRAFICOS = {
+    "distribuicao_idade": distribuicao_idade,
+    "distribuicao_sexo": distribuicao_sexo,
+    "proporcao_sexo_ano": proporcao_sexo_ano,
+    "distribuicao_grupo": distribuicao_grupo,
+    "proporcao_cor_ano": proporcao_cor_ano,
+    "barras_cor": barras_cor,
+    "barras_escola": barras_escola,
+    "abandono_por_ano": abandono_por_ano,
+    "cursando_por_ano": cursando_por_ano,
+    "distribuicao_status": distribuicao_status,
+    "status_por_ano": status_por_ano,
+}
+
+CONTAGENS = ["cidade", "grupo", "status", "desc_tipo_escola_origem", "idade"]
+
+
+def medir(caminho_csv, linhas, memoria=True):
+    """Executa cada etapa do painel sobre o CSV e devolve os registros."""
+    medidor = Medidor(linhas, memoria)
+
+    with medidor.etapa("csv_parse"):
+        df = ler_csv(caminho_csv)
+    with medidor.etapa("ingestao_em_blocos"):
+        with tempfile.TemporaryDirectory() as pasta:
+            construir_snapshot_em_blocos(
+                caminho_csv, os.path.join(pasta, "snapshot.feather"),
+                ano_minimo=2014, cubo=CuboContagens()
+            )
+    with medidor.etapa("preparo_colunas"):
+        df = calcular_idade(derivar_colunas(df))
+        df["cod_ibge"] = associar_ibge(df)
+        df = df[df["ano_letivo_ini"] >= 2014].reset_index(drop=True)
+
+    anos = sorted(df["ano_letivo_ini"].dropna().unique())
+    selecao = {"sexo": ["F"], "ano_letivo_ini": anos[-3:], "periodo_letivo_ini": [], "desc_cor": [], "status": []}
+
+    with medidor.etapa("filtro_isin_encadeado"):
+        recorte = df.copy()
+        for dim, valores in selecao.items():
+            if valores:
+                recorte = recorte[recorte[dim].isin(valores)]
+    with medidor.etapa("filtro_indice_construcao"):
+        indice = IndiceFiltros(df)
+    with medidor.etapa("filtro_indice_selecao"):
+        recorte = indice.filtrar(df, selecao)
+
+    for coluna in CONTAGENS:
+        with medidor.etapa(f"value_counts_{coluna}"):
+            recorte[coluna].value_counts()
+    with medidor.etapa("groupby_ano_sexo"):
+        recorte.groupby(["ano_letivo_ini", "sexo"], observed=True).size()
+    with medidor.etapa("cubo_construcao"):
+        cubo = CuboContagens(df)
+    for coluna in CONTAGENS:
+        with medidor.etapa(f"cubo_contagem_{coluna}"):
+            cubo.contagem(coluna, selecao)
+
+    geojson = carregar_geojson(zoom=ZOOM_INICIAL)
+    df_mapa = cubo.contagem("cod_ibge", selecao).rename_axis("cod_ibge").reset_index(name="frequencia")
+    with medidor.etapa("folium_mapa_classico"):
+        mapa_classico(geojson, df_mapa).get_root().render()
+    with medidor.etapa("folium_camada_dinamica"):
+        camada, _ = camada_frequencias(geojson, df_mapa)
+        camada.add_to(folium.Map(CENTRO_CEARA, zoom_start=ZOOM_INICIAL))
+        camada.get_root().render()
+
+    for nome, construtor in GRAFICOS.items():
+        with medidor.etapa(f"plotly_{nome}"):
+            construtor(cubo, selecao).to_json()
+    with medidor.etapa("plotly_box_tempo_status"):
+        box_agregado(recorte, "status", "tempo_permanencia", "Tempo").to_json()
+    return medidor.registros
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark do pipeline do painel")
+    parser.add_argument("--linhas", type=int, nargs="+", default=TAMANHOS_PADRAO)
+    parser.add_argument("--saida", default="benchmark.json", help="arquivo JSON com os resultados")
+    parser.add_argument("--pasta", default=None, help="onde guardar os CSVs sintéticos (padrão: temporária)")
+    parser.add_argument("--sem-memoria", action="store_true", help="não usa tracemalloc (tempos mais fiéis)")
+    args = parser.parse_args()
+
+    # Mesma semântica do pandas que os painéis usam
+    ativar_copy_on_write()
+    pasta = args.pasta or tempfile.mkdtemp(prefix="bench_matriculas_")
+    resultados = []
+    for linhas in args.linhas:
+        caminho = os.path.join(pasta, f"matriculas_{linhas}.csv")
+        if not os.path.exists(caminho):
+            gerar_sintetico(linhas, caminho)
+        resultados.extend(medir(caminho, linhas, memoria=not args.sem_memoria))
+
+    with open(args.saida, "w", encoding="utf-8") as f:
+        json.dump({
+            "data": datetime.now().isoformat(timespec="seconds"),
+            "commit": _commit(),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "resultados": resultados,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"Resultados gravados em {args.saida}")
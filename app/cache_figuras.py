@@ -0,0 +1,77 @@
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+# Orçamento de memória do cache, em MB (variável de ambiente opcional)
+LIMITE_MB = float(os.environ.get("PAINEL_CACHE_FIGURAS_MB", 64))
+
+
+def normalizar_selecao(selecao):
+    """Seleção de filtros em forma canônica e hashable: a ordem dos valores
+    escolhidos e os filtros vazios não mudam a chave."""
+    return tuple(
+        (dim, tuple(sorted(str(v) for v in valores)))
+        for dim, valores in sorted(selecao.items())
+        if len(valores)
+    )
+
+
+class CacheLRU:
+    """Cache LRU limitado pelo tamanho (em bytes) dos valores guardados.
+
+    Compartilhado entre as sessões do processo; as figuras ficam guardadas
+    já serializadas em JSON.
+    """
+
+    def __init__(self, limite_bytes):
+        self.limite_bytes = limite_bytes
+        self.bytes = 0
+        self.acertos = 0
+        self.faltas = 0
+        self._itens = OrderedDict()
+        self._trava = threading.Lock()
+
+    def obter(self, chave, construtor, tamanho=sys.getsizeof):
+        with self._trava:
+            if chave in self._itens:
+                self._itens.move_to_end(chave)
+                self.acertos += 1
+                return self._itens[chave][0]
+            self.faltas += 1
+
+        valor = construtor()
+        tam = tamanho(valor)
+        with self._trava:
+            if chave not in self._itens and tam <= self.limite_bytes:
+                self._itens[chave] = (valor, tam)
+                self.bytes += tam
+                # Descarta os menos usados até caber no orçamento
+                while self.bytes > self.limite_bytes:
+                    _, (_, tam_antigo) = self._itens.popitem(last=False)
+                    self.bytes -= tam_antigo
+        return valor
+
+    def spec(self, chave, construtor):
+        """JSON da figura plotly (o que vai para o navegador)."""
+        return self.obter(chave, lambda: construtor().to_json(), tamanho=len)
+
+    def valor(self, chave, construtor):
+        """Valores pequenos (KPIs) guardados no mesmo orçamento."""
+        return self.obter(chave, construtor, tamanho=lambda v: len(json.dumps(v, default=str)))
+
+    def estatisticas(self):
+        total = self.acertos + self.faltas
+        return {
+            "acertos": self.acertos,
+            "faltas": self.faltas,
+            "taxa_acerto": self.acertos / total if total else 0.0,
+            "itens": len(self._itens),
+            "bytes": self.bytes,
+            "limite_bytes": self.limite_bytes,
+        }
+
+
+# Instância única por processo
+cache_figuras = CacheLRU(int(LIMITE_MB * 1024 * 1024))
@@ -0,0 +1,169 @@
+import os
+
+import pandas as pd
+
+from compactacao import compactar
+from incremental import atualizar_snapshot
+from particoes import CHAVES, caminho_particoes, garantir_particoes, ler_particao, podar
+from snapshot import CAMINHO_CSV, carregar_snapshot, snapshot_atualizado
+from transformacoes import calcular_idade
+
+# Cache por processo: o Streamlit reexecuta o script a cada clique, mas os
+# módulos importados continuam vivos, então o DataFrame preparado fica aqui.
+# Ele é compartilhado por todas as sessões: cada chamada recebe uma visão
+# rasa (sem cópia dos dados) e, com copy-on-write, qualquer escrita numa
+# visão copia só a coluna alterada, sem tocar no DataFrame em cache.
+_cache = {}
+_estatisticas = {"acertos": 0, "faltas": 0}
+
+# (versão antiga, versão nova) -> (linhas que saíram, linhas que entraram),
+# para que estruturas derivadas sejam corrigidas em vez de reconstruídas
+_deltas = {}
+
+# Caminho do CSV -> última versão lida em partições (origem do próximo delta)
+_versoes_particoes = {}
+
+
+def ativar_copy_on_write():
+    """Liga o copy-on-write do pandas no processo.
+
+    As visões rasas devolvidas por este módulo só são seguras com ele: sem
+    copy-on-write, uma escrita no lugar (df.loc[...] = ...) numa visão altera
+    o DataFrame em cache visto pelas outras sessões. Como a opção muda a
+    semântica do pandas para todo o processo, ela não é ligada na importação;
+    quem chama são os pontos de entrada que compartilham o cache (os dois
+    painéis, a API, os relatórios e o benchmark).
+    """
+    pd.set_option("mode.copy_on_write", True)
+
+
+def versao_arquivo(caminho):
+    """Identifica a versão do arquivo por caminho absoluto, mtime e tamanho."""
+    info = os.stat(caminho)
+    return (os.path.abspath(caminho), info.st_mtime_ns, info.st_size)
+
+
+def carregar_dados(caminho=CAMINHO_CSV):
+    """Carrega as matrículas preparadas, reaproveitando o resultado enquanto
+    o arquivo não mudar (mesmo caminho, mtime e tamanho).
+
+    Os dados vêm do snapshot colunar; quando o CSV é mais novo, o snapshot
+    é atualizado só com as matrículas que mudaram (ou reconstruído, se não
+    der). Só a idade é calculada na carga, pois depende da data atual; o
+    resultado passa pela compactação de tipos (compactacao.py).
+    """
+    versao = versao_arquivo(caminho)
+    if versao in _cache:
+        _estatisticas["acertos"] += 1
+        return visao(_cache[versao])
+
+    _estatisticas["faltas"] += 1
+    delta = None if snapshot_atualizado(caminho) else atualizar_snapshot(caminho)
+    df = compactar(calcular_idade(carregar_snapshot(caminho)))
+
+    # Descarta versões antigas do mesmo arquivo para não acumular memória
+    for chave in [k for k in _cache if k[0] == versao[0]]:
+        antigo = _cache.pop(chave)
+        if delta is not None:
+            # As linhas que saem levam a idade com que entraram nos agregados
+            removidas = antigo[antigo["cod_matricula"].isin(delta.chaves_removidas)]
+            _deltas.clear()
+            _deltas[(chave, versao)] = (removidas, calcular_idade(delta.inseridas))
+    _cache[versao] = df
+    return visao(df)
+
+
+def carregar_particoes(caminho=CAMINHO_CSV, ano_minimo=None, selecao=None, matrizes=None):
+    """Como carregar_dados, mas lê só as partições que o recorte pode conter
+    (piso de ano, anos/semestres da seleção e cursos; ver particoes.podar).
+
+    Cada partição é mapeada na primeira vez que alguém a pede e fica em cache
+    por versão; as que nenhum recorte pediu nunca são lidas. Numa atualização
+    incremental do CSV, as linhas removidas que estavam em partições já
+    carregadas viram o delta das estruturas derivadas (a idade delas é
+    recalculada, já que as partições guardam os dados sem idade).
+    """
+    versao = versao_arquivo(caminho)
+    delta = None if snapshot_atualizado(caminho) else atualizar_snapshot(caminho)
+    pasta = caminho_particoes(caminho)
+    estatisticas = garantir_particoes(caminho, pasta)
+
+    anterior = _versoes_particoes.get(versao[0])
+    if delta is not None and anterior is not None:
+        carregadas = [
+            valor for chave, valor in _cache.items()
+            if isinstance(chave[0], tuple) and chave[0][:2] == ("particao", versao[0])
+        ]
+        removidas = [parte[parte["cod_matricula"].isin(delta.chaves_removidas)] for parte in carregadas]
+        removidas = pd.concat(removidas, ignore_index=True) if removidas else delta.inseridas.iloc[:0]
+        _deltas.clear()
+        _deltas[(anterior, versao)] = (calcular_idade(removidas), calcular_idade(delta.inseridas))
+    _versoes_particoes[versao[0]] = versao
+
+    escolhidas = podar(estatisticas["particoes"], ano_minimo, selecao, matrizes)
+    arquivos = [(tuple(p[col] for col in CHAVES), p["arquivo"]) for p in escolhidas]
+    partes = []
+    for chave, arquivo in arquivos or [("vazio", estatisticas["vazio"])]:
+        arquivo = os.path.join(pasta, arquivo)
+        # O nome não inclui a geração: a partição regravada substitui a antiga no cache
+        partes.append(em_cache(
+            ("particao", versao[0], chave), versao_arquivo(arquivo), lambda arquivo=arquivo: ler_particao(arquivo)
+        ))
+    df = concatenar_particoes(partes) if len(partes) > 1 else partes[0]
+    return compactar(calcular_idade(df))
+
+
+def concatenar_particoes(partes):
+    """pd.concat das partições mantendo as colunas category.
+
+    Partições de gerações diferentes (ver particoes.py) podem ter categorias
+    diferentes, e o pd.concat transformaria a coluna em object; antes, cada
+    uma passa a usar a união das categorias, na ordem em que aparecem.
+    """
+    for col in partes[0].columns:
+        if not isinstance(partes[0][col].dtype, pd.CategoricalDtype):
+            continue
+        categorias = [parte[col].cat.categories for parte in partes]
+        if all(c.equals(categorias[0]) for c in categorias[1:]):
+            continue
+        uniao = categorias[0].append(categorias[1:]).unique()
+        partes = [parte.assign(**{col: parte[col].cat.set_categories(uniao)}) for parte in partes]
+    return pd.concat(partes, ignore_index=True)
+
+
+def em_cache(nome, versao, construtor, atualizar=None):
+    """Guarda estruturas derivadas dos dados (recortes, índices, agregados)
+    por versão do arquivo, reconstruindo só quando a versão muda.
+
+    Com `atualizar(valor_antigo, removidas, inseridas)`, uma versão nova que
+    veio de atualização incremental corrige o valor antigo em vez de
+    chamar o construtor.
+    """
+    chave = (nome, versao)
+    if chave in _cache:
+        _estatisticas["acertos"] += 1
+        return visao(_cache[chave])
+
+    _estatisticas["faltas"] += 1
+    antigas = [k for k in _cache if k[0] == nome]
+    com_delta = [k for k in antigas if (k[1], versao) in _deltas]
+    if atualizar is not None and com_delta:
+        valor = atualizar(_cache[com_delta[0]], *_deltas[(com_delta[0][1], versao)])
+    else:
+        valor = construtor()
+    for antiga in antigas:
+        del _cache[antiga]
+    _cache[chave] = valor
+    return visao(valor)
+
+
+def visao(valor):
+    """DataFrames em cache são entregues como visões rasas (ver ativar_copy_on_write)."""
+    if isinstance(valor, pd.DataFrame):
+        return valor.copy(deep=False)
+    return valor
+
+
+def estatisticas_cache():
+    """Retorna acertos, faltas e quantas entradas estão em memória."""
+    return {**_estatisticas, "entradas": len(_cache)}
@@ -0,0 +1,137 @@
+"""Representação compacta do DataFrame de matrículas.
+
+O esquema abaixo diz o que fazer com cada coluna usada pelos painéis;
+colunas fora dele são descartadas. Texto de baixa cardinalidade vira
+category, anos/semestres/códigos vão para o menor inteiro que comporta os
+valores e as durações ficam em float32.
+
+Uso: python app/compactacao.py [--csv Data/matriculasFinal-phase2.csv]
+(imprime o relatório de memória por coluna antes/depois)
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+INTEIRO = "inteiro"      # menor inteiro que comporta os valores
+CATEGORIA = "category"
+MANTER = None            # mantém o tipo atual
+
+TIPOS_COLUNAS = {
+    # Identificadores e códigos
+    "cod_matricula": INTEIRO,
+    "matriz_estrutura_curso": INTEIRO,
+    "cod_cidade": INTEIRO,
+    "cod_ibge": INTEIRO,
+    "hash_linha": MANTER,
+    # Anos, semestres e idade
+    "ano_letivo_ini": INTEIRO,
+    "periodo_letivo_ini": INTEIRO,
+    "ano_let_atual": INTEIRO,
+    "idade": INTEIRO,
+    # Texto de baixa cardinalidade
+    "sexo": CATEGORIA,
+    "desc_cor": CATEGORIA,
+    "grupo": CATEGORIA,
+    "status": CATEGORIA,
+    "cidade": CATEGORIA,
+    "texto_cidade": CATEGORIA,
+    "desc_tipo_escola_origem": CATEGORIA,
+    "desc_sit_matricula": CATEGORIA,
+    "situacao_ultimo_periodo_letivo": CATEGORIA,
+    "ultimo_evento_matricula": CATEGORIA,
+    # Medidas
+    "coeficiente_rendimento": "float32",
+    "tempo_permanencia": "float32",
+    "tempo_permanencia_meses": "float32",
+    # Datas
+    "dt_nascimento": MANTER,
+    "dt_matricula": MANTER,
+    "dt_ultimo_evento": MANTER,
+}
+
+COLUNAS_CATEGORICAS = [col for col, tipo in TIPOS_COLUNAS.items() if tipo == CATEGORIA]
+
+
+def menor_inteiro(serie):
+    """Converte para o menor tipo inteiro que comporta os valores.
+
+    Colunas float com vazios continuam como estão: o Int nullable
+    propagaria NA em comparações como df["ano_letivo_ini"] >= 2014.
+    Colunas que já são Int nullable (p.ex. cod_ibge) só diminuem de largura.
+    Se o tipo já é o menor, a própria série é devolvida (sem cópia).
+    """
+    if not pd.api.types.is_numeric_dtype(serie):
+        return serie
+    if isinstance(serie.dtype, pd.api.extensions.ExtensionDtype):
+        valores = serie.dropna()
+        if not len(valores):
+            return serie
+        tipo = pd.to_numeric(valores.to_numpy(dtype="int64"), downcast="integer").dtype.name.capitalize()
+        return serie if serie.dtype == tipo else serie.astype(tipo)
+    if serie.hasnans:
+        return serie
+    menor = pd.to_numeric(serie, downcast="integer")
+    return serie if menor.dtype == serie.dtype else menor
+
+
+def compactar(df, tipos=TIPOS_COLUNAS, inteiros=True):
+    """Aplica o esquema: descarta colunas fora dele e converte os tipos.
+
+    Com inteiros=False a largura dos inteiros não é alterada (útil quando
+    vários blocos precisam ter o mesmo tipo por coluna). Colunas que já estão
+    no tipo certo não são copiadas, então um snapshot já compacto continua
+    apontando para o arquivo mapeado em memória.
+    """
+    df = df.drop(columns=[col for col in df.columns if col not in tipos])
+    for col, tipo in tipos.items():
+        if col not in df.columns or tipo is MANTER:
+            continue
+        if tipo == INTEIRO:
+            if inteiros:
+                df[col] = menor_inteiro(df[col])
+        elif tipo == CATEGORIA:
+            if not isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype(CATEGORIA)
+        elif df[col].dtype != tipo:
+            df[col] = df[col].astype(tipo)
+    return df
+
+
+def relatorio_memoria(antes, depois):
+    """Memória (MB, deep) e tipo de cada coluna antes e depois da compactação."""
+    mb = 1024 * 1024
+    relatorio = pd.DataFrame({
+        "tipo_antes": antes.dtypes.astype(str),
+        "tipo_depois": depois.dtypes.astype(str),
+        "antes_mb": antes.memory_usage(deep=True, index=False) / mb,
+        "depois_mb": depois.memory_usage(deep=True, index=False) / mb,
+    })
+    relatorio["tipo_antes"] = relatorio["tipo_antes"].fillna("(derivada)")
+    relatorio["tipo_depois"] = relatorio["tipo_depois"].fillna("(descartada)")
+    relatorio[["antes_mb", "depois_mb"]] = relatorio[["antes_mb", "depois_mb"]].fillna(0)
+    relatorio = relatorio.sort_values("antes_mb", ascending=False)
+
+    total = relatorio[["antes_mb", "depois_mb"]].sum()
+    relatorio.loc["TOTAL"] = ["", "", total["antes_mb"], total["depois_mb"]]
+    relatorio["reducao"] = (relatorio["antes_mb"] / relatorio["depois_mb"]).replace(np.inf, np.nan).round(1)
+    return relatorio.round({"antes_mb": 3, "depois_mb": 3})
+
+
+if __name__ == "__main__":
+    # Importados aqui porque o snapshot importa este módulo
+    from snapshot import CAMINHO_CSV
+    from transformacoes import preparar, snake_case
+
+    parser = argparse.ArgumentParser(description="Relatório de memória por coluna antes/depois da compactação")
+    parser.add_argument("--csv", default=CAMINHO_CSV, help="CSV exportado pelo sistema acadêmico")
+    args = parser.parse_args()
+
+    # "Antes" é a carga original dos painéis: todas as colunas do CSV + derivadas
+    antes = pd.read_csv(args.csv, sep=';', encoding='latin')
+    antes.columns = [snake_case(col) for col in antes.columns]
+    antes = preparar(antes)
+    depois = compactar(antes.copy())
+
+    pd.set_option("display.width", 200)
+    print(relatorio_memoria(antes, depois).to_string())
@@ -0,0 +1,109 @@
+import pandas as pd
+
+from filtros import DIMENSOES_FILTRO
+
+# Dimensões dos gráficos que não são filtros da barra lateral
+DIMENSOES_GRAFICO = ["cidade", "cod_ibge", "grupo", "idade", "desc_tipo_escola_origem", "desc_sit_matricula"]
+
+
+def contar_linhas(df, dimensoes):
+    """Contagem de linhas por combinação (inclusive nulos) das dimensões."""
+    return (
+        df.groupby(dimensoes, observed=True, dropna=False)
+        .size()
+        .rename("quantidade")
+        .reset_index()
+    )
+
+
+def somar_contagens(partes, dimensoes):
+    """Junta várias tabelas de contagem das mesmas dimensões somando as células."""
+    return (
+        pd.concat(partes, ignore_index=True)
+        .groupby(dimensoes, observed=True, dropna=False)["quantidade"]
+        .sum()
+        .reset_index()
+    )
+
+
+class CuboContagens:
+    """Contagens pré-agregadas das dimensões de filtro x dimensões de gráfico.
+
+    Em vez de um cubo único (o cruzamento de tudo chegaria perto do número
+    de linhas), guarda um corte por dimensão de gráfico: filtros + dimensão.
+    Qualquer gráfico de contagem com qualquer combinação de filtros é
+    respondido somando células desses cortes.
+
+    Com df=None o cubo começa vazio e é preenchido bloco a bloco com
+    acumular(), como na ingestão em blocos do snapshot.
+    """
+
+    def __init__(self, df=None, filtros=DIMENSOES_FILTRO, graficos=DIMENSOES_GRAFICO):
+        self.filtros = list(filtros)
+        self.cortes = {}
+        for dim in [None] + list(graficos):
+            dimensoes = self._dimensoes_corte(dim)
+            if df is None:
+                self.cortes[dim] = pd.DataFrame(columns=dimensoes + ["quantidade"])
+            else:
+                self.cortes[dim] = contar_linhas(df, dimensoes)
+
+    def _dimensoes_corte(self, dim):
+        return self.filtros + ([] if dim is None else [dim])
+
+    def acumular(self, df):
+        """Soma as contagens de mais um bloco de linhas a todos os cortes."""
+        for dim, corte in self.cortes.items():
+            dimensoes = self._dimensoes_corte(dim)
+            novas = contar_linhas(df, dimensoes)
+            self.cortes[dim] = novas if corte.empty else somar_contagens([corte, novas], dimensoes)
+
+    def aplicar_delta(self, removidas, inseridas):
+        """Atualiza os cortes com as linhas que saíram e as que entraram.
+
+        Usado na atualização incremental: custa proporcional ao número de
+        linhas alteradas, não ao tamanho da base.
+        """
+        for dim, corte in self.cortes.items():
+            dimensoes = self._dimensoes_corte(dim)
+            saida = contar_linhas(removidas, dimensoes)
+            saida["quantidade"] *= -1
+            soma = somar_contagens([corte, saida, contar_linhas(inseridas, dimensoes)], dimensoes)
+            self.cortes[dim] = soma[soma["quantidade"] != 0].reset_index(drop=True)
+        return self
+
+    def _corte(self, dimensoes):
+        extras = [dim for dim in dimensoes if dim not in self.filtros]
+        if len(set(extras)) > 1:
+            raise ValueError(f"O cubo não cruza as dimensões {extras} entre si")
+        return self.cortes[extras[0] if extras else None]
+
+    @staticmethod
+    def _mascara(corte, condicoes):
+        mascara = pd.Series(True, index=corte.index)
+        for dim, valores in condicoes:
+            if len(valores):
+                mascara &= corte[dim].isin(valores)
+        return mascara
+
+    def contar(self, dimensoes, selecao, onde=None):
+        """Soma das células por `dimensoes`, como um groupby(...).size().
+
+        `selecao` segue o formato do IndiceFiltros ({dimensão: valores});
+        `onde` aplica condições extras, p.ex. {"desc_sit_matricula": ["Abandono"]}.
+        """
+        onde = onde or {}
+        corte = self._corte(list(dimensoes) + list(onde))
+        mascara = self._mascara(corte, list(selecao.items()) + list(onde.items()))
+        contagens = corte[mascara].groupby(list(dimensoes), observed=True)["quantidade"].sum()
+        return contagens[contagens > 0]
+
+    def contagem(self, dim, selecao, onde=None):
+        """Equivalente a value_counts() de uma coluna no recorte filtrado."""
+        contagens = self.contar([dim], selecao, onde)
+        return contagens.sort_values(ascending=False, kind="stable").rename("count")
+
+    def total(self, selecao):
+        """Quantidade de matrículas no recorte filtrado."""
+        corte = self.cortes[None]
+        return int(corte.loc[self._mascara(corte, selecao.items()), "quantidade"].sum())
@@ -0,0 +1,87 @@
+"""Conversão das colunas de data do CSV com formato explícito.
+
+Cada coluna declara seus formatos (dd/mm/aaaa, ou com hora em dt_cadastro),
+testados em ordem. O texto é convertido uma vez por valor distinto e o
+resultado é espalhado pelas linhas: datas de matrícula e de evento se
+repetem muito, então o custo fica perto do número de valores distintos.
+Valores não vazios que nenhum formato aceita viram NaT e são contados.
+
+Uso: python app/datas.py [--csv Data/matriculasFinal-phase2.csv]
+(imprime, por coluna, valores distintos, falhas e o tempo da conversão)
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+DATA = "%d/%m/%Y"
+DATA_HORA = "%d/%m/%Y %H:%M:%S"
+
+# Colunas já em snake_case. dt_ultimo_evento é o sufixo de
+# "Evento: dd/mm/aaaa" (ver transformacoes.separar_evento).
+FORMATOS_DATAS = {
+    "dt_nascimento": (DATA,),
+    "dt_nascimento_1": (DATA,),
+    "dt_matricula": (DATA, DATA_HORA),
+    "dt_rematricula": (DATA, DATA_HORA),
+    "dt_cadastro": (DATA_HORA, DATA),
+    "dt_ultimo_evento": (DATA,),
+    "ultima_aula_presente": (DATA,),
+    "data_titulo_ele": (DATA,),
+}
+
+
+def converter_datas(serie, formatos=(DATA,)):
+    """Converte texto em datetime64; devolve (datas, linhas que falharam).
+
+    Vazios e nulos viram NaT sem contar como falha.
+    """
+    codigos, distintos = pd.factorize(serie)
+    texto = pd.Series(distintos, dtype=object).str.strip()
+    datas = pd.Series(pd.NaT, index=texto.index, dtype="datetime64[ns]")
+    for formato in formatos:
+        faltam = datas.isna() & texto.ne("")
+        if not faltam.any():
+            break
+        datas[faltam] = pd.to_datetime(texto[faltam], format=formato, errors="coerce")
+
+    # factorize marca nulos com -1, que aponta para a última posição (NaT)
+    tabela = np.append(datas.to_numpy(), np.datetime64("NaT", "ns"))
+    falhou = np.append((datas.isna() & texto.ne("")).to_numpy(), False)
+    resultado = pd.Series(tabela[codigos], index=serie.index, name=serie.name)
+    return resultado, int(falhou[codigos].sum())
+
+
+def decodificar_datas(df, formatos=FORMATOS_DATAS):
+    """Converte as colunas de data presentes em `df`; devolve {coluna: falhas}."""
+    falhas = {}
+    for col, formatos_col in formatos.items():
+        if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col], falhas[col] = converter_datas(df[col], formatos_col)
+    return falhas
+
+
+if __name__ == "__main__":
+    # Importados aqui porque o snapshot importa transformacoes, que importa este módulo
+    from snapshot import CAMINHO_CSV
+    from transformacoes import separar_evento, snake_case
+
+    parser = argparse.ArgumentParser(description="Conversão das colunas de data: distintos, falhas e tempo")
+    parser.add_argument("--csv", default=CAMINHO_CSV, help="CSV exportado pelo sistema acadêmico")
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.csv, sep=';', encoding='latin', dtype=str)
+    df.columns = [snake_case(col) for col in df.columns]
+    df["dt_ultimo_evento"] = separar_evento(df["ultimo_evento_matricula"])[1]
+
+    linhas = []
+    for col, formatos_col in FORMATOS_DATAS.items():
+        if col not in df.columns:
+            continue
+        inicio = time.perf_counter()
+        _, falhas = converter_datas(df[col], formatos_col)
+        ms = (time.perf_counter() - inicio) * 1000
+        linhas.append({"coluna": col, "linhas": len(df), "distintos": df[col].nunique(),
+                       "falhas": falhas, "ms": round(ms, 2)})
+    print(pd.DataFrame(linhas).to_string(index=False))
@@ -0,0 +1,272 @@
+"""Contrato do CSV exportado pelo sistema acadêmico.
+
+Para cada coluna do export (com o nome original): o tipo, se aceita vazio e,
+quando faz sentido, os valores permitidos. O esquema é aplicado na leitura
+(ver snapshot.ler_csv):
+
+- DECIMAL: float64 lido direto pelo parser, com vírgula decimal ("8,97");
+- INTEIRO: códigos e anos, que o export grava como "168.0", lidos pelo
+  parser direto como Int64 (nullable). As obrigatórias viram int64 depois;
+- TEXTO e DATA: texto (as datas são convertidas depois, em datas.py).
+
+Um valor que não é inteiro faz o parser desistir da leitura. Nesse caso
+ler_csv refaz a leitura com as colunas INTEIRO como texto: os valores
+inválidos viram NA e são contados por coluna em df.attrs["falhas_inteiros"].
+validar() confere o contrato lendo tudo como texto e aponta essas linhas.
+
+Uso: python app/esquema.py [--csv Data/matriculasFinal-phase2.csv]
+"""
+import argparse
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from datas import FORMATOS_DATAS, converter_datas
+from transformacoes import snake_case
+
+INTEIRO = "inteiro"
+DECIMAL = "decimal"
+TEXTO = "texto"
+DATA = "data"
+
+SEPARADOR = ";"
+CODIFICACAO = "latin"
+SEPARADOR_DECIMAL = ","
+
+
+class Coluna(NamedTuple):
+    tipo: str
+    nulo: bool = True       # aceita vazio
+    valores: tuple = None   # valores permitidos (None = qualquer um)
+
+
+SEXOS = ("M", "F")
+CORES = (
+    "Amarela", "Branca", "Indígena", "Parda", "Preta",
+    "Não dispõe da informação", "Não quis declarar cor/raça",
+)
+SITUACOES_MATRICULA = (
+    "Abandono", "Cancelado Compulsoriamente", "Cancelado Voluntariamente", "Concludente",
+    "Estagiario (Concludente)", "Formado", "Matriculado", "Trancado",
+    "Transferido Externo", "Transferido Interno",
+)
+TIPOS_ESCOLA = (
+    "Filantrópica", "Outros", "Privada", "Pública Estadual", "Pública Federal", "Pública Municipal",
+)
+
+ESQUEMA_CSV = {
+    "Cod_Pessoa": Coluna(INTEIRO, nulo=False),
+    "cod_matricula": Coluna(INTEIRO, nulo=False),
+    "__Dt_Conclusao_Ensino_Medio": Coluna(INTEIRO),
+    "Matriz_Estrutura_Curso": Coluna(INTEIRO, nulo=False),
+    "ano_letivo_ini": Coluna(INTEIRO, nulo=False),
+    "Periodo_letivo_ini": Coluna(INTEIRO, nulo=False, valores=(1, 2)),
+    "Sit_Matricula": Coluna(INTEIRO, nulo=False),
+    "Ano_Let_Atual": Coluna(INTEIRO, nulo=False),
+    "Periodo_Let_Atual": Coluna(INTEIRO, nulo=False),
+    "Periodo_Atual": Coluna(INTEIRO, nulo=False),
+    "Dt_Nascimento": Coluna(DATA, nulo=False),
+    "Cod_Aluno": Coluna(INTEIRO, nulo=False),
+    "Tipo_escola_Origem": Coluna(TEXTO),
+    "sexo": Coluna(TEXTO, nulo=False, valores=SEXOS),
+    "Cod_cidade": Coluna(INTEIRO),
+    "Texto_cidade": Coluna(TEXTO),
+    "Desc_Forma_Ingresso_Matricula": Coluna(TEXTO, nulo=False),
+    "Ano_Conclusao_2_Grau": Coluna(INTEIRO),
+    "Cod_Escola_2_Grau": Coluna(INTEIRO),
+    "Cod_Grau_Instrucao_Mae": Coluna(TEXTO),
+    "Pai_Falecido": Coluna(INTEIRO, valores=(0, 1)),
+    "Mae_Falecida": Coluna(INTEIRO, valores=(0, 1)),
+    "Tipo_Escola_Origem_1": Coluna(TEXTO),
+    "Desc_Cor": Coluna(TEXTO, nulo=False, valores=CORES),
+    "Cod_Pessoa_1": Coluna(INTEIRO, nulo=False),
+    "Cod_Grau_Instrucao": Coluna(TEXTO),
+    "Cod_Nacionalidade": Coluna(TEXTO, nulo=False),
+    "Cod_Estado_Civil": Coluna(TEXTO),
+    "Cod_Cidade_1": Coluna(INTEIRO),
+    "Sexo_1": Coluna(TEXTO, nulo=False, valores=SEXOS),
+    "Dt_Nascimento_1": Coluna(DATA, nulo=False),
+    "Cod_Naturalidade": Coluna(INTEIRO),
+    "Estado_Titulo_Ele": Coluna(TEXTO),
+    "Data_Titulo_Ele": Coluna(DATA),
+    "Dt_Cadastro": Coluna(DATA, nulo=False),
+    "Coeficiente_Rendimento": Coluna(DECIMAL, nulo=False),
+    "DESC_NACIONALIDADE": Coluna(TEXTO, nulo=False),
+    "Desc_Escola_2_Grau": Coluna(TEXTO),
+    "Desc_Naturalidade": Coluna(TEXTO),
+    "Cod_Turno": Coluna(TEXTO, nulo=False),
+    "Desc_Turno": Coluna(TEXTO, nulo=False),
+    "Desc_Estado_Civil": Coluna(TEXTO),
+    "Desc_Tipo_Escola_Origem": Coluna(TEXTO, valores=TIPOS_ESCOLA),
+    "Desc_Sit_Matricula": Coluna(TEXTO, nulo=False, valores=SITUACOES_MATRICULA),
+    "Desc_Cota": Coluna(TEXTO),
+    "Desc_Turno_Ini": Coluna(TEXTO, nulo=False),
+    "dt_matricula": Coluna(DATA, nulo=False),
+    "DT_Rematricula": Coluna(DATA, nulo=False),
+    "clPeriodo_Let_ini": Coluna(TEXTO, nulo=False),
+    "Qtd_Periodos": Coluna(INTEIRO, nulo=False),
+    "Ultima_Aula_Presente": Coluna(DATA),
+    "Ultimo_Periodo_Letivo_Presente": Coluna(TEXTO, nulo=False),
+    "Situacao_Ultimo_Periodo_Letivo": Coluna(TEXTO, nulo=False),
+    "DESC_SIT_MATRICULA_PERIODO": Coluna(TEXTO, nulo=False),
+    "Ultimo_Evento_Matricula": Coluna(TEXTO),
+}
+
+# Mesmo esquema com os nomes já em snake_case, como o resto do código usa
+ESQUEMA = {snake_case(nome): coluna for nome, coluna in ESQUEMA_CSV.items()}
+
+
+def parametros_leitura(colunas=None, esquema=ESQUEMA, inteiros_como_texto=False):
+    """Argumentos de pd.read_csv para o export; `colunas` em snake_case (None = todas)."""
+    def usar(nome):
+        return snake_case(nome) in esquema and (colunas is None or snake_case(nome) in colunas)
+
+    tipos = {DECIMAL: "float64", INTEIRO: str if inteiros_como_texto else "Int64"}
+    return {
+        "sep": SEPARADOR,
+        "encoding": CODIFICACAO,
+        "decimal": SEPARADOR_DECIMAL,
+        "usecols": usar,
+        # O dtype vale pelo nome original do export
+        "dtype": {
+            nome: tipos.get(coluna.tipo, str)
+            for nome, coluna in ESQUEMA_CSV.items()
+            if usar(nome)
+        },
+    }
+
+
+def ler_csv(caminho_csv, colunas=None, **kwargs):
+    """Lê o export tipado pelo esquema, com nomes em snake_case.
+
+    Se alguma coluna INTEIRO tem valor inválido, relê com elas como texto;
+    as falhas ficam em df.attrs["falhas_inteiros"] (ver aplicar_esquema).
+    """
+    try:
+        df = pd.read_csv(caminho_csv, **parametros_leitura(colunas), **kwargs)
+    except (ValueError, TypeError):
+        df = pd.read_csv(caminho_csv, **parametros_leitura(colunas, inteiros_como_texto=True), **kwargs)
+    df.columns = [snake_case(col) for col in df.columns]
+    return aplicar_esquema(df)
+
+
+def _numeros(texto, tipo):
+    """Texto -> float64 (NaN onde vazio ou inválido)."""
+    if pd.api.types.is_numeric_dtype(texto):
+        return texto.astype("float64")
+    if tipo == DECIMAL:
+        texto = texto.str.replace(SEPARADOR_DECIMAL, ".", regex=False)
+    return pd.to_numeric(texto, errors="coerce").astype("float64")
+
+
+def converter_inteiros(valores, nulo=True):
+    """'168.0' -> 168; devolve (inteiros, linhas que falharam).
+
+    Int64 se a coluna aceita vazio, senão int64. Texto que não é inteiro
+    vira NA e conta como falha; vazio não conta. Uma coluna obrigatória que
+    ficou com NA (contrato quebrado) fica float64, como o pandas leria, para
+    comparações como >= 2014 continuarem sem NA.
+    """
+    falhas = 0
+    if pd.api.types.is_integer_dtype(valores):
+        numeros = valores
+    else:
+        numeros = _numeros(valores, INTEIRO)
+        numeros = numeros.where(numeros == np.round(numeros))
+        if not pd.api.types.is_numeric_dtype(valores):
+            vazio = valores.isna() | valores.str.strip().eq("")
+            falhas = int((numeros.isna() & ~vazio).sum())
+        numeros = numeros.astype("Int64")
+    if nulo:
+        return numeros, falhas
+    if numeros.hasnans:
+        return numeros.astype("float64"), falhas
+    return numeros.astype("int64"), falhas
+
+
+def aplicar_esquema(df, esquema=ESQUEMA):
+    """Acerta as colunas INTEIRO (nomes em snake_case); falhas em df.attrs["falhas_inteiros"].
+
+    Na leitura tipada elas já vêm Int64 e só as obrigatórias mudam (int64);
+    lidas como texto, são convertidas aqui.
+    """
+    falhas = {}
+    for col in df.columns:
+        coluna = esquema.get(col)
+        if coluna is not None and coluna.tipo == INTEIRO:
+            df[col], falhas_col = converter_inteiros(df[col], coluna.nulo)
+            if falhas_col:
+                falhas[col] = falhas_col
+    df.attrs["falhas_inteiros"] = falhas
+    return df
+
+
+def _regras_violadas(texto, coluna, formatos):
+    """Máscaras {regra: linhas} de uma coluna lida como texto."""
+    vazio = texto.isna() | texto.str.strip().eq("")
+    regras = {}
+    if not coluna.nulo:
+        regras["vazio"] = vazio.to_numpy()
+
+    if coluna.tipo in (INTEIRO, DECIMAL):
+        valores = _numeros(texto, coluna.tipo)
+        invalido = valores.isna() & ~vazio
+        if coluna.tipo == INTEIRO:
+            invalido |= valores.notna() & (valores != np.round(valores))
+        regras["formato"] = invalido.to_numpy()
+    elif coluna.tipo == DATA:
+        datas, _ = converter_datas(texto, formatos)
+        regras["formato"] = (datas.isna() & ~vazio).to_numpy()
+
+    if coluna.valores is not None:
+        comparado = texto if coluna.tipo == TEXTO else valores
+        regras["fora_da_lista"] = (comparado.notna() & ~vazio & ~comparado.isin(coluna.valores)).to_numpy()
+    return regras
+
+
+def validar(caminho_csv, esquema_csv=ESQUEMA_CSV, max_exemplos=3):
+    """Relatório das quebras de contrato: uma linha por coluna e regra.
+
+    Colunas: coluna, regra (ausente, vazio, formato, fora_da_lista,
+    nao_declarada), linhas afetadas e exemplos de valores. O total de linhas
+    do CSV com alguma quebra fica em relatorio.attrs["linhas_invalidas"].
+    """
+    bruto = pd.read_csv(caminho_csv, sep=SEPARADOR, encoding=CODIFICACAO, dtype=str, keep_default_na=False)
+    linhas = []
+    algum = np.zeros(len(bruto), dtype=bool)
+
+    for nome in bruto.columns.difference(list(esquema_csv)):
+        linhas.append({"coluna": nome, "regra": "nao_declarada", "linhas": 0, "exemplos": []})
+    for nome, coluna in esquema_csv.items():
+        if nome not in bruto.columns:
+            linhas.append({"coluna": nome, "regra": "ausente", "linhas": len(bruto), "exemplos": []})
+            continue
+        texto = bruto[nome]
+        formatos = FORMATOS_DATAS.get(snake_case(nome), ())
+        for regra, mascara in _regras_violadas(texto, coluna, formatos).items():
+            quantidade = int(mascara.sum())
+            if quantidade:
+                algum |= mascara
+                exemplos = pd.unique(texto[mascara])[:max_exemplos].tolist()
+                linhas.append({"coluna": nome, "regra": regra, "linhas": quantidade, "exemplos": exemplos})
+
+    relatorio = pd.DataFrame(linhas, columns=["coluna", "regra", "linhas", "exemplos"])
+    relatorio.attrs["linhas_invalidas"] = int(algum.sum())
+    relatorio.attrs["linhas"] = len(bruto)
+    return relatorio
+
+
+if __name__ == "__main__":
+    # Importado aqui porque o snapshot importa este módulo
+    from snapshot import CAMINHO_CSV
+
+    parser = argparse.ArgumentParser(description="Confere o CSV exportado contra o esquema declarado")
+    parser.add_argument("--csv", default=CAMINHO_CSV, help="CSV exportado pelo sistema acadêmico")
+    args = parser.parse_args()
+
+    relatorio = validar(args.csv)
+    pd.set_option("display.width", 200)
+    pd.set_option("display.max_colwidth", 80)
+    print(relatorio.to_string(index=False) if len(relatorio) else "Nenhuma quebra de contrato.")
+    print(f"\n{relatorio.attrs['linhas_invalidas']} de {relatorio.attrs['linhas']} linhas com alguma quebra")
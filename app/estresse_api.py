@@ -0,0 +1,138 @@
+"""Teste de carga da API local (api.py): vazão e latência com clientes concorrentes.
+
+Cada cliente faz requisições GET sorteadas entre as consultas e os valores
+de filtro que a própria API informa (/filtros). Com --etag, cada cliente
+reenvia o último ETag de cada URL, como um navegador com cache.
+
+Uso: python app/estresse_api.py --clientes 16 --requisicoes 200 [--url http://127.0.0.1:8502]
+Sem --url, a API sobe neste processo numa porta livre. --caminho acrescenta
+uma consulta fixa à carga de todos os clientes (p.ex. um recorte vazio).
+"""
+import argparse
+import json
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPException
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+CONSULTAS_TESTE = ["total", "status_por_ano", "sexo_por_ano", "municipios", "box"]
+
+# Status das requisições sem resposta HTTP (conexão recusada ou derrubada)
+SEM_RESPOSTA = "sem_resposta"
+
+
+def sortear_urls(filtros, n, semente=0):
+    """`n` caminhos de consulta com 0 a 2 filtros sorteados cada."""
+    rng = random.Random(semente)
+    urls = []
+    for _ in range(n):
+        consulta = rng.choice(CONSULTAS_TESTE)
+        parametros = {}
+        for dim in rng.sample(sorted(filtros), rng.randint(0, 2)):
+            if filtros[dim]:
+                parametros[dim] = ",".join(rng.sample(filtros[dim], rng.randint(1, min(2, len(filtros[dim])))))
+        if consulta == "box":
+            parametros["x"] = rng.choice(["status", "sexo", "desc_tipo_escola_origem"])
+            parametros["y"] = rng.choice(["coeficiente_rendimento", "tempo_permanencia"])
+        urls.append(f"/{consulta}?{urlencode(parametros)}")
+    return urls
+
+
+def cliente(url_base, caminhos, usar_etag):
+    """Executa os caminhos em sequência e devolve [(segundos, status), ...].
+
+    Uma conexão derrubada conta como SEM_RESPOSTA e o cliente segue para o
+    próximo caminho, em vez de encerrar o teste.
+    """
+    etags = {}
+    medidas = []
+    for caminho in caminhos:
+        cabecalhos = {"If-None-Match": etags[caminho]} if usar_etag and caminho in etags else {}
+        inicio = time.perf_counter()
+        try:
+            with urlopen(Request(url_base + caminho, headers=cabecalhos)) as resposta:
+                resposta.read()
+                status = resposta.status
+                etags[caminho] = resposta.headers.get("ETag")
+        except HTTPError as erro:
+            # urllib trata 304 como erro
+            status = erro.code
+        except (URLError, HTTPException, ConnectionError):
+            status = SEM_RESPOSTA
+        medidas.append((time.perf_counter() - inicio, status))
+    return medidas
+
+
+def executar(url_base, clientes, requisicoes, usar_etag=False, semente=0, fixos=()):
+    """Dispara `clientes` threads com `requisicoes` cada e devolve o resumo.
+
+    Os caminhos em `fixos` entram na carga de todos os clientes.
+    """
+    with urlopen(url_base + "/filtros") as resposta:
+        filtros = json.loads(resposta.read())
+
+    # Metade das URLs se repete entre clientes, como vários usuários no mesmo recorte
+    comuns = list(fixos) + sortear_urls(filtros, max(requisicoes // 2 - len(fixos), 0), semente)
+    cargas = [
+        comuns + sortear_urls(filtros, requisicoes - len(comuns), semente + i + 1)
+        for i in range(clientes)
+    ]
+    for i, carga in enumerate(cargas):
+        random.Random(semente + i).shuffle(carga)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(clientes) as executor:
+        resultados = list(executor.map(lambda carga: cliente(url_base, carga, usar_etag), cargas))
+    segundos = time.perf_counter() - inicio
+
+    medidas = [medida for resultado in resultados for medida in resultado]
+    latencias_ms = sorted(latencia * 1000 for latencia, _ in medidas)
+    percentis = statistics.quantiles(latencias_ms, n=100)
+    por_status = {}
+    for _, status in medidas:
+        por_status[status] = por_status.get(status, 0) + 1
+    erros = sum(n for status, n in por_status.items() if status == SEM_RESPOSTA or status >= 500)
+    return {
+        "clientes": clientes,
+        "requisicoes": len(medidas),
+        "segundos": round(segundos, 3),
+        "requisicoes_por_segundo": round(len(medidas) / segundos, 1),
+        "p50_ms": round(percentis[49], 2),
+        "p95_ms": round(percentis[94], 2),
+        "p99_ms": round(percentis[98], 2),
+        "status": por_status,
+        "erros": erros,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Teste de carga da API do painel")
+    parser.add_argument("--url", default=None, help="API já em execução (padrão: sobe uma local)")
+    parser.add_argument("--clientes", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requisicoes", type=int, default=200, help="requisições por cliente")
+    parser.add_argument("--etag", action="store_true", help="revalida com If-None-Match")
+    parser.add_argument("--caminho", action="append", default=[],
+                        help="consulta fixa em todos os clientes, p.ex. /box?status=Egresso&ano_letivo_ini=2024")
+    args = parser.parse_args()
+
+    servidor = None
+    url = args.url
+    if url is None:
+        # Importado só aqui: contra uma API remota o teste não precisa do pandas
+        from api import criar_servidor
+
+        servidor = criar_servidor(porta=0)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{servidor.server_address[1]}"
+
+    try:
+        for clientes in args.clientes:
+            print(json.dumps(executar(url, clientes, args.requisicoes, args.etag, fixos=args.caminho), ensure_ascii=False))
+    finally:
+        if servidor is not None:
+            servidor.shutdown()
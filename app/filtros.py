@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+
+# Dimensões disponíveis nos filtros da barra lateral
+DIMENSOES_FILTRO = ["sexo", "desc_cor", "status", "ano_letivo_ini", "periodo_letivo_ini"]
+
+
+class IndiceFiltros:
+    """Índice de bitsets por valor de cada dimensão de filtro.
+
+    Cada valor distinto guarda um bitset compactado (np.packbits) com as
+    linhas em que aparece. Uma seleção faz OR entre os valores escolhidos
+    de uma dimensão e AND entre as dimensões, sem copiar o DataFrame.
+    """
+
+    def __init__(self, df, dimensoes=DIMENSOES_FILTRO):
+        self.n_linhas = len(df)
+        self.bitsets = {}
+        for dim in dimensoes:
+            # factorize ignora nulos (código -1), como o isin fazia
+            codigos, valores = pd.factorize(df[dim])
+            self.bitsets[dim] = {
+                valor: np.packbits(codigos == i) for i, valor in enumerate(valores)
+            }
+
+    def valores(self, dim):
+        """Valores distintos da dimensão, na ordem em que aparecem nos dados."""
+        return list(self.bitsets[dim])
+
+    def bitset(self, selecao):
+        """Bitset das linhas que passam na seleção, ou None se nada foi filtrado.
+
+        `selecao` é um dicionário {dimensão: valores}; dimensões com lista
+        vazia não filtram nada.
+        """
+        resultado = None
+        for dim, valores in selecao.items():
+            if not len(valores):
+                continue
+            bits_dim = np.zeros((self.n_linhas + 7) // 8, dtype=np.uint8)
+            for valor in valores:
+                bits_valor = self.bitsets[dim].get(valor)
+                if bits_valor is not None:
+                    np.bitwise_or(bits_dim, bits_valor, out=bits_dim)
+            if resultado is None:
+                resultado = bits_dim
+            else:
+                np.bitwise_and(resultado, bits_dim, out=resultado)
+        return resultado
+
+    def selecionar(self, selecao):
+        """Posições (np.ndarray) das linhas selecionadas, ou None sem filtros."""
+        bits = self.bitset(selecao)
+        if bits is None:
+            return None
+        return np.flatnonzero(np.unpackbits(bits, count=self.n_linhas))
+
+    def contar(self, selecao):
+        """Quantidade de linhas selecionadas, sem materializar as posições."""
+        bits = self.bitset(selecao)
+        if bits is None:
+            return self.n_linhas
+        return int(np.unpackbits(bits, count=self.n_linhas).sum())
+
+    def filtrar(self, df, selecao):
+        """Recorte do DataFrame; sem filtros devolve o próprio df, sem cópia."""
+        posicoes = self.selecionar(selecao)
+        if posicoes is None:
+            return df
+        return df.take(posicoes)
@@ -0,0 +1,121 @@
+"""Camadas geográficas por nome: arquivo local ou cache em disco, lidas uma vez.
+
+Cada camada tem o arquivo versionado no repositório e a URL de origem.
+resolver() devolve um caminho local:
+
+- o arquivo do repositório, se existir (funciona sem rede);
+- senão, a cópia baixada da URL, guardada em PASTA_CACHE com o nome igual
+  ao sha256 do conteúdo. Depois de MAX_IDADE_HORAS ela é revalidada com
+  If-None-Match / If-Modified-Since; sem rede, a última cópia é usada.
+
+carregar() faz o json.load uma vez por versão do arquivo e devolve sempre o
+mesmo objeto para todas as camadas do mapa (ninguém deve alterá-lo; o folium
+recebe cópias via mapa.copiar_features).
+"""
+import hashlib
+import json
+import os
+import time
+from functools import lru_cache
+from urllib.error import URLError
+from urllib.request import Request, urlopen
+
+MUNICIPIOS_CE = "municipios_ce"
+
+CAMADAS = {
+    MUNICIPIOS_CE: {
+        "arquivo": r"geojson/geojs-23-mun.json",
+        "url": "https://raw.githubusercontent.com/tbrugz/geodata-br/master/geojson/geojs-23-mun.json",
+    },
+}
+
+PASTA_CACHE = os.environ.get("PAINEL_CACHE_GEO", r"geojson/cache")
+MAX_IDADE_HORAS = float(os.environ.get("PAINEL_CACHE_GEO_HORAS", 24))
+TIMEOUT_SEGUNDOS = 10
+
+
+def _camada(nome):
+    if nome not in CAMADAS:
+        raise ValueError(f"Camada desconhecida: {nome!r} (disponíveis: {sorted(CAMADAS)})")
+    return CAMADAS[nome]
+
+
+def _ler_indice(pasta):
+    try:
+        with open(os.path.join(pasta, "indice.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _gravar_atomico(caminho, conteudo):
+    temporario = caminho + ".tmp"
+    with open(temporario, "wb") as f:
+        f.write(conteudo)
+    os.replace(temporario, caminho)
+
+
+def baixar(url, pasta=PASTA_CACHE, max_idade_horas=MAX_IDADE_HORAS):
+    """Caminho da cópia local de `url`, baixando ou revalidando se preciso."""
+    os.makedirs(pasta, exist_ok=True)
+    indice = _ler_indice(pasta)
+    entrada = indice.get(url)
+    caminho = os.path.join(pasta, entrada["sha256"] + ".json") if entrada else None
+    if caminho and not os.path.exists(caminho):
+        entrada = caminho = None
+
+    if entrada and time.time() - entrada["verificado"] < max_idade_horas * 3600:
+        return caminho
+
+    cabecalhos = {}
+    if entrada:
+        if entrada.get("etag"):
+            cabecalhos["If-None-Match"] = entrada["etag"]
+        if entrada.get("last_modified"):
+            cabecalhos["If-Modified-Since"] = entrada["last_modified"]
+    try:
+        with urlopen(Request(url, headers=cabecalhos), timeout=TIMEOUT_SEGUNDOS) as resposta:
+            conteudo = resposta.read()
+            sha256 = hashlib.sha256(conteudo).hexdigest()
+            caminho = os.path.join(pasta, sha256 + ".json")
+            if not os.path.exists(caminho):
+                _gravar_atomico(caminho, conteudo)
+            entrada = {
+                "sha256": sha256,
+                "etag": resposta.headers.get("ETag"),
+                "last_modified": resposta.headers.get("Last-Modified"),
+            }
+    except (URLError, OSError):
+        # 304 (urllib trata como HTTPError) ou sem rede: segue com a última cópia
+        if not entrada:
+            raise
+
+    entrada["verificado"] = time.time()
+    indice[url] = entrada
+    _gravar_atomico(os.path.join(pasta, "indice.json"), json.dumps(indice, indent=2).encode())
+    return caminho
+
+
+def resolver(nome=MUNICIPIOS_CE):
+    """Caminho local da camada: o arquivo do repositório ou a cópia em cache."""
+    camada = _camada(nome)
+    if os.path.exists(camada["arquivo"]):
+        return camada["arquivo"]
+    return baixar(camada["url"])
+
+
+@lru_cache(maxsize=8)
+def _ler(caminho, _mtime_ns, _tamanho):
+    with open(caminho, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def ler_json(caminho):
+    """json.load do arquivo, uma vez por versão (caminho, mtime, tamanho)."""
+    info = os.stat(caminho)
+    return _ler(os.path.abspath(caminho), info.st_mtime_ns, info.st_size)
+
+
+def carregar(nome=MUNICIPIOS_CE):
+    """GeoJSON da camada, lido uma vez por processo e compartilhado."""
+    return ler_json(resolver(nome))
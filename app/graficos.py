@@ -0,0 +1,326 @@
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+MODOS_BOX = ["Resumo estatístico", "Todos os pontos"]
+
+CORES_STATUS = {
+    'Sem êxito': "#E31B1F",
+    'Matriculado': "#0068c9",
+    'Egresso': 'green'
+}
+
+
+# =========================
+# Funções auxiliares
+# =========================
+def bar_with_percent(counts, x_label, y_label, title):
+    percent = (counts / counts.sum() * 100).round(2)
+    labels = [f"{v} ({p}%)" for v, p in zip(counts.values, percent.values)]
+    # Em DataFrame: com listas vazias em x e y o plotly recusa a figura
+    barras = pd.DataFrame({'x': counts.index, 'y': counts.values, 'rotulo': labels})
+    fig = px.bar(
+        barras, x='x', y='y', text='rotulo',
+        labels={'x': x_label, 'y': y_label}, title=title,
+        color_discrete_sequence=['blue']
+    )
+    fig.update_traces(textposition='outside')
+    return fig
+
+
+def grouped_bar_with_percent(df_grouped, x, y, color, x_label, y_label, title):
+    total_por_x = df_grouped.groupby(x)[y].transform('sum')
+    df_grouped['percent'] = (df_grouped[y] / total_por_x * 100).round(2)
+    df_grouped['label'] = df_grouped.apply(lambda row: f"{row[y]} ({row['percent']}%)", axis=1)
+    fig = px.bar(
+        df_grouped, x=x, y=y, color=color, barmode='group',
+        text='label', labels={x: x_label, y: y_label}, title=title,
+        color_discrete_sequence=['blue']
+    )
+    fig.update_traces(textposition='outside')
+    return fig
+
+
+def pizza(counts, coluna, title, color_discrete_map):
+    counts = counts.reset_index()
+    counts.columns = [coluna, 'quantidade']
+    fig = px.pie(
+        counts,
+        names=coluna,
+        values='quantidade',
+        title=title,
+        hole=0.5,
+        color=coluna,
+        color_discrete_map=color_discrete_map
+    )
+    fig.update_traces(textinfo='percent+label+value')
+    return fig
+
+
+def proporcao_por_ano(contagens):
+    """Quantidade e proporção (%) de cada grupo dentro de cada ano."""
+    por_ano = contagens.reset_index(name='quantidade')
+
+    # Calcula o total de alunos por ano
+    total_ano = por_ano.groupby('ano_letivo_ini')['quantidade'].transform('sum')
+
+    # Calcula a proporção de cada grupo em cada ano
+    por_ano['proporcao'] = (por_ano['quantidade'] / total_ano * 100).round(2)
+
+    # Cria o rótulo personalizado: "xx.x% (N)"
+    por_ano['rotulo'] = por_ano['proporcao'].astype(str) + '% (' + por_ano['quantidade'].astype(str) + ')'
+    return por_ano
+
+
+# =========================
+# Gráficos das análises (contagens vindas do cubo)
+# =========================
+def idade_media(cubo, selecao):
+    idade_counts = cubo.contagem('idade', selecao)
+    return (idade_counts.index * idade_counts).sum() / idade_counts.sum()
+
+
+def distribuicao_idade(cubo, selecao):
+    # Histograma de idade com representatividade
+    idade_counts = cubo.contagem('idade', selecao).sort_index()
+    idade_percent = (idade_counts / idade_counts.sum() * 100).round(2)
+    idade_labels = [f"{v} ({p}%)" for v, p in zip(idade_counts.values, idade_percent.values)]
+    # Em DataFrame, como em bar_with_percent: o recorte vazio também gera a figura
+    barras = pd.DataFrame({'x': idade_counts.index, 'y': idade_counts.values, 'rotulo': idade_labels})
+    fig = px.bar(
+        barras, x='x', y='y', text='rotulo',
+        labels={'x': 'Idade', 'y': 'Quantidade'}, title="Distribuição de Idade"
+    )
+    fig.update_traces(textposition='outside')
+    return fig
+
+
+def distribuicao_sexo(cubo, selecao):
+    return pizza(
+        cubo.contagem('sexo', selecao), 'sexo', "Distribuição por Sexo",
+        {'F': 'red', 'M': 'blue'}
+    )
+
+
+def proporcao_sexo_ano(cubo, selecao):
+    sexo_ano = proporcao_por_ano(cubo.contar(['ano_letivo_ini', 'sexo'], selecao))
+
+    # Gráfico de linha com rótulos e sem linhas de grade
+    fig = px.line(
+        sexo_ano,
+        x='ano_letivo_ini',
+        y='proporcao',
+        color='sexo',
+        markers=True,
+        text='rotulo',
+        labels={'ano_letivo_ini': 'Ano Letivo Inicial', 'proporcao': 'Proporção (%)', 'sexo': 'Sexo'},
+        title="Proporção de Sexo por Ano Letivo",
+        color_discrete_map={'F': '#E31B1F', 'M': '#0068c9'}
+    )
+    fig.update_traces(textposition='top center')
+    fig.update_xaxes(showgrid=False)
+    fig.update_yaxes(showgrid=False)
+    fig.update_layout(yaxis_tickformat='.1f')
+    return fig
+
+
+def distribuicao_grupo(cubo, selecao):
+    return pizza(
+        cubo.contagem('grupo', selecao), 'grupo', "Distribuição por Raça/Cor",
+        {'PPI': 'red', 'Branca e amarela': 'blue', 'Sem informação': 'gray'}
+    )
+
+
+def proporcao_cor_ano(cubo, selecao):
+    cor_ano = proporcao_por_ano(cubo.contar(['ano_letivo_ini', 'desc_cor'], selecao))
+
+    # Gráfico de linha com rótulos e sem linhas de grade
+    fig = px.line(
+        cor_ano,
+        x='ano_letivo_ini',
+        y='proporcao',
+        color='desc_cor',
+        color_discrete_map={'Parda': 'red', 'Branca': 'blue', 'Preta': 'black', 'Amarela': 'yellow', 'Indígena': 'green', 'SI': 'gray'},
+        markers=True,
+        text='rotulo',
+        labels={'ano_letivo_ini': 'Ano Letivo Inicial', 'proporcao': 'Proporção (%)', 'grupo': 'Cor/Raça'},
+    )
+    fig.update_traces(textposition='top center')
+    fig.update_xaxes(showgrid=False)
+    fig.update_yaxes(showgrid=False)
+    fig.update_layout(yaxis_tickformat='.1f')
+    return fig
+
+
+def barras_cor(cubo, selecao):
+    return bar_with_percent(cubo.contagem('desc_cor', selecao), 'Cor/Raça', 'Quantidade', "Cor/Raça")
+
+
+def barras_escola(cubo, selecao):
+    escola_counts = cubo.contagem('desc_tipo_escola_origem', selecao)
+    return bar_with_percent(escola_counts, 'Tipo de Escola', 'Quantidade', "Tipo de Escola de Origem")
+
+
+def abandono_por_ano(cubo, selecao):
+    ult_per_counts = cubo.contagem('ano_letivo_ini', selecao, onde={'desc_sit_matricula': ["Abandono"]})
+    return bar_with_percent(ult_per_counts, 'Ano letivo', 'Quantidade', "Abandono por Período Letivo Inicial")
+
+
+def cursando_por_ano(cubo, selecao):
+    per_counts = cubo.contagem('ano_letivo_ini', selecao, onde={'desc_sit_matricula': ["Matriculado"]})
+    return bar_with_percent(per_counts, 'Situação no Período', 'Quantidade', "Cursando por ano letivo inicial")
+
+
+def distribuicao_status(cubo, selecao):
+    return pizza(
+        cubo.contagem('status', selecao), 'status', "Distribuição por Situação Acadêmica",
+        CORES_STATUS
+    )
+
+
+def status_por_ano(cubo, selecao):
+    # Agrupa e conta
+    status_ano = cubo.contar(['ano_letivo_ini', 'status'], selecao).reset_index(name='quantidade')
+
+    # Define a ordem desejada para o status
+    ordem_status = ['Egresso', 'Matriculado', 'Sem êxito']
+    status_ano['status'] = pd.Categorical(status_ano['status'], categories=ordem_status, ordered=True)
+
+    # Calcula o total por ano
+    total_por_ano = status_ano.groupby('ano_letivo_ini')['quantidade'].transform('sum')
+    status_ano['percentual'] = (status_ano['quantidade'] / total_por_ano * 100).round(1)
+    status_ano['label'] = status_ano['percentual'].astype(str) + '%'
+
+    fig = px.bar(
+        status_ano,
+        x='ano_letivo_ini',
+        y='quantidade',
+        color='status',
+        category_orders={'status': ordem_status},
+        title="Distribuição do Status dos Alunos por Ano Letivo Inicial",
+        labels={'ano_letivo_ini': 'Ano Letivo Inicial', 'quantidade': 'Quantidade', 'status': 'Status'},
+        barmode='stack',
+        color_discrete_map=CORES_STATUS,
+        text='label'
+    )
+    fig.update_traces(textposition='outside', textangle=0)
+    return fig
+
+
+# =========================
+# Box plots (linhas do recorte)
+# =========================
+def estatisticas_box(df, x, y):
+    """Quartis, média, bigodes (1,5 IQR) e outliers de `y` por grupo de `x`.
+
+    Usa o mesmo método de quartil do plotly (interpolação linear) e mantém
+    os grupos na ordem em que aparecem nos dados, como o px.box. Sem linhas
+    (recorte vazio), devolve estatísticas e outliers vazios.
+    """
+    dados = df[[x, y]].dropna()
+    dados = dados.assign(**{x: dados[x].astype(object)})
+    if dados.empty:
+        colunas = ["q1", "mediana", "q3", "media", "n", "bigode_inf", "bigode_sup"]
+        return pd.DataFrame(columns=colunas, index=pd.Index([], name=x), dtype="float64"), dados
+    ordem = list(pd.unique(dados[x]))
+
+    grupos = dados.groupby(x, sort=False)[y]
+    quartis = grupos.quantile([0.25, 0.5, 0.75]).unstack()
+    stats = pd.DataFrame({
+        "q1": quartis[0.25],
+        "mediana": quartis[0.5],
+        "q3": quartis[0.75],
+        "media": grupos.mean(),
+        "n": grupos.size(),
+    }).reindex(ordem)
+
+    iqr = stats["q3"] - stats["q1"]
+    limite_inf = dados[x].map(stats["q1"] - 1.5 * iqr)
+    limite_sup = dados[x].map(stats["q3"] + 1.5 * iqr)
+    dentro = (dados[y] >= limite_inf) & (dados[y] <= limite_sup)
+
+    # Bigodes vão até o ponto mais extremo ainda dentro dos limites
+    stats["bigode_inf"] = dados[dentro].groupby(x, sort=False)[y].min()
+    stats["bigode_sup"] = dados[dentro].groupby(x, sort=False)[y].max()
+    outliers = dados[~dentro]
+    return stats, outliers
+
+
+def box_agregado(df, x, y, title, pontos_por_grupo=0, semente=0):
+    """Box plot montado a partir das estatísticas, sem enviar todas as linhas.
+
+    Cada grupo vira um traço com q1/mediana/q3/bigodes calculados no
+    servidor. Os pontos enviados são só os outliers e, se pedido, uma
+    amostra de até `pontos_por_grupo` linhas por grupo.
+    """
+    stats, outliers = estatisticas_box(df, x, y)
+    amostra = outliers
+    if pontos_por_grupo:
+        sorteio = df[[x, y]].dropna().sample(frac=1, random_state=semente)
+        amostra = pd.concat([outliers, sorteio.groupby(x, observed=True).head(pontos_por_grupo)])
+        amostra = amostra[~amostra.index.duplicated()]
+
+    cores = px.colors.qualitative.Plotly
+    fig = go.Figure()
+    for i, (grupo, linha) in enumerate(stats.iterrows()):
+        cor = cores[i % len(cores)]
+        fig.add_trace(go.Box(
+            x=[grupo], q1=[linha["q1"]], median=[linha["mediana"]], q3=[linha["q3"]],
+            lowerfence=[linha["bigode_inf"]], upperfence=[linha["bigode_sup"]],
+            mean=[linha["media"]], name=str(grupo), legendgroup=str(grupo),
+            marker_color=cor, boxpoints=False
+        ))
+        pontos = amostra.loc[amostra[x] == grupo, y]
+        if len(pontos):
+            # Traço só de pontos (caixa invisível) para ter o jitter do plotly
+            fig.add_trace(go.Box(
+                x=[grupo] * len(pontos), y=pontos, name=str(grupo), legendgroup=str(grupo),
+                marker_color=cor, boxpoints="all", jitter=0.3, pointpos=0,
+                fillcolor="rgba(0,0,0,0)", line={"width": 0}, hoveron="points",
+                showlegend=False
+            ))
+    fig.update_layout(
+        title=title, boxmode="overlay",
+        xaxis_title=x, yaxis_title=y, legend_title_text=x
+    )
+    return fig
+
+
+def box_plot(df, x, y, title, modo=MODOS_BOX[0], pontos_por_grupo=0):
+    """Box plot no modo escolhido: resumo estatístico ou todos os pontos (px.box)."""
+    if modo == "Todos os pontos":
+        return px.box(df, x=x, y=y, color=x, points="all", title=title)
+    return box_agregado(df, x, y, title, pontos_por_grupo)
+
+
+# =========================
+# Permanência e desfechos (tábua de vida do módulo sobrevivencia)
+# =========================
+def curvas_permanencia(tabela, por, title):
+    """Curva de Kaplan–Meier (fração ainda sem desfecho) de cada grupo."""
+    dados = tabela.assign(**{por: tabela[por].astype(str), 'sobrevivencia': tabela['sobrevivencia'] * 100})
+    fig = px.line(
+        dados, x='meses', y='sobrevivencia', color=por, line_shape='hv', title=title,
+        labels={'meses': 'Meses desde a matrícula', 'sobrevivencia': 'Sem desfecho (%)', por: por},
+        hover_data=['em_risco']
+    )
+    fig.update_yaxes(range=[0, 100])
+    return fig
+
+
+def incidencia_acumulada(tabela, por, title):
+    """Incidência acumulada de Egresso e de Sem êxito, um painel por desfecho."""
+    longa = tabela.assign(**{por: tabela[por].astype(str)}).melt(
+        id_vars=[por, 'meses'],
+        value_vars=['incidencia_egresso', 'incidencia_sem_exito'],
+        var_name='desfecho', value_name='incidencia'
+    )
+    longa['desfecho'] = longa['desfecho'].map({'incidencia_egresso': 'Egresso', 'incidencia_sem_exito': 'Sem êxito'})
+    longa['incidencia'] = longa['incidencia'] * 100
+    fig = px.line(
+        longa, x='meses', y='incidencia', color=por, facet_col='desfecho', line_shape='hv', title=title,
+        labels={'meses': 'Meses desde a matrícula', 'incidencia': 'Incidência acumulada (%)', por: por}
+    )
+    fig.for_each_annotation(lambda a: a.update(text=a.text.split('=')[-1]))
+    fig.update_yaxes(range=[0, 100])
+    return fig
@@ -0,0 +1,154 @@
+"""Atualização incremental do snapshot a partir de um novo export completo.
+
+A cada semestre a secretaria manda o export inteiro de novo, mas a maioria
+das matrículas não muda. Aqui o export novo é comparado com o snapshot por
+cod_matricula e pelo hash do conteúdo bruto de cada linha: só as matrículas
+novas ou alteradas passam pelas derivações; as demais são copiadas do
+snapshot como estão.
+
+O export é lido em blocos (ver snapshot.ler_csv_em_blocos) e o snapshot
+novo é gravado lote a lote, como na ingestão em blocos: em memória ficam
+só o bloco atual, a chave e o hash de cada linha antiga e as linhas
+alteradas (que formam o Delta).
+
+Uso: python app/incremental.py --csv Data/matriculasFinal-phase2.csv
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+
+from municipios import codigos_por_nome, ibge_por_cod_cidade
+from snapshot import (
+    CAMINHO_CSV, LINHAS_POR_BLOCO, VERSAO_SNAPSHOT, caminho_snapshot, esquema_blocos, gravar_blocos,
+    hash_linhas, ler_csv, ler_csv_em_blocos, preparar_bloco
+)
+
+
+class ChaveRepetida(ValueError):
+    """O export (ou o snapshot) tem cod_matricula repetido."""
+
+
+class Delta:
+    """Diferença entre o snapshot antigo e o export novo.
+
+    `chaves_removidas` são os cod_matricula cujas linhas antigas saíram
+    (alteradas ou excluídas do export); `inseridas` são as linhas novas ou
+    alteradas, já com as colunas derivadas (exceto idade).
+    """
+
+    def __init__(self, chaves_removidas, inseridas, mantidas, novas, excluidas):
+        self.chaves_removidas = chaves_removidas
+        self.inseridas = inseridas
+        self.mantidas = mantidas
+        self.novas = novas
+        self.excluidas = excluidas
+
+    def resumo(self):
+        return {
+            "mantidas": self.mantidas,
+            "novas": self.novas,
+            "alteradas": len(self.inseridas) - self.novas,
+            "excluidas": self.excluidas,
+        }
+
+
+def comparar(chaves_antigas, hashes_antigos, chaves_novas, hashes_novos):
+    """Posições das linhas antigas mantidas e das linhas novas a derivar.
+
+    Devolve (posições antigas mantidas, posições novas alteradas/inéditas,
+    quantas são inéditas). `chaves_antigas` pode ser um pd.Index já
+    construído, para compará-lo com vários blocos sem refazer o índice.
+    """
+    antigas = chaves_antigas if isinstance(chaves_antigas, pd.Index) else pd.Index(chaves_antigas)
+    if antigas.has_duplicates or pd.Index(chaves_novas).has_duplicates:
+        raise ChaveRepetida("cod_matricula repetido; a atualização incremental exige chave única")
+
+    posicoes = antigas.get_indexer(chaves_novas)
+    existe = posicoes >= 0
+    igual = np.zeros(len(posicoes), dtype=bool)
+    igual[existe] = hashes_antigos[posicoes[existe]] == hashes_novos[existe]
+    return posicoes[igual], np.flatnonzero(~igual), int((~existe).sum())
+
+
+def atualizar_snapshot(caminho_csv=CAMINHO_CSV, destino=None, linhas_por_bloco=LINHAS_POR_BLOCO):
+    """Aplica o export novo ao snapshot existente e devolve o Delta.
+
+    Retorna None quando não há snapshot desta versão para comparar (ou a
+    chave não é única); nesse caso o snapshot precisa ser reconstruído por
+    completo, e o arquivo existente não é alterado.
+
+    Quem não casou pelo nome herda o cod_ibge pela tabela cod_cidade ->
+    cod_ibge do snapshot existente (não só das linhas alteradas), como numa
+    reconstrução completa.
+    """
+    destino = destino or caminho_snapshot(caminho_csv)
+    if not os.path.exists(destino):
+        return None
+    antigo = feather.read_table(destino, memory_map=True)
+    if (antigo.schema.metadata or {}).get(b"versao_snapshot") != VERSAO_SNAPSHOT.encode():
+        return None
+
+    chaves = antigo.select(["cod_matricula", "hash_linha"]).to_pandas()
+    antigas = pd.Index(chaves["cod_matricula"])
+    hashes_antigos = chaves["hash_linha"].to_numpy()
+    codigos = codigos_por_nome()
+    por_cod_cidade = ibge_por_cod_cidade(antigo.select(["texto_cidade", "cod_cidade"]).to_pandas(), codigos)
+
+    mantida = np.zeros(len(antigas), dtype=bool)
+    vistas, inseridas, contagem = [], [], {"novas": 0}
+
+    def blocos():
+        for bloco in ler_csv_em_blocos(caminho_csv, linhas_por_bloco):
+            mantidas, alteradas, novas = comparar(
+                antigas, hashes_antigos, bloco["cod_matricula"], hash_linhas(bloco)
+            )
+            vistas.append(bloco["cod_matricula"].to_numpy())
+            mantida[mantidas] = True
+            contagem["novas"] += novas
+            parte = preparar_bloco(bloco.iloc[alteradas], codigos, por_cod_cidade=por_cod_cidade)
+            if len(parte):
+                inseridas.append(parte)
+            yield parte
+
+        # Repetições entre blocos diferentes (dentro de um bloco, comparar já recusa)
+        if vistas and pd.Index(np.concatenate(vistas)).has_duplicates:
+            raise ChaveRepetida("cod_matricula repetido; a atualização incremental exige chave única")
+
+        # Matrículas que não mudaram: copiadas do snapshot antigo, em lotes
+        posicoes = np.flatnonzero(mantida)
+        for inicio in range(0, len(posicoes), linhas_por_bloco):
+            yield antigo.take(posicoes[inicio:inicio + linhas_por_bloco]).to_pandas()
+
+    try:
+        gravar_blocos(blocos(), destino, esquema_blocos(caminho_csv, codigos))
+    except ChaveRepetida:
+        return None
+
+    if inseridas:
+        inseridas = pd.concat(inseridas, ignore_index=True)
+    else:
+        inseridas = preparar_bloco(ler_csv(caminho_csv, nrows=0), codigos)
+    removidas = np.flatnonzero(~mantida)
+    return Delta(
+        chaves_removidas=chaves["cod_matricula"].to_numpy()[removidas],
+        inseridas=inseridas,
+        mantidas=int(mantida.sum()),
+        novas=contagem["novas"],
+        excluidas=len(removidas) - (len(inseridas) - contagem["novas"]),
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Atualiza o snapshot só com as matrículas que mudaram")
+    parser.add_argument("--csv", default=CAMINHO_CSV, help="novo export completo do sistema acadêmico")
+    parser.add_argument("--saida", default=None, help="snapshot .feather a atualizar")
+    args = parser.parse_args()
+
+    delta = atualizar_snapshot(args.csv, args.saida)
+    if delta is None:
+        print("Sem snapshot compatível; gere um completo com python app/snapshot.py --forcar")
+    else:
+        print(delta.resumo())
@@ -0,0 +1,112 @@
+"""Medição leve das etapas do painel (carga, filtro, GeoJSON, folium, gráficos).
+
+Cada reexecução do script cria um Rastreador. Cada etapa guarda o tempo de
+parede, as linhas processadas e os bytes enviados ao navegador. Com o
+rastreador desligado, etapa() devolve um contexto nulo compartilhado, e nada
+é medido nem gravado.
+
+Percentis por etapa a partir do log: python app/instrumentacao.py desempenho.jsonl
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+
+CAMINHO_LOG = os.environ.get("PAINEL_LOG_DESEMPENHO", "desempenho.jsonl")
+ATIVO_PADRAO = os.environ.get("PAINEL_INSTRUMENTACAO", "0") == "1"
+
+# As sessões do Streamlit são threads do mesmo processo e gravam no mesmo arquivo
+_trava_log = threading.Lock()
+
+
+class _EtapaNula:
+    """Contexto que não mede nada, mas aceita as mesmas anotações de uma etapa."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excecao):
+        return False
+
+    def __setitem__(self, chave, valor):
+        pass
+
+
+_ETAPA_NULA = _EtapaNula()
+
+
+class _Etapa(dict):
+    """Registro de uma etapa: {"etapa", "ms", "linhas", "bytes"}."""
+
+    def __init__(self, registros, nome, linhas=None):
+        super().__init__(etapa=nome, ms=None, linhas=linhas, bytes=None)
+        self._registros = registros
+
+    def __enter__(self):
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *excecao):
+        self["ms"] = round((time.perf_counter() - self._inicio) * 1000, 3)
+        self._registros.append(self)
+        return False
+
+
+class Rastreador:
+    """Coleta as etapas de uma reexecução e grava o resumo em JSONL."""
+
+    def __init__(self, ativo=ATIVO_PADRAO, caminho_log=CAMINHO_LOG):
+        self.ativo = ativo
+        self.caminho_log = caminho_log
+        self.registros = []
+        self._inicio = time.perf_counter()
+
+    def etapa(self, nome, linhas=None):
+        """Contexto que mede a etapa; anotar com etapa["linhas"] / etapa["bytes"]."""
+        if not self.ativo:
+            return _ETAPA_NULA
+        return _Etapa(self.registros, nome, linhas)
+
+    def finalizar(self, **contexto):
+        """Acrescenta a reexecução ao log e a devolve (None se desligado)."""
+        if not self.ativo:
+            return None
+        registro = {
+            "momento": datetime.now().isoformat(timespec="seconds"),
+            **contexto,
+            "total_ms": round((time.perf_counter() - self._inicio) * 1000, 3),
+            "etapas": [dict(etapa) for etapa in self.registros],
+        }
+        with _trava_log:
+            with open(self.caminho_log, "a", encoding="utf-8") as f:
+                f.write(json.dumps(registro, ensure_ascii=False, default=str) + "\n")
+        return registro
+
+
+def percentis(caminho_log=CAMINHO_LOG, quantis=(0.5, 0.9, 0.95, 0.99)):
+    """Percentis de tempo (ms) por etapa e do total das reexecuções do log."""
+    etapas = []
+    with open(caminho_log, encoding="utf-8") as f:
+        for linha in f:
+            registro = json.loads(linha)
+            etapas.append({"etapa": "(total)", "ms": registro["total_ms"]})
+            etapas.extend({"etapa": e["etapa"], "ms": e["ms"]} for e in registro["etapas"])
+
+    tempos = pd.DataFrame(etapas).groupby("etapa")["ms"]
+    tabela = tempos.quantile(list(quantis)).unstack()
+    tabela.columns = [f"p{int(q * 100)}" for q in quantis]
+    tabela.insert(0, "execucoes", tempos.size())
+    return tabela.sort_values(tabela.columns[-1], ascending=False).round(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Percentis de latência por etapa a partir do log do painel")
+    parser.add_argument("log", nargs="?", default=CAMINHO_LOG)
+    args = parser.parse_args()
+
+    pd.set_option("display.width", 200)
+    print(percentis(args.log).to_string())
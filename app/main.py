@@ -3,28 +3,42 @@ import pandas as pd
 import folium 
 import branca.colormap
 from streamlit_folium import st_folium
-from functions import snake_case
+from carga import ativar_copy_on_write, em_cache, versao_arquivo
+import pipeline
+from snapshot import CAMINHO_CSV
+from mapa import ZOOM_INICIAL, carregar_geojson, codigo_ibge, copiar_features
 import plotly.graph_objects as go
 import plotly.express as px
 
 st.set_page_config(page_title="Alunos Eng. telecom IFCE", page_icon="", layout="wide")
 
-geojson_url = "https://raw.githubusercontent.com/tbrugz/geodata-br/master/geojson/geojs-23-mun.json"
+# Os dados em cache são compartilhados entre as sessões como visões rasas
+ativar_copy_on_write()
 
-#lendo o arquivo 
-df_raw = pd.read_csv(r"Data\matriculasFinal-phase2.csv",sep=';', encoding='latin')
-snake_case(df_raw)
+# GeoJSON local, simplificado para o zoom inicial do mapa
+geojson_data = carregar_geojson(zoom=ZOOM_INICIAL)
 
-df_raw["cidade"] = df_raw["texto_cidade"].apply(lambda x: x if pd.isna(x) else x[:-5])
-#df_raw["cidade"] = df_raw["texto_cidade"].apply(lambda x: x if pd.isna(x) else x.split(' ')[0])
+# Amostra do export para a tabela do topo: só as primeiras linhas são lidas;
+# os dados completos ficam por conta do pipeline abaixo
+df_raw = em_cache(
+    "amostra_principal", versao_arquivo(CAMINHO_CSV), lambda: pipeline.carregar(CAMINHO_CSV, nrows=5)
+)
+
+# Tabelas das perguntas: saída da etapa "agregar" do pipeline, a mesma do
+# notebook, lida do cache em disco (só recalculada quando o CSV ou o código
+# das etapas muda) e guardada em memória por versão do CSV
+tabelas = em_cache("agregados_principal", versao_arquivo(CAMINHO_CSV), lambda: pipeline.executar(CAMINHO_CSV))
 
-df_mapa = df_raw.value_counts("cidade").reset_index(name="frequencia")
+df_mapa = tabelas["por_cidade"].copy()
 
 
 df_mapa["representatividade"] = (
     (df_mapa["frequencia"] / df_mapa["frequencia"].sum()) * 100
 ).round(2).astype(str) + "%"
 
+# Frequência por código IBGE, chave usada pelo mapa
+df_mapa_ibge = tabelas["por_cod_ibge"]
+
 
 
 st.title("Análise dos egressos Engenharia de telecomunicações IFCE.")
@@ -43,10 +57,10 @@ folium.TileLayer(tiles = branca.utilities.image_to_url([[1,1], [1,1]]),
                 attr = "Carlos Bezerra", name = "Imagem Fundo").add_to(mapa_ceara)
 
 #Criando o mapa coropletico
-folium.Choropleth(geo_data = geojson_url,
-                 data = df_mapa,
-                 columns= ["cidade", "frequencia"],
-                 key_on = "feature.properties.name",
+folium.Choropleth(geo_data = copiar_features(geojson_data, lambda feature: {"cod_ibge": codigo_ibge(feature)}),
+                 data = df_mapa_ibge,
+                 columns= ["cod_ibge", "frequencia"],
+                 key_on = "feature.properties.cod_ibge",
                  fill_color = "OrRd",
                  fill_opacity = 0.9,
                  line_opacity = 0.5,
@@ -66,7 +80,7 @@ estilo_destaque = lambda x: {"fillColor": "darkblue",
                             "fillOpacity": 0.5,
                             "weight": 1}
 
-highlight = folium.features.GeoJson(data = geojson_url,
+highlight = folium.features.GeoJson(data = copiar_features(geojson_data),
                                    style_function = estilo,
                                    highlight_function = estilo_destaque,
                                    name = "Destaque")
@@ -96,8 +110,7 @@ with col2:
 st.subheader("2 Qual a quantidade de abandonos por ano letivo?")
 
 
-datas = df_raw[df_raw["situacao_ultimo_periodo_letivo"] == "Abandonou"]
-datas = pd.DataFrame(datas["ano_let_atual"].value_counts()).reset_index().sort_values("ano_let_atual")
+datas = tabelas["abandonos_por_ano"]
 
 
 
@@ -151,7 +164,7 @@ st.subheader("3 Qual o total de matriculas por sexo por ano ?")
 
 
 # Agrupando os dados
-df_agrupado = df_raw.groupby(["ano_letivo_ini", "sexo"]).size().reset_index(name="qtd_matriculas")
+df_agrupado = tabelas["matriculas_ano_sexo"]
 
 # Gráfico com Plotly Express
 fig3 = px.bar(
@@ -167,13 +180,16 @@ fig3 = px.bar(
 # Exibindo no Streamlit
 st.plotly_chart(fig3)
 
-# Curva
-fig3 = go.Figure(go.Scatter(x = df_gen["sexo"],
-                          y = df_gen["count"],
-                          mode = "lines",
-                          line_shape = "spline",
-                          line = dict(color = "rgb(82,106,131)",
-                                     width = 4)))
+# Curva: uma linha por sexo, a partir do df_gen (ano x sexo)
+df_gen = tabelas["matriculas_por_sexo"]
+fig3 = go.Figure()
+for sexo in df_gen.columns.drop("ano_letivo_ini"):
+    fig3.add_trace(go.Scatter(x = df_gen["ano_letivo_ini"],
+                              y = df_gen[sexo],
+                              mode = "lines",
+                              line_shape = "spline",
+                              name = sexo,
+                              line = dict(width = 4)))
 
 # Pontos
 #ig3.add_trace(go.Scatter(x = datas["sexo"],
@@ -0,0 +1,199 @@
+import json
+import os
+from functools import lru_cache
+
+import branca.colormap
+import branca.utilities
+import folium
+import numpy as np
+
+from carga import em_cache, versao_arquivo
+from geo import MUNICIPIOS_CE, ler_json, resolver
+from topologia import caminho_nivel, decodificar, gerar_niveis, nivel_para_zoom
+
+CENTRO_CEARA = [-5.2637315250639025, -39.576651414308046]
+ZOOM_INICIAL = 6.5
+
+ESTILO_TOOLTIP = "background-color: white; color: black; font-family: arial; font-size: 16px; padding: 10px;"
+
+
+def carregar_geojson(camada=MUNICIPIOS_CE, zoom=None):
+    """GeoJSON da camada (ver geo.CAMADAS), lido uma vez por versão do arquivo.
+
+    Com `zoom`, usa o TopoJSON simplificado do nível de detalhe adequado
+    (gerado na primeira vez, ou quando o GeoJSON original mudar). O TopoJSON
+    só economiza disco: ele é decodificado de volta para GeoJSON, porque a
+    camada TopoJson do folium não tem destaque, e o navegador recebe o
+    GeoJSON já simplificado. Quem escolhe o zoom é quem chama; a camada
+    dinâmica da análise usa o zoom que o st_folium devolve.
+    """
+    caminho = resolver(camada)
+    if zoom is None:
+        return ler_json(caminho)
+
+    nivel = nivel_para_zoom(zoom)
+    caminho_topo = caminho_nivel(nivel, caminho)
+    if not os.path.exists(caminho_topo) or os.path.getmtime(caminho_topo) < os.path.getmtime(caminho):
+        gerar_niveis(caminho)
+
+    def ler_topologia():
+        with open(caminho_topo, encoding="utf-8") as f:
+            return decodificar(json.load(f))
+    return em_cache(("geojson", caminho, nivel), versao_arquivo(caminho_topo), ler_topologia)
+
+
+def copiar_features(geojson, propriedades=None):
+    """Cópia rasa do GeoJSON: geometrias compartilhadas, propriedades novas.
+
+    O folium grava o estilo dentro de feature["properties"], então o objeto
+    em cache nunca é entregue diretamente a ele.
+    """
+    propriedades = propriedades or (lambda feature: {})
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "properties": {**feature["properties"], **propriedades(feature)},
+                "geometry": feature["geometry"],
+            }
+            for feature in geojson["features"]
+        ],
+    }
+
+
+def codigo_ibge(feature):
+    """Código IBGE (inteiro) do município, chave da junção com as matrículas."""
+    return int(feature["properties"]["id"])
+
+
+def _novo_mapa():
+    mapa = folium.Map(CENTRO_CEARA, tiles="cartodbpositron", zoom_start=ZOOM_INICIAL)
+
+    # Camada de fundo (opcional)
+    folium.TileLayer(
+        tiles=branca.utilities.image_to_url([[1, 1], [1, 1]]),
+        attr="Carlos Bezerra", name="Imagem Fundo"
+    ).add_to(mapa)
+    return mapa
+
+
+@lru_cache(maxsize=None)
+def mapa_base():
+    """Mapa estático (tiles e fundo), montado uma vez por processo.
+
+    Os dados entram como camada dinâmica via st_folium(feature_group_to_add=...),
+    então o navegador não precisa remontar o mapa a cada filtro.
+    """
+    return _novo_mapa()
+
+
+def escala_cores(valores, paleta="Reds", n_faixas=6):
+    """Mesma escala em faixas lineares que o folium.Choropleth usa por padrão."""
+    valores = np.asarray(valores, dtype=float)
+    if not len(valores):
+        valores = np.array([0.0, 1.0])
+    limites = np.histogram_bin_edges(valores, bins=n_faixas)
+    return branca.colormap.StepColormap(
+        branca.utilities.color_brewer(paleta, n_faixas),
+        index=limites, vmin=limites[0], vmax=limites[-1],
+        caption="Alunos"
+    )
+
+
+def camada_frequencias(geojson, df_mapa, paleta="Reds"):
+    """Camada única com preenchimento, destaque e tooltip por município.
+
+    `df_mapa` traz as colunas cod_ibge e frequencia.
+
+    Substitui o par Choropleth + GeoJson de destaque, que mandava a mesma
+    geometria duas vezes. Retorna a camada e a escala de cores.
+    """
+    frequencias = dict(zip(df_mapa["cod_ibge"], df_mapa["frequencia"]))
+    escala = escala_cores(list(frequencias.values()), paleta)
+    dados = copiar_features(
+        geojson,
+        lambda feature: {"frequencia": int(frequencias.get(codigo_ibge(feature), 0))}
+    )
+
+    def estilo(feature):
+        frequencia = feature["properties"]["frequencia"]
+        return {
+            "fillColor": escala(frequencia) if frequencia else "white",
+            "color": "black",
+            "weight": 1,
+            "fillOpacity": 0.9,
+            "opacity": 0.5,
+        }
+
+    estilo_destaque = lambda x: {"fillColor": "darkblue", "color": "black", "fillOpacity": 0.5, "weight": 1}
+
+    camada = folium.FeatureGroup(name="Dados")
+    geojson_layer = folium.GeoJson(
+        dados,
+        style_function=estilo,
+        highlight_function=estilo_destaque,
+        name="Dados",
+        tooltip=folium.GeoJsonTooltip(
+            fields=["name", "frequencia"],
+            aliases=["cidade", "alunos"],
+            labels=True,
+            style=ESTILO_TOOLTIP
+        )
+    )
+    geojson_layer.add_to(camada)
+    return camada, escala
+
+
+def tamanho_camada(elemento):
+    """Bytes do GeoJSON que a camada (ou o mapa inteiro) envia ao navegador.
+
+    Percorre os filhos, então conta também o GeoJson que o Choropleth cria
+    dentro de si; mede sem renderizar o HTML do mapa.
+    """
+    total = 0
+    for filho in elemento._children.values():
+        if isinstance(filho, folium.GeoJson):
+            total += len(json.dumps(filho.data))
+        total += tamanho_camada(filho)
+    return total
+
+
+def mapa_classico(geojson, df_mapa):
+    """Mapa completo montado a cada execução (Choropleth + camada de destaque).
+
+    `df_mapa` traz as colunas cod_ibge e frequencia.
+    """
+    mapa_ceara = _novo_mapa()
+
+    # Mapa coroplético
+    folium.Choropleth(
+        geo_data=copiar_features(geojson, lambda feature: {"cod_ibge": codigo_ibge(feature)}),
+        data=df_mapa,
+        columns=["cod_ibge", "frequencia"],
+        key_on="feature.properties.cod_ibge",
+        fill_color="Reds",
+        fill_opacity=0.9,
+        line_opacity=0.5,
+        legend_name="Alunos",
+        nan_fill_color="white",
+        name="Dados"
+    ).add_to(mapa_ceara)
+
+    # Destaque
+    estilo = lambda x: {"fillColor": "white", "color": "black", "fillOpacity": 0.001, "weight": 0.001}
+    estilo_destaque = lambda x: {"fillColor": "darkblue", "color": "black", "fillOpacity": 0.5, "weight": 1}
+    highlight = folium.features.GeoJson(
+        data=copiar_features(geojson),
+        style_function=estilo,
+        highlight_function=estilo_destaque,
+        name="Destaque"
+    )
+    folium.features.GeoJsonTooltip(
+        fields=["name",],
+        aliases=["cidade"],
+        labels=False,
+        style=ESTILO_TOOLTIP
+    ).add_to(highlight)
+    mapa_ceara.add_child(highlight)
+    return mapa_ceara
@@ -0,0 +1,100 @@
+import unicodedata
+
+import pandas as pd
+
+from geo import MUNICIPIOS_CE, carregar
+
+UF_GEOJSON = "CE"
+
+# Nomes oficiais atuais que o GeoJSON ainda grava com a grafia antiga
+# (já normalizados)
+APELIDOS = {
+    "itapaje": "itapage",
+}
+
+
+def normalizar_nome(nome):
+    """'Maracanaú ' -> 'maracanau': sem acentos, sem caixa e sem espaços extras."""
+    sem_acento = unicodedata.normalize("NFKD", nome)
+    sem_acento = "".join(c for c in sem_acento if not unicodedata.combining(c))
+    return " ".join(sem_acento.casefold().split())
+
+
+def separar_uf(texto_cidade):
+    """'Fortaleza - CE' -> ('Fortaleza', 'CE'), de forma vetorizada."""
+    # Sem nenhum " - " (ou sem linhas) o expand não cria a coluna da UF
+    partes = texto_cidade.str.rsplit(" - ", n=1, expand=True).reindex(columns=[0, 1]).astype(object)
+    return partes[0].str.strip(), partes[1].str.strip().str.upper()
+
+
+def codigos_por_nome(camada=MUNICIPIOS_CE):
+    """Dicionário nome normalizado -> código IBGE dos municípios da camada."""
+    geojson = carregar(camada)
+    codigos = {
+        normalizar_nome(feature["properties"]["name"]): int(feature["properties"]["id"])
+        for feature in geojson["features"]
+    }
+    for apelido, nome in APELIDOS.items():
+        if nome in codigos:
+            codigos.setdefault(apelido, codigos[nome])
+    return codigos
+
+
+def ibge_por_nome(texto_cidade, codigos=None, uf=UF_GEOJSON):
+    """Código IBGE (Int64) de cada linha só pelo nome em texto_cidade.
+
+    Os nomes são normalizados só uma vez por valor distinto.
+    """
+    codigos = codigos_por_nome() if codigos is None else codigos
+
+    indices, textos = pd.factorize(texto_cidade)
+    nomes, ufs = separar_uf(pd.Series(textos, dtype=object))
+    resolvidos = [
+        codigos.get(normalizar_nome(nome)) if isinstance(nome, str) and (sigla is None or sigla == uf) else None
+        for nome, sigla in zip(nomes, ufs.where(ufs.notna(), None))
+    ]
+    tabela = pd.array(resolvidos + [None], dtype="Int64")
+    return pd.Series(tabela[indices], index=texto_cidade.index, name="cod_ibge")
+
+
+def _mais_comum(cod_cidade, ibge):
+    conhecidos = pd.DataFrame({"cod_cidade": cod_cidade, "cod_ibge": ibge}).dropna()
+    return conhecidos.groupby("cod_cidade")["cod_ibge"].agg(lambda s: s.mode().iloc[0])
+
+
+def ibge_por_cod_cidade(df, codigos=None, uf=UF_GEOJSON):
+    """Tabela cod_cidade -> código IBGE mais comum entre as linhas de `df`
+    (colunas texto_cidade e cod_cidade) resolvidas pelo nome."""
+    return _mais_comum(df["cod_cidade"], ibge_por_nome(df["texto_cidade"], codigos, uf))
+
+
+def associar_ibge(df, codigos=None, uf=UF_GEOJSON, por_cod_cidade=None):
+    """Código IBGE (Int64) de cada linha a partir de texto_cidade.
+
+    Linhas cujo nome não bate (grafia diferente, texto vazio) herdam o
+    código IBGE mais comum entre as linhas resolvidas com o mesmo
+    cod_cidade. Essa tabela vem das próprias linhas de `df`; com
+    `por_cod_cidade` (ver ibge_por_cod_cidade), ela tem precedência, para
+    que um lote de linhas alteradas use a mesma tabela da base inteira.
+    """
+    ibge = ibge_por_nome(df["texto_cidade"], codigos, uf)
+
+    # Reaproveita o cod_cidade do sistema acadêmico para quem ficou sem código
+    if "cod_cidade" in df.columns and ibge.isna().any():
+        tabela = _mais_comum(df["cod_cidade"], ibge)
+        if por_cod_cidade is not None:
+            tabela = por_cod_cidade.combine_first(tabela)
+        if len(tabela):
+            ibge = ibge.fillna(df["cod_cidade"].map(tabela).astype("Int64"))
+    return ibge
+
+
+def sem_municipio(df):
+    """Relatório das linhas que não foram associadas a um município do mapa."""
+    faltantes = df.loc[df["cod_ibge"].isna(), "texto_cidade"]
+    return (
+        faltantes.astype(object).fillna("(vazio)")
+        .value_counts()
+        .rename_axis("texto_cidade")
+        .reset_index(name="matriculas")
+    )
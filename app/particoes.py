@@ -0,0 +1,248 @@
+"""Matrículas preparadas em partições por curso, ano e semestre de ingresso.
+
+Cada partição (matriz_estrutura_curso, ano_letivo_ini, periodo_letivo_ini)
+é um Feather sem compressão cortado do snapshot, com as mesmas colunas e
+tipos. estatisticas.json guarda, por partição, as chaves, as linhas, os
+bytes e o mínimo/máximo das colunas numéricas e de data. A poda consulta só
+esse arquivo: partições que o piso de ano, a seleção da barra lateral ou o
+curso escolhido não podem conter nem são abertas.
+
+Quando o snapshot muda, só as partições cujo conteúdo mudou são regravadas,
+numa pasta de geração nova: cada partição tem uma assinatura (os hashes
+das linhas e o cod_ibge) e as que continuam iguais ficam no arquivo da
+geração em que foram gravadas. O estatisticas.json passa a apontar para a
+mistura de gerações e os arquivos que ninguém cita mais são apagados (quem
+já mapeou um arquivo antigo continua lendo normalmente). Como as categorias
+das gerações podem diferir, carga.carregar_particoes as une na leitura.
+
+Uso: python app/particoes.py [--csv Data/matriculasFinal-phase2.csv] [--forcar]
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+from contextlib import suppress
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+
+from snapshot import CAMINHO_CSV, VERSAO_SNAPSHOT, garantir_snapshot, gravando
+
+CHAVES = ["matriz_estrutura_curso", "ano_letivo_ini", "periodo_letivo_ini"]
+ARQUIVO_ESTATISTICAS = "estatisticas.json"
+ARQUIVO_VAZIO = "vazio.feather"
+
+# Colunas sem utilidade para a poda, fora das estatísticas
+SEM_ESTATISTICAS = {"hash_linha"}
+
+
+def caminho_particoes(caminho_csv=CAMINHO_CSV):
+    """Data/arquivo.csv -> Data/arquivo.particoes"""
+    return os.path.splitext(caminho_csv)[0] + ".particoes"
+
+
+def _origem(snapshot):
+    """Identifica o snapshot de onde as partições foram cortadas."""
+    info = os.stat(snapshot)
+    return {"versao_snapshot": VERSAO_SNAPSHOT, "mtime_ns": info.st_mtime_ns, "tamanho": info.st_size}
+
+
+def ler_estatisticas(pasta):
+    """Conteúdo de estatisticas.json, ou None se ainda não existe."""
+    try:
+        with open(os.path.join(pasta, ARQUIVO_ESTATISTICAS), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _texto(valor):
+    return None if valor is None else str(valor)
+
+
+def _extremos(tabela):
+    """Mínimo e máximo das colunas numéricas e de data da partição."""
+    minimos, maximos = {}, {}
+    for campo in tabela.schema:
+        if campo.name in SEM_ESTATISTICAS:
+            continue
+        if pa.types.is_integer(campo.type) or pa.types.is_floating(campo.type) or pa.types.is_temporal(campo.type):
+            extremos = pc.min_max(tabela[campo.name])
+            minimos[campo.name], maximos[campo.name] = extremos["min"].as_py(), extremos["max"].as_py()
+            if pa.types.is_temporal(campo.type):
+                # Como ficam no JSON, para o resultado ser igual ao que ler_estatisticas devolve
+                minimos[campo.name], maximos[campo.name] = _texto(minimos[campo.name]), _texto(maximos[campo.name])
+    return minimos, maximos
+
+
+def _assinatura(parte):
+    """Identifica o conteúdo da partição, sem depender da ordem das linhas.
+
+    hash_linha cobre o CSV bruto; cod_ibge entra à parte porque depende
+    também da tabela de municípios (ver municipios.associar_ibge).
+    """
+    linhas = parte["hash_linha"].to_numpy()
+    ibge = pc.fill_null(parte["cod_ibge"], -1).to_numpy()
+    ordem = np.lexsort((ibge, linhas))
+    return hashlib.sha1(linhas[ordem].tobytes() + ibge[ordem].tobytes()).hexdigest()
+
+
+def _gravar_particao(parte, pasta, relativo):
+    destino = os.path.join(pasta, relativo)
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    with gravando(destino) as temporario:
+        feather.write_feather(parte, temporario, compression="uncompressed")
+    return os.path.getsize(destino)
+
+
+def _remover_sem_uso(pasta, estatisticas):
+    """Apaga as gerações e os arquivos de partição que as estatísticas não citam mais."""
+    citados = {os.path.normpath(p["arquivo"]) for p in estatisticas["particoes"]}
+    citados.add(os.path.normpath(estatisticas["vazio"]))
+    geracoes = {arquivo.split(os.sep)[0] for arquivo in citados}
+    for nome in os.listdir(pasta):
+        if not nome.startswith("geracao-"):
+            continue
+        if nome not in geracoes:
+            shutil.rmtree(os.path.join(pasta, nome), ignore_errors=True)
+            continue
+        for raiz, _, arquivos in os.walk(os.path.join(pasta, nome), topdown=False):
+            for arquivo in arquivos:
+                caminho = os.path.join(raiz, arquivo)
+                # .tmp: gravação em andamento de outro processo
+                if not arquivo.endswith(".tmp") and os.path.relpath(caminho, pasta) not in citados:
+                    with suppress(OSError):
+                        os.remove(caminho)
+            if raiz != os.path.join(pasta, nome):
+                with suppress(OSError):
+                    os.rmdir(raiz)      # só sai se ficou vazia
+
+
+def construir_particoes(caminho_csv=CAMINHO_CSV, pasta=None, reaproveitar=True):
+    """Corta o snapshot em partições e grava as estatísticas; devolve as estatísticas.
+
+    Com `reaproveitar`, as partições com a mesma assinatura das atuais não
+    são regravadas; sem ele, todas vão para a geração nova.
+    """
+    pasta = pasta or caminho_particoes(caminho_csv)
+    snapshot = garantir_snapshot(caminho_csv)
+    origem = _origem(snapshot)
+    geracao = f"geracao-{origem['mtime_ns']}"
+
+    # Um dicionário só por coluna: toda partição da mesma geração leva as
+    # mesmas categorias, então a concatenação de várias continua category
+    tabela = feather.read_table(snapshot, memory_map=True).unify_dictionaries()
+    chaves = tabela.select(CHAVES).to_pandas()
+
+    anteriores = ler_estatisticas(pasta) if reaproveitar else None
+    if anteriores is None or anteriores["origem"]["versao_snapshot"] != VERSAO_SNAPSHOT:
+        anteriores = {"particoes": [], "vazio": None}
+    por_chave = {tuple(p[col] for col in CHAVES): p for p in anteriores["particoes"]}
+
+    particoes = []
+    for valores, posicoes in chaves.groupby(CHAVES, dropna=False, sort=True).indices.items():
+        valores = [None if pd.isna(valor) else int(valor) for valor in valores]
+        parte = tabela.take(posicoes)
+        assinatura = _assinatura(parte)
+        anterior = por_chave.get(tuple(valores))
+        if (anterior is not None and anterior.get("assinatura") == assinatura
+                and os.path.exists(os.path.join(pasta, anterior["arquivo"]))):
+            particoes.append(anterior)
+            continue
+
+        relativo = os.path.join(geracao, *[f"{col}={valor}" for col, valor in zip(CHAVES[:-1], valores[:-1])],
+                                f"{CHAVES[-1]}={valores[-1]}.feather")
+        minimos, maximos = _extremos(parte)
+        particoes.append({
+            "arquivo": relativo,
+            **dict(zip(CHAVES, valores)),
+            "linhas": len(posicoes),
+            "bytes": _gravar_particao(parte, pasta, relativo),
+            "assinatura": assinatura,
+            "minimos": minimos,
+            "maximos": maximos,
+        })
+
+    # Lida quando a poda não deixa nenhuma partição: mesmas colunas, zero linhas
+    vazio = anteriores["vazio"]
+    if vazio is None or not os.path.exists(os.path.join(pasta, vazio)):
+        vazio = os.path.join(geracao, ARQUIVO_VAZIO)
+        _gravar_particao(tabela.slice(0, 0), pasta, vazio)
+
+    estatisticas = {"origem": origem, "geracao": geracao, "vazio": vazio, "particoes": particoes}
+    with gravando(os.path.join(pasta, ARQUIVO_ESTATISTICAS)) as temporario:
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(estatisticas, f, ensure_ascii=False, indent=1, default=str)
+
+    _remover_sem_uso(pasta, estatisticas)
+    return estatisticas
+
+
+def garantir_particoes(caminho_csv=CAMINHO_CSV, pasta=None):
+    """Estatísticas das partições, recortando de novo se o snapshot mudou."""
+    pasta = pasta or caminho_particoes(caminho_csv)
+    snapshot = garantir_snapshot(caminho_csv)
+    estatisticas = ler_estatisticas(pasta)
+    if estatisticas is None or estatisticas["origem"] != _origem(snapshot):
+        estatisticas = construir_particoes(caminho_csv, pasta)
+    return estatisticas
+
+
+def podar(particoes, ano_minimo=None, selecao=None, matrizes=None):
+    """Partições que podem ter linhas do recorte, pela chave de cada uma.
+
+    `selecao` é a dos filtros da barra lateral; só ano_letivo_ini e
+    periodo_letivo_ini são chaves de partição, as outras dimensões ficam
+    para o filtro em memória. Listas vazias não restringem.
+    """
+    selecao = selecao or {}
+    restricoes = {
+        "matriz_estrutura_curso": matrizes,
+        "ano_letivo_ini": selecao.get("ano_letivo_ini"),
+        "periodo_letivo_ini": selecao.get("periodo_letivo_ini"),
+    }
+    restricoes = {col: {int(valor) for valor in valores} for col, valores in restricoes.items() if valores}
+
+    escolhidas = []
+    for particao in particoes:
+        ano = particao["ano_letivo_ini"]
+        if ano_minimo is not None and (ano is None or ano < ano_minimo):
+            continue
+        if any(particao[col] not in valores for col, valores in restricoes.items()):
+            continue
+        escolhidas.append(particao)
+    return escolhidas
+
+
+def ler_particao(caminho):
+    """Uma partição via memory map (numéricas sem cópia, como no snapshot)."""
+    return feather.read_table(caminho, memory_map=True).to_pandas(split_blocks=True)
+
+
+def valores_chave(estatisticas, coluna, ano_minimo=None, matrizes=None):
+    """Valores distintos de uma chave de partição, sem abrir nenhuma partição.
+
+    Com `ano_minimo` e `matrizes`, só os das partições que sobrevivem à poda.
+    """
+    particoes = podar(estatisticas["particoes"], ano_minimo, matrizes=matrizes)
+    return sorted({p[coluna] for p in particoes if p[coluna] is not None})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera as partições por curso, ano e semestre")
+    parser.add_argument("--csv", default=CAMINHO_CSV, help="CSV exportado pelo sistema acadêmico")
+    parser.add_argument("--forcar", action="store_true", help="regrava todas as partições, mesmo se estiverem atualizadas")
+    args = parser.parse_args()
+
+    if args.forcar:
+        estatisticas = construir_particoes(args.csv, reaproveitar=False)
+    else:
+        estatisticas = garantir_particoes(args.csv)
+    tabela = pd.DataFrame(estatisticas["particoes"], columns=CHAVES + ["linhas", "bytes"])
+    print(tabela.to_string(index=False))
+    print(f"\n{len(tabela)} partições, {tabela['linhas'].sum()} linhas, "
+          f"{tabela['bytes'].sum() / 1024 / 1024:.1f} MB em {caminho_particoes(args.csv)}")
@@ -0,0 +1,233 @@
+"""Pipeline da análise exploratória: carregar -> normalizar -> derivar -> agregar.
+
+O notebook Notebooks/main_ifce.ipynb e o painel principal (main.py) chamam
+executar() e compartilham o cache em disco. A segunda_analise.py não usa
+executar(): ela lê o snapshot em partições e responde pelo cubo e pelo
+índice de filtros, mas o snapshot passa pelas mesmas regras
+(normalizar_colunas e derivar_indicadores de transformacoes.py).
+
+Cada etapa grava sua saída em PASTA_CACHE (pickle). A chave de uma etapa é o
+sha256 da chave da entrada (a da etapa anterior; na primeira, caminho, mtime
+e tamanho do CSV), do código da função e dos parâmetros. O código inclui o
+das funções e tabelas do projeto que a etapa usa, então mudar uma regra em
+transformacoes.py também invalida a etapa. Como a chave de uma etapa entra
+na da seguinte, trocar uma etapa (p.ex. por uma função definida numa célula
+do notebook, via `substituir`) recalcula só ela e as posteriores; as
+anteriores vêm do disco, e nem são lidas se uma posterior já está em cache.
+
+Uso: python app/pipeline.py [--csv Data/matriculasFinal-phase2.csv] [--ate derivar] [--forcar]
+"""
+import argparse
+import glob
+import hashlib
+import inspect
+import os
+import time
+
+import pandas as pd
+
+from carga import versao_arquivo
+from esquema import ler_csv
+from municipios import associar_ibge
+from snapshot import CAMINHO_CSV
+from transformacoes import calcular_idade, derivar_indicadores, mapear_categorias, normalizar_colunas
+
+PASTA_CACHE = os.environ.get("PAINEL_CACHE_PIPELINE", "Data/cache_pipeline")
+PASTA_APP = os.path.dirname(os.path.abspath(__file__))
+
+# Rede da escola de origem: as três esferas públicas viram "Pública"
+REDE_POR_TIPO_ESCOLA = {
+    "Pública Estadual": "Pública",
+    "Pública Federal": "Pública",
+    "Pública Municipal": "Pública",
+}
+
+
+def carregar(caminho_csv, **kwargs):
+    """Export completo, tipado pelo esquema e com nomes em snake_case.
+
+    `kwargs` vão para a leitura (p.ex. nrows=5 para uma amostra).
+    """
+    return ler_csv(caminho_csv, **kwargs)
+
+
+def derivar(df, hoje=None):
+    """Colunas derivadas do painel (indicadores, cod_ibge e idade) e as da
+    análise exploratória: rede da escola de origem e ano/semestre do último
+    evento."""
+    df = derivar_indicadores(df)
+    df["cod_ibge"] = associar_ibge(df)
+    df["rede_escola_origem"] = mapear_categorias(df["desc_tipo_escola_origem"], REDE_POR_TIPO_ESCOLA)
+    evento = df["dt_ultimo_evento"]
+    df["ano_letivo_ultimo_evento"] = evento.dt.year.astype("Int64")
+    df["periodo_letivo_ultimo_evento"] = ((evento.dt.month - 1) // 6 + 1).astype("Int64")
+    return calcular_idade(df, hoje)
+
+
+def situacao_por_sexo(df):
+    """Percentual de cada situação de matrícula dentro de cada sexo e a diferença M - F."""
+    tabela = pd.crosstab(df["desc_sit_matricula"], df["sexo"].astype(str), normalize="columns") * 100
+    tabela = tabela.reindex(columns=["F", "M"], fill_value=0.0)
+    tabela = tabela.rename(columns={"F": "feminino", "M": "masculino"}).rename_axis(columns=None)
+    tabela["delta"] = tabela["masculino"] - tabela["feminino"]
+    return tabela.reset_index()
+
+
+def agregados(df):
+    """Tabelas das perguntas do painel principal e do notebook, por nome."""
+    por_cidade = df["cidade"].value_counts()
+    por_cidade = por_cidade[por_cidade > 0].rename_axis("cidade").reset_index(name="frequencia")
+
+    abandonos = df.loc[df["situacao_ultimo_periodo_letivo"] == "Abandonou", "ano_let_atual"].value_counts()
+    abandonos = abandonos.rename_axis("ano_let_atual").reset_index(name="count").sort_values("ano_let_atual")
+
+    ano_sexo = df.groupby(["ano_letivo_ini", df["sexo"].astype(str)], observed=True).size()
+    return {
+        "por_cidade": por_cidade,
+        "por_cod_ibge": df["cod_ibge"].value_counts().rename_axis("cod_ibge").reset_index(name="frequencia"),
+        "abandonos_por_ano": abandonos,
+        "matriculas_ano_sexo": ano_sexo.reset_index(name="qtd_matriculas"),
+        # Uma coluna por sexo (o df_gen do notebook)
+        "matriculas_por_sexo": ano_sexo.unstack("sexo", fill_value=0).rename_axis(columns=None).reset_index(),
+        "situacao_por_sexo": situacao_por_sexo(df),
+    }
+
+
+ETAPAS = {
+    "carregar": carregar,
+    "normalizar": normalizar_colunas,
+    "derivar": derivar,
+    "agregar": agregados,
+}
+
+
+def _sha256(*partes):
+    return hashlib.sha256("\0".join(partes).encode("utf-8")).hexdigest()
+
+
+def _nomes_usados(codigo):
+    """Nomes globais lidos pelo código, inclusive em lambdas e compreensões."""
+    nomes = list(codigo.co_names)
+    for constante in codigo.co_consts:
+        if inspect.iscode(constante):
+            nomes += _nomes_usados(constante)
+    return nomes
+
+
+def _do_projeto(funcao):
+    """Funções de app/ ou definidas no próprio notebook/script."""
+    modulo = inspect.getmodule(funcao)
+    if modulo is None or modulo.__name__ == "__main__":
+        return True
+    arquivo = getattr(modulo, "__file__", None)
+    return arquivo is not None and os.path.dirname(os.path.abspath(arquivo)) == PASTA_APP
+
+
+def assinatura(funcao):
+    """sha256 do código da função e das funções e tabelas do projeto que ela usa."""
+    partes, pendentes, vistas = [], [funcao], set()
+    while pendentes:
+        atual = inspect.unwrap(pendentes.pop())
+        if atual in vistas:
+            continue
+        vistas.add(atual)
+        try:
+            partes.append(inspect.getsource(atual))
+        except (OSError, TypeError):
+            partes.append(atual.__code__.co_code.hex())
+        for nome in _nomes_usados(atual.__code__):
+            valor = atual.__globals__.get(nome)
+            if callable(valor) and inspect.isfunction(inspect.unwrap(valor)):
+                if _do_projeto(inspect.unwrap(valor)):
+                    pendentes.append(valor)
+            elif isinstance(valor, (set, frozenset)):
+                # Conjuntos não têm ordem estável entre processos
+                partes.append(f"{nome} = {sorted(map(repr, valor))}")
+            elif isinstance(valor, (str, int, float, tuple, list, dict)):
+                partes.append(f"{nome} = {valor!r}")
+    return _sha256(*partes)
+
+
+def chaves_etapas(caminho_csv, etapas, parametros):
+    """Chave de cada etapa, encadeada a partir da versão do CSV."""
+    chave = _sha256(repr(versao_arquivo(caminho_csv)))
+    chaves = {}
+    for nome, funcao in etapas.items():
+        chave = _sha256(chave, nome, assinatura(funcao), repr(sorted(parametros.get(nome, {}).items())))
+        chaves[nome] = chave
+    return chaves
+
+
+def _arquivo(pasta, nome, chave):
+    return os.path.join(pasta, f"{nome}-{chave[:20]}.pkl")
+
+
+def _gravar(valor, pasta, nome, chave):
+    """Grava a saída da etapa e apaga as versões anteriores dela."""
+    os.makedirs(pasta, exist_ok=True)
+    destino = _arquivo(pasta, nome, chave)
+    temporario = destino + ".tmp"
+    pd.to_pickle(valor, temporario)
+    os.replace(temporario, destino)
+    for antigo in glob.glob(os.path.join(pasta, f"{nome}-*.pkl")):
+        if antigo != destino:
+            os.remove(antigo)
+
+
+def executar(caminho_csv=CAMINHO_CSV, ate="agregar", hoje=None, substituir=None,
+             pasta=PASTA_CACHE, forcar=False, registro=None):
+    """Saída da etapa `ate`, recalculando só as etapas cuja chave mudou.
+
+    `substituir` troca etapas por nome ({"agregar": minha_funcao}); cada
+    etapa recebe a saída da anterior. `hoje` é a data de referência da idade
+    (padrão: hoje), que por isso entra na chave de "derivar". Em `registro`
+    (lista) entra uma linha por etapa: origem (disco, calculada ou pulada),
+    segundos e chave.
+    """
+    etapas = {**ETAPAS, **(substituir or {})}
+    nomes = list(etapas)
+    etapas = {nome: etapas[nome] for nome in nomes[:nomes.index(ate) + 1]}
+    parametros = {"derivar": {"hoje": pd.Timestamp("today" if hoje is None else hoje).normalize()}}
+    chaves = chaves_etapas(caminho_csv, etapas, parametros)
+    registro = [] if registro is None else registro
+
+    # Parte da última etapa que já está em disco
+    valor, pendentes = caminho_csv, list(etapas)
+    if not forcar:
+        for posicao in reversed(range(len(pendentes))):
+            nome = pendentes[posicao]
+            arquivo = _arquivo(pasta, nome, chaves[nome])
+            if os.path.exists(arquivo):
+                inicio = time.perf_counter()
+                valor = pd.read_pickle(arquivo)
+                registro += [{"etapa": anterior, "origem": "pulada", "segundos": 0.0, "chave": chaves[anterior][:12]}
+                             for anterior in pendentes[:posicao]]
+                registro.append({"etapa": nome, "origem": "disco",
+                                 "segundos": time.perf_counter() - inicio, "chave": chaves[nome][:12]})
+                pendentes = pendentes[posicao + 1:]
+                break
+
+    for nome in pendentes:
+        inicio = time.perf_counter()
+        valor = etapas[nome](valor, **parametros.get(nome, {}))
+        _gravar(valor, pasta, nome, chaves[nome])
+        registro.append({"etapa": nome, "origem": "calculada",
+                         "segundos": time.perf_counter() - inicio, "chave": chaves[nome][:12]})
+    return valor
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Executa o pipeline da análise com cache em disco por etapa")
+    parser.add_argument("--csv", default=CAMINHO_CSV, help="CSV exportado pelo sistema acadêmico")
+    parser.add_argument("--ate", default="agregar", choices=list(ETAPAS), help="última etapa executada")
+    parser.add_argument("--forcar", action="store_true", help="recalcula todas as etapas")
+    args = parser.parse_args()
+
+    registro = []
+    resultado = executar(args.csv, args.ate, forcar=args.forcar, registro=registro)
+    print(pd.DataFrame(registro).round(3).to_string(index=False))
+    if isinstance(resultado, dict):
+        for nome, tabela in resultado.items():
+            print(f"\n{nome}\n{tabela.head(10).to_string(index=False)}")
+    else:
+        print(f"\n{len(resultado)} linhas, {resultado.shape[1]} colunas")
@@ -0,0 +1,251 @@
+"""Relatórios estáticos das cinco análises para vários recortes de filtros.
+
+Gera, sem o Streamlit, os mesmos gráficos da página "Análise" da
+segunda_analise.py (barras, pizzas, linhas de proporção, box plots e o mapa
+coroplético) para cada combinação de ano letivo inicial, sexo e grupo de
+raça/cor. Cada recorte vira uma pasta com index.html, mapa.html,
+figuras.json e, se o kaleido estiver instalado, um PNG por gráfico.
+
+Os dados são preparados uma vez no processo principal. Com fork (Linux) os
+processos do pool herdam esses objetos sem copiá-los; com spawn cada
+processo lê o snapshot colunar (memory map), nunca o CSV.
+
+Uso: python app/relatorios.py --saida relatorios --processos 4 --anos 2019 2020
+"""
+import argparse
+import importlib.util
+import itertools
+import json
+import multiprocessing
+import os
+import time
+
+from carga import ativar_copy_on_write, carregar_particoes
+from cubo import CuboContagens
+from filtros import IndiceFiltros
+from graficos import (
+    abandono_por_ano, barras_cor, barras_escola, box_agregado, curvas_permanencia, cursando_por_ano,
+    distribuicao_grupo, distribuicao_idade, distribuicao_sexo, distribuicao_status,
+    idade_media, incidencia_acumulada, proporcao_cor_ano, proporcao_sexo_ano, status_por_ano
+)
+from mapa import ZOOM_INICIAL, carregar_geojson, mapa_classico
+from municipios import normalizar_nome
+from sobrevivencia import tabela_vida
+from transformacoes import GRUPO_PADRAO, GRUPO_POR_COR, snake_case
+
+ANO_INICIAL = 2014
+
+
+def _box(x, y, title):
+    return lambda contexto, selecao: box_agregado(contexto.recorte(selecao), x, y, title)
+
+
+def _vida(construtor, title):
+    return lambda contexto, selecao: construtor(
+        tabela_vida(contexto.recorte(selecao), por=["ano_letivo_ini"]), "ano_letivo_ini", title
+    )
+
+
+def _do_cubo(construtor):
+    return lambda contexto, selecao: construtor(contexto.cubo, selecao)
+
+
+# Mesma ordem e títulos da página "Análise"
+PERGUNTAS = [
+    ("1. Perfil dos alunos", [
+        ("distribuicao_idade", "Distribuição de idade", _do_cubo(distribuicao_idade)),
+        ("distribuicao_sexo", "Distribuição por sexo", _do_cubo(distribuicao_sexo)),
+        ("proporcao_sexo_ano", "Evolução da proporção de sexo por ano letivo", _do_cubo(proporcao_sexo_ano)),
+        ("distribuicao_grupo", "Distribuição por raça/cor", _do_cubo(distribuicao_grupo)),
+        ("proporcao_cor_ano", "Evolução da proporção de raça/cor por ano letivo", _do_cubo(proporcao_cor_ano)),
+        ("barras_cor", "Distribuição por cor/raça", _do_cubo(barras_cor)),
+        ("barras_escola", "Tipo de escola de origem", _do_cubo(barras_escola)),
+    ]),
+    ("2. Situação acadêmica atual dos alunos", [
+        ("abandono_por_ano", "Abandono por letivo inicial", _do_cubo(abandono_por_ano)),
+        ("cursando_por_ano", "Cursando por ano letivo inicial", _do_cubo(cursando_por_ano)),
+        ("distribuicao_status", "Distribuição matriculas por situação", _do_cubo(distribuicao_status)),
+        ("status_por_ano", "Status dos alunos por Ano Letivo Inicial", _do_cubo(status_por_ano)),
+    ]),
+    ("3. Tempo médio de permanência no curso por perfil", [
+        ("box_tempo_sexo", "Tempo de permanência por sexo",
+         _box('sexo', 'tempo_permanencia', "Tempo de Permanência por Sexo")),
+        ("box_tempo_escola", "Tempo de permanência por tipo de escola de origem",
+         _box('desc_tipo_escola_origem', 'tempo_permanencia', "Tempo de Permanência por Tipo de Escola de Origem")),
+        ("box_tempo_status", "Tempo de permanência por situação da matrícula",
+         _box('status', 'tempo_permanencia', "Tempo de Permanência por Situação da Matrícula")),
+    ]),
+    ("4. Relação entre tipo de escola de origem e rendimento acadêmico", [
+        ("box_cr_escola", "Coeficiente de rendimento por tipo de escola de origem",
+         _box('desc_tipo_escola_origem', 'coeficiente_rendimento',
+              "Coeficiente de Rendimento por Tipo de Escola de Origem")),
+    ]),
+    ("5. Relação entre situação de matricula e rendimento acadêmico", [
+        ("box_cr_status", "Coeficiente de rendimento por situação de matricula",
+         _box('status', 'coeficiente_rendimento', "Coeficiente de Rendimento por Situação de Matrícula")),
+    ]),
+    ("6. Permanência e desfechos por coorte e perfil", [
+        ("curvas_permanencia", "Alunos ainda sem desfecho",
+         _vida(curvas_permanencia, "Permanência por coorte (ano letivo inicial)")),
+        ("incidencia_acumulada", "Incidência acumulada de cada desfecho",
+         _vida(incidencia_acumulada, "Desfechos por coorte (ano letivo inicial)")),
+    ]),
+]
+
+
+class Contexto:
+    """Dados já preparados que todos os relatórios compartilham."""
+
+    def __init__(self):
+        self.df = carregar_particoes(ano_minimo=ANO_INICIAL)
+        self.indice = IndiceFiltros(self.df)
+        self.cubo = CuboContagens(self.df)
+        self.geojson = carregar_geojson(zoom=ZOOM_INICIAL)
+
+    def recorte(self, selecao):
+        return self.indice.filtrar(self.df, selecao)
+
+
+# Preenchido no processo principal antes do pool (fork) ou no initializer (spawn)
+_contexto = None
+
+
+def _iniciar_processo():
+    global _contexto
+    # Também nos processos do pool, que com spawn não herdam a opção
+    ativar_copy_on_write()
+    if _contexto is None:
+        _contexto = Contexto()
+
+
+def cores_por_grupo(cores):
+    """{grupo: [cores]} a partir dos valores de desc_cor presentes nos dados."""
+    grupos = {}
+    for cor in cores:
+        grupos.setdefault(GRUPO_POR_COR.get(cor, GRUPO_PADRAO), []).append(cor)
+    return grupos
+
+
+def recortes(indice, anos=None, sexos=None, grupos=None):
+    """Combinações (nome, seleção) de ano x sexo x grupo, incluindo "todos" em cada eixo.
+
+    O grupo de raça/cor vira a lista de desc_cor correspondente, que é a
+    dimensão de filtro do índice e do cubo.
+    """
+    por_grupo = cores_por_grupo(indice.valores('desc_cor'))
+    anos = sorted(indice.valores('ano_letivo_ini')) if anos is None else anos
+    sexos = indice.valores('sexo') if sexos is None else sexos
+    grupos = list(por_grupo) if grupos is None else grupos
+
+    combinacoes = []
+    for ano, sexo, grupo in itertools.product([None] + list(anos), [None] + list(sexos), [None] + list(grupos)):
+        nome = "_".join([
+            f"ano-{ano or 'todos'}",
+            f"sexo-{sexo or 'todos'}",
+            f"grupo-{snake_case(normalizar_nome(grupo)) if grupo else 'todos'}",
+        ])
+        selecao = {
+            'sexo': [sexo] if sexo else [],
+            'desc_cor': por_grupo.get(grupo, []) if grupo else [],
+            'status': [],
+            'ano_letivo_ini': [int(ano)] if ano else [],
+            'periodo_letivo_ini': [],
+        }
+        combinacoes.append((nome, selecao))
+    return combinacoes
+
+
+def gerar_relatorio(tarefa):
+    """Grava o relatório de um recorte; roda dentro dos processos do pool."""
+    nome, selecao, pasta_saida, png = tarefa
+    inicio = time.perf_counter()
+    contexto = _contexto
+    total = contexto.cubo.total(selecao)
+    if not total:
+        return nome, 0, time.perf_counter() - inicio
+
+    pasta = os.path.join(pasta_saida, nome)
+    os.makedirs(pasta, exist_ok=True)
+
+    df_mapa = contexto.cubo.contagem("cod_ibge", selecao).rename_axis("cod_ibge").reset_index(name="frequencia")
+    mapa_classico(contexto.geojson, df_mapa).save(os.path.join(pasta, "mapa.html"))
+
+    recorte = contexto.recorte(selecao)
+    indicadores = {
+        "matriculas": total,
+        "idade_media": round(float(idade_media(contexto.cubo, selecao)), 1),
+        "tempo_medio": round(float(recorte['tempo_permanencia'].mean()), 1),
+    }
+
+    figuras = {}
+    partes = [
+        f"<html><head><meta charset='utf-8'><title>{nome}</title></head><body>",
+        f"<h1>Análise de Matrículas - {nome}</h1>",
+        f"<pre>{json.dumps(selecao, ensure_ascii=False)}</pre>",
+        f"<p>Matrículas: {total} | Idade média: {indicadores['idade_media']:.1f} anos"
+        f" | Tempo médio de permanência: {indicadores['tempo_medio']:.1f} anos</p>",
+    ]
+    incluir_plotlyjs = "cdn"
+    for titulo, graficos in PERGUNTAS:
+        partes.append(f"<h2>{titulo}</h2>")
+        if titulo.startswith("1."):
+            partes.append("<h3>Mapa</h3><iframe src='mapa.html' width='720' height='520'></iframe>")
+        for id_grafico, subtitulo, construtor in graficos:
+            fig = construtor(contexto, selecao)
+            figuras[id_grafico] = json.loads(fig.to_json())
+            partes.append(f"<h3>{subtitulo}</h3>")
+            partes.append(fig.to_html(full_html=False, include_plotlyjs=incluir_plotlyjs))
+            incluir_plotlyjs = False
+            if png:
+                fig.write_image(os.path.join(pasta, f"{id_grafico}.png"))
+    partes.append("</body></html>")
+
+    with open(os.path.join(pasta, "index.html"), "w", encoding="utf-8") as f:
+        f.write("\n".join(partes))
+    with open(os.path.join(pasta, "figuras.json"), "w", encoding="utf-8") as f:
+        json.dump({"selecao": selecao, "indicadores": indicadores, "figuras": figuras}, f, ensure_ascii=False)
+    return nome, len(figuras), time.perf_counter() - inicio
+
+
+def gerar_relatorios(tarefas, processos=None):
+    """Distribui os recortes num pool de processos e devolve (resultados, segundos)."""
+    metodo = "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"
+    if metodo == "fork":
+        # Os processos filhos herdam o contexto já carregado (cópia sob demanda)
+        _iniciar_processo()
+
+    inicio = time.perf_counter()
+    contexto_mp = multiprocessing.get_context(metodo)
+    with contexto_mp.Pool(processos, initializer=_iniciar_processo) as pool:
+        resultados = []
+        for nome, n_figuras, segundos in pool.imap_unordered(gerar_relatorio, tarefas):
+            resultados.append((nome, n_figuras, segundos))
+            if n_figuras:
+                print(f"{nome:<50} {n_figuras:>3} figuras {segundos:7.2f}s")
+            else:
+                print(f"{nome:<50} sem matrículas, ignorado")
+    return resultados, time.perf_counter() - inicio
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera os relatórios estáticos das análises por recorte")
+    parser.add_argument("--saida", default="relatorios", help="pasta de destino")
+    parser.add_argument("--processos", type=int, default=None, help="tamanho do pool (padrão: núcleos da máquina)")
+    parser.add_argument("--anos", type=int, nargs="+", default=None, help="anos letivos iniciais (padrão: todos)")
+    parser.add_argument("--sexos", nargs="+", default=None, help="padrão: todos")
+    parser.add_argument("--grupos", nargs="+", default=None, help="grupos de raça/cor (padrão: todos)")
+    parser.add_argument("--png", action="store_true", help="também grava PNGs (exige o pacote kaleido)")
+    args = parser.parse_args()
+
+    png = args.png and importlib.util.find_spec("kaleido") is not None
+    if args.png and not png:
+        print("kaleido não está instalado; gerando só HTML e JSON")
+
+    _iniciar_processo()
+    tarefas = [
+        (nome, selecao, args.saida, png)
+        for nome, selecao in recortes(_contexto.indice, args.anos, args.sexos, args.grupos)
+    ]
+    resultados, segundos = gerar_relatorios(tarefas, args.processos)
+    gerados = sum(1 for _, n_figuras, _ in resultados if n_figuras)
+    print(f"{gerados} relatórios em {segundos:.1f}s ({gerados / segundos:.2f} relatórios/s)")
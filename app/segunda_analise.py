@@ -1,60 +1,88 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import folium
+import plotly.io as pio
 from streamlit_folium import st_folium
-import branca.colormap
-import json
-
-st.set_page_config(page_title="Alunos Eng. telecom IFCE", page_icon="", layout="wide") 
-
-# Função para converter colunas para snake_case
-def snake_case(s):
-    return s.strip().lower().replace(" ", "_").replace("-", "_")
-
-# Carregar os dados do novo diretório e encoding
-df = pd.read_csv(r"Data/matriculasFinal-phase2.csv", sep=';', encoding='latin')
-df.columns = [snake_case(col) for col in df.columns]
-df = df[df["ano_letivo_ini"] >= 2014]  # Filtrar anos a partir de 2014
-
-# Corrigir a coluna cidade extraindo o nome da cidade
-df["cidade"] = df["texto_cidade"].apply(lambda x: x[:-5] if isinstance(x, str) and len(x) > 5 else x)
-
-
-# Criando coluna para saber se o aluno continua cursando ou não
-df["status"] = df["desc_sit_matricula"].apply(
-    lambda x: 'Matriculado' if x in ['Matriculado', 'Concludente', 'Estagiario (Concludente)', 'Trancado']
-    else 'Egresso' if x == 'Formado'
-    else 'Sem êxito'
+from cache_figuras import cache_figuras, normalizar_selecao
+from carga import (
+    CAMINHO_CSV, ativar_copy_on_write, carregar_particoes, em_cache, estatisticas_cache, versao_arquivo
 )
-
-# Criando coluna para agrupar cor/raça
-df["desc_cor"] = df["desc_cor"].apply(
-    lambda x: 'SI' if x in ['Não dispõe da informação', 'Não quis declarar cor/raça']
-    else x
-)
-
-
-# Criando coluna para agrupar cor/raça
-df["grupo"] = df["desc_cor"].apply(
-    lambda x: 'PPI' if x in ['Preta', 'Parda', 'Indígena']
-    else 'Branca e amarela' if x in['Branca', 'Amarela'] 
-    else 'Sem informação'
+from cubo import CuboContagens
+from filtros import IndiceFiltros
+from instrumentacao import ATIVO_PADRAO, Rastreador
+from graficos import (
+    MODOS_BOX, abandono_por_ano, barras_cor, barras_escola, box_plot, cursando_por_ano,
+    curvas_permanencia, distribuicao_grupo, distribuicao_idade, distribuicao_sexo, distribuicao_status,
+    idade_media, incidencia_acumulada, proporcao_cor_ano, proporcao_sexo_ano, status_por_ano
 )
+from mapa import ZOOM_INICIAL, camada_frequencias, carregar_geojson, mapa_base, mapa_classico, tamanho_camada
+from municipios import sem_municipio
+from particoes import caminho_particoes, ler_estatisticas, valores_chave
+from sobrevivencia import resumo, tabela_vida
 
-# Criando coluna para saber a data do ultimo evento de matrícula
-df["dt_ultimo_evento"] = df["ultimo_evento_matricula"].apply(lambda x: x.split(":")[1] if isinstance(x, str) else x)
-df["ultimo_evento_matricula"] = df["ultimo_evento_matricula"].apply(lambda x: x.split(":")[0] if isinstance(x, str) else x)
-
-df['dt_ultimo_evento'] = pd.to_datetime(df['dt_ultimo_evento'], dayfirst=True, errors='coerce')
-df['dt_matricula'] = pd.to_datetime(df['dt_matricula'], dayfirst=True, errors='coerce')
-
-df["tempo_permanencia"] = (df["dt_ultimo_evento"] - df["dt_matricula"]).dt.days / 365.25
-df['tempo_permanencia_meses'] = (df['dt_ultimo_evento'] - df['dt_matricula']).dt.days / 30.44
+st.set_page_config(page_title="Alunos Eng. telecom IFCE", page_icon="", layout="wide") 
 
-# Calcular idade no DataFrame original para evitar warnings
-df['dt_nascimento'] = pd.to_datetime(df['dt_nascimento'], errors='coerce')
-df['idade'] = (pd.Timestamp('today') - df['dt_nascimento']).dt.days // 365
+# Os dados em cache são compartilhados entre as sessões como visões rasas
+ativar_copy_on_write()
+
+ANO_INICIAL = 2014  # Filtrar anos a partir de 2014
+
+# Cursos, anos e semestres escolhidos na barra lateral (widgets da página de
+# análise): são chaves de partição, então decidem quais partições são lidas
+cursos = tuple(st.session_state.get("cursos") or [])
+anos_escolhidos = tuple(st.session_state.get("anos") or [])
+semestres_escolhidos = tuple(st.session_state.get("semestres") or [])
+recorte_particoes = (cursos, anos_escolhidos, semestres_escolhidos)
+
+
+def recorte_painel(d):
+    """Linhas que o painel mostra (usado nos deltas de atualização incremental)."""
+    mascara = d["ano_letivo_ini"] >= ANO_INICIAL
+    for col, valores in [("matriz_estrutura_curso", cursos), ("ano_letivo_ini", anos_escolhidos),
+                         ("periodo_letivo_ini", semestres_escolhidos)]:
+        if valores:
+            mascara &= d[col].isin(valores)
+    # Se nada é descartado, usa o próprio DataFrame compartilhado (sem cópia)
+    return d if mascara.all() else d[mascara]
+
+
+# Medição das etapas desta reexecução (ligada pelo "Painel de desempenho")
+rastreio = Rastreador(ativo=st.session_state.get("painel_desempenho", ATIVO_PADRAO))
+
+
+def exibir_desempenho(registro, onde, titulo="Desempenho", expandido=True):
+    """Tabela de etapas de um registro do Rastreador (None: não mostra nada)."""
+    if registro:
+        with onde.expander(f"{titulo}: {registro['total_ms']:.0f} ms", expanded=expandido):
+            st.dataframe(pd.DataFrame(registro["etapas"]), hide_index=True)
+            st.caption(f"Registrado em {rastreio.caminho_log}")
+
+# Carregar os dados (o resultado fica em cache enquanto o CSV não mudar).
+# Só as partições a partir de ANO_INICIAL e dos cursos, anos e semestres
+# escolhidos são lidas.
+versao_dados = versao_arquivo(CAMINHO_CSV)
+# Tudo que sai dos dados carregados (figuras, KPIs, tabelas) depende também
+# das partições lidas
+versao_recorte = (versao_dados, recorte_particoes)
+with rastreio.etapa("carga_dados") as etapa:
+    df = em_cache(
+        ("painel", recorte_particoes), versao_dados,
+        lambda: carregar_particoes(
+            ano_minimo=ANO_INICIAL,
+            selecao={"ano_letivo_ini": list(anos_escolhidos), "periodo_letivo_ini": list(semestres_escolhidos)},
+            matrizes=list(cursos),
+        )
+    )
+    etapa["linhas"] = len(df)
+with rastreio.etapa("indice_filtros"):
+    indice = em_cache(("indice_filtros", recorte_particoes), versao_dados, lambda: IndiceFiltros(df))
+with rastreio.etapa("cubo"):
+    # Numa atualização incremental do CSV o cubo é corrigido só com as linhas que mudaram
+    cubo = em_cache(
+        ("cubo", recorte_particoes), versao_dados, lambda: CuboContagens(df),
+        atualizar=lambda antigo, removidas, inseridas: antigo.aplicar_delta(
+            recorte_painel(removidas), recorte_painel(inseridas)
+        )
+    )
 
 # Dicionário de dados (ajuste conforme seu dataset)
 dicionario_dados = [
@@ -79,6 +107,16 @@ df_dicionario = pd.DataFrame(dicionario_dados)
 # Menu de navegação
 pagina = st.sidebar.radio("Navegação", ["Capa", "Análise"])
 
+# Situação do cache de dados (acertos/faltas desde que o servidor subiu)
+cache_info = estatisticas_cache()
+st.sidebar.caption(f"Cache de dados: {cache_info['acertos']} acertos, {cache_info['faltas']} faltas")
+figuras_info = cache_figuras.estatisticas()
+st.sidebar.caption(
+    f"Cache de figuras: {figuras_info['taxa_acerto']:.0%} de acertos, "
+    f"{figuras_info['itens']} figuras, {figuras_info['bytes'] / 1024 / 1024:.1f} MB"
+)
+st.sidebar.checkbox("Painel de desempenho", value=ATIVO_PADRAO, key="painel_desempenho")
+
 if pagina == "Capa":
     st.image(r"Data/LogoIFCE.png", width=200)
     st.title("Painel de Análise de Matrículas - Engenharia de Telecomunicações IFCE")
@@ -105,364 +143,301 @@ elif pagina == "Análise":
         "2). Situação acadêmica atual dos alunos",
         "3). Tempo médio de permanência no curso por perfil",
         "4). Relação entre tipo de escola de origem e rendimento acadêmico",
-        "5). Relação entre situação de matricula e rendimento acadêmico"
+        "5). Relação entre situação de matricula e rendimento acadêmico",
+        "6). Permanência e desfechos por coorte e perfil"
     ]
-    escolha = st.sidebar.radio("Escolha uma Análise:", perguntas)
+    escolha = st.sidebar.radio("Escolha uma Análise:", perguntas, key="escolha_analise")
 
     # =========================
     # Filtros interativos
     # =========================
     st.sidebar.header("Filtros")
-    sexos = df['sexo'].dropna().unique()
+    # Cursos, anos e semestres vêm das estatísticas das partições, sem ler os
+    # dados (os anos e semestres, dos cursos escolhidos): como também decidem
+    # quais partições são lidas, as opções não podem sair de `df`
+    estatisticas_particoes = em_cache(
+        "estatisticas_particoes", versao_dados, lambda: ler_estatisticas(caminho_particoes(CAMINHO_CSV))
+    )
+
+    def opcoes_particao(coluna, matrizes=None):
+        return em_cache(
+            ("opcoes", coluna, matrizes), versao_dados,
+            lambda: valores_chave(estatisticas_particoes, coluna, ano_minimo=ANO_INICIAL, matrizes=matrizes)
+        )
+
+    matrizes = opcoes_particao("matriz_estrutura_curso")
+    st.sidebar.multiselect("Curso (matriz curricular)", options=matrizes, default=[], key="cursos")
+
+    sexos = indice.valores('sexo')
     sexo_selecionado = st.sidebar.multiselect("Sexo", options=sexos, default=[])
 
-    cores = df['desc_cor'].dropna().unique()
+    cores = indice.valores('desc_cor')
     cor_selecionado = st.sidebar.multiselect("Cor/raça", options=cores, default=[])
 
-    situacoes = df['status'].dropna().unique()
+    situacoes = indice.valores('status')
     situacao_selecionada = st.sidebar.multiselect("Situação de Matrícula", options=situacoes, default=[])
 
-    anos = df['ano_letivo_ini'].dropna().unique()
-    anos_ordenados = sorted(anos)
-    anos_selecionado = st.sidebar.multiselect("Ano Letivo Inicial", options=anos_ordenados, default=[])
-
-    semestres = df['periodo_letivo_ini'].dropna().unique()
-    semestre_selecionado = st.sidebar.multiselect("Semestre Letivo Inicial", options=semestres, default=[])
-
-    # Filtro condicional: só filtra se o usuário selecionar algo
-    df_filtrado = df.copy()
-    if sexo_selecionado:
-        df_filtrado = df_filtrado[df_filtrado['sexo'].isin(sexo_selecionado)]
-    if cor_selecionado:
-        df_filtrado = df_filtrado[df_filtrado['desc_cor'].isin(cor_selecionado)]
-    if situacao_selecionada:
-        df_filtrado = df_filtrado[df_filtrado['status'].isin(situacao_selecionada)]
-    if anos_selecionado:
-        df_filtrado = df_filtrado[df_filtrado['ano_letivo_ini'].isin(anos_selecionado)]
-    if semestre_selecionado:
-        df_filtrado = df_filtrado[df_filtrado['periodo_letivo_ini'].isin(semestre_selecionado)]
-
-    # =========================
-    # Funções auxiliares
-    # =========================
-    def bar_with_percent(counts, x_label, y_label, title):
-        percent = (counts / counts.sum() * 100).round(2)
-        labels = [f"{v} ({p}%)" for v, p in zip(counts.values, percent.values)]
-        fig = px.bar(
-            x=counts.index, y=counts.values, text=labels,
-            labels={'x': x_label, 'y': y_label}, title=title,
-            color_discrete_sequence=['blue']
-        )
-        fig.update_traces(textposition='outside')
-        return fig
-
-    def grouped_bar_with_percent(df_grouped, x, y, color, x_label, y_label, title):
-        total_por_x = df_grouped.groupby(x)[y].transform('sum')
-        df_grouped['percent'] = (df_grouped[y] / total_por_x * 100).round(2)
-        df_grouped['label'] = df_grouped.apply(lambda row: f"{row[y]} ({row['percent']}%)", axis=1)
-        fig = px.bar(
-            df_grouped, x=x, y=y, color=color, barmode='group',
-            text='label', labels={x: x_label, y: y_label}, title=title,
-            color_discrete_sequence=['blue']
-        )
-        fig.update_traces(textposition='outside')
-        return fig
-
-    # Preparar dados para o mapa
-    df_mapa = df_filtrado.value_counts("cidade").reset_index(name="frequencia")
-    df_mapa["representatividade"] = (
-        (df_mapa["frequencia"] / df_mapa["frequencia"].sum()) * 100
-    ).round(2).astype(str) + "%"
-
-    # Carregar o geojson local com encoding UTF-8
-    geojson_url = r"geojson/geojs-23-mun.json"
-    with open(geojson_url, encoding="utf-8") as f:
-        geojson_data = json.load(f)
-
-    # =========================
-    # Visualizações
-    # =========================
-    if escolha == perguntas[0]:
-        st.header("1. Perfil dos alunos")
-        # Mapa inicial
-        mapa_ceara = folium.Map(
-            [-5.2637315250639025, -39.576651414308046],
-            tiles="cartodbpositron",
-            zoom_start=6.5
+    anos = opcoes_particao("ano_letivo_ini", cursos)
+    anos_selecionado = st.sidebar.multiselect("Ano Letivo Inicial", options=anos, default=[], key="anos")
+
+    semestres = opcoes_particao("periodo_letivo_ini", cursos)
+    semestre_selecionado = st.sidebar.multiselect(
+        "Semestre Letivo Inicial", options=semestres, default=[], key="semestres"
+    )
+
+    # Filtro condicional: só filtra se o usuário selecionar algo.
+    # O índice combina os bitsets de cada filtro e o recorte é feito uma vez só.
+    selecao = {
+        'sexo': sexo_selecionado,
+        'desc_cor': cor_selecionado,
+        'status': situacao_selecionada,
+        'ano_letivo_ini': anos_selecionado,
+        'periodo_letivo_ini': semestre_selecionado,
+    }
+    # Box plots: por padrão só as estatísticas (e uma amostra opcional) vão
+    # para o navegador; "Todos os pontos" mantém o px.box com points="all".
+    if escolha in perguntas[2:5]:
+        st.sidebar.header("Box plots")
+        modo_box = st.sidebar.radio("Pontos", MODOS_BOX)
+        pontos_box = 0
+        if modo_box == MODOS_BOX[0]:
+            pontos_box = st.sidebar.slider("Pontos de amostra por grupo", 0, 500, 0, step=50)
+
+    # Linhas do recorte só são materializadas nas análises que precisam
+    # delas (box plots e médias), e só quando o cache de figuras não as tem;
+    # as contagens saem do cubo.
+    recorte = {}
+
+    def df_filtrado():
+        if "df" not in recorte:
+            with rastreio.etapa("filtro") as etapa:
+                recorte["df"] = indice.filtrar(df, selecao)
+                etapa["linhas"] = len(recorte["df"])
+        return recorte["df"]
+
+    # Figuras ficam em cache por (versão dos dados e partições lidas, gráfico, filtros)
+    chave_filtros = normalizar_selecao(selecao)
+
+    def mostrar(id_grafico, construtor, *parametros, rastreador=None):
+        chave = (versao_recorte, id_grafico, chave_filtros) + parametros
+        rastreador = rastreador or rastreio
+        with rastreador.etapa(f"grafico:{id_grafico}") as etapa:
+            spec = cache_figuras.spec(chave, construtor)
+            etapa["bytes"] = len(spec)
+            st.plotly_chart(pio.from_json(spec, skip_invalid=True))
+
+    def kpi(id_valor, construtor):
+        return cache_figuras.valor((versao_recorte, id_valor, chave_filtros), construtor)
+
+    def mostrar_box(id_grafico, x, y, title):
+        mostrar(
+            id_grafico,
+            lambda: box_plot(df_filtrado(), x=x, y=y, title=title, modo=modo_box, pontos_por_grupo=pontos_box),
+            modo_box, pontos_box
         )
 
-        # Camada de fundo (opcional)
-        folium.TileLayer(
-            tiles=branca.utilities.image_to_url([[1,1], [1,1]]),
-            attr="Carlos Bezerra", name="Imagem Fundo"
-        ).add_to(mapa_ceara)
-
-        # Mapa coroplético
-        folium.Choropleth(
-            geo_data=geojson_data,
-            data=df_mapa,
-            columns=["cidade", "frequencia"],
-            key_on="feature.properties.name",
-            fill_color="Reds",
-            fill_opacity=0.9,
-            line_opacity=0.5,
-            legend_name="Alunos",
-            nan_fill_color="white",
-            name="Dados"
-        ).add_to(mapa_ceara)
-
-        # Destaque
-        estilo = lambda x: {"fillColor": "white", "color": "black", "fillOpacity": 0.001, "weight": 0.001}
-        estilo_destaque = lambda x: {"fillColor": "darkblue", "color": "black", "fillOpacity": 0.5, "weight": 1}
-        highlight = folium.features.GeoJson(
-            data=geojson_data,
-            style_function=estilo,
-            highlight_function=estilo_destaque,
-            name="Destaque"
-        )
-        folium.features.GeoJsonTooltip(
-            fields=["name",],
-            aliases=["cidade"],
-            labels=False,
-            style=("background-color: white; color: black; font-family: arial; font-size: 16px; padding: 10px;")
-        ).add_to(highlight)
-        mapa_ceara.add_child(highlight)
+    def finalizar_trecho(rastreador, trecho):
+        """Grava e mostra as etapas de um fragmento.
+
+        Numa reexecução só do fragmento o rastreio da página já foi
+        finalizado (e a barra lateral não pode ser alterada), então cada
+        fragmento mede com o próprio Rastreador e grava um registro com
+        `trecho`.
+        """
+        registro = rastreador.finalizar(pagina=pagina, analise=st.session_state.get("escolha_analise"), trecho=trecho)
+        exibir_desempenho(registro, st, f"Desempenho ({trecho})", expandido=False)
+
+    def graficos_sob_demanda(chave, graficos, padrao=1):
+        """Só os gráficos escolhidos são montados e enviados ao navegador.
+
+        `graficos` é {título: (id do gráfico, construtor(cubo, selecao))}. O
+        trecho roda como fragmento: trocar a escolha reexecuta só ele, não o
+        mapa nem o resto da página.
+        """
+        @st.fragment
+        def secao():
+            rastreador = Rastreador(ativo=rastreio.ativo)
+            escolhidos = st.segmented_control(
+                "Gráficos", list(graficos), selection_mode="multi",
+                default=list(graficos)[:padrao], key=chave
+            )
+            for titulo in escolhidos or []:
+                id_grafico, construtor = graficos[titulo]
+                st.subheader(titulo)
+                mostrar(id_grafico, lambda: construtor(cubo, selecao), rastreador=rastreador)
+            finalizar_trecho(rastreador, chave)
+        secao()
+
+    @st.fragment
+    def mapa_municipios():
+        rastreador = Rastreador(ativo=rastreio.ativo)
+        # Preparar dados para o mapa
+        df_mapa = cubo.contagem("cidade", selecao).rename_axis("cidade").reset_index(name="frequencia")
+        df_mapa["representatividade"] = (
+            (df_mapa["frequencia"] / df_mapa["frequencia"].sum()) * 100
+        ).round(2).astype(str) + "%"
+
+        # O mapa junta pelo código IBGE; a tabela continua listando todas as cidades
+        df_mapa_ibge = cubo.contagem("cod_ibge", selecao).rename_axis("cod_ibge").reset_index(name="frequencia")
+
+        # No modo em cache o mapa base é montado uma vez e só a camada de
+        # frequências (uma única camada GeoJSON) é reenviada a cada filtro.
+        modo_mapa = st.radio("Modo do mapa", ["Camada dinâmica", "Clássico"], horizontal=True)
+
+        # Na camada dinâmica o st_folium devolve o zoom do navegador (em
+        # st.session_state, pela key); mudar o zoom reexecuta este fragmento
+        # e a camada vem no nível de detalhe desse zoom. O mapa clássico é
+        # remontado a cada execução e volta sempre ao zoom inicial.
+        zoom = ZOOM_INICIAL
+        if modo_mapa != "Clássico":
+            zoom = (st.session_state.get("mapa_ceara") or {}).get("zoom") or ZOOM_INICIAL
+        with rastreador.etapa("geojson"):
+            geojson_data = carregar_geojson(zoom=zoom)
 
         col1, col2 = st.columns([2, 1])
         with col1:
             st.subheader("Mapa Interativo")
-            st_folium(mapa_ceara, width=700, height=500)
+            if modo_mapa == "Clássico":
+                with rastreador.etapa("folium_mapa"):
+                    mapa = mapa_classico(geojson_data, df_mapa_ibge)
+                with rastreador.etapa("st_folium") as etapa:
+                    st_folium(mapa, width=700, height=500)
+                # Medido fora da etapa, para não somar ao tempo do st_folium
+                if rastreador.ativo:
+                    etapa["bytes"] = tamanho_camada(mapa)
+            else:
+                with rastreador.etapa("folium_camada"):
+                    camada, escala = camada_frequencias(geojson_data, df_mapa_ibge)
+                with rastreador.etapa("st_folium") as etapa:
+                    st_folium(
+                        mapa_base(), feature_group_to_add=camada, key="mapa_ceara",
+                        width=700, height=500, returned_objects=["zoom"]
+                    )
+                if rastreador.ativo:
+                    etapa["bytes"] = tamanho_camada(camada)
+                st.markdown(escala._repr_html_(), unsafe_allow_html=True)
         with col2:
             st.subheader("Quantidade de matrículas")
             st.dataframe(df_mapa, height=500)
 
-        st.subheader("Idade média dos alunos")
-        st.write(f"Idade média: {df_filtrado['idade'].mean():.1f} anos")
-        # Histograma de idade com representatividade
-        idade_counts = df_filtrado['idade'].value_counts().sort_index()
-        idade_percent = (idade_counts / idade_counts.sum() * 100).round(2)
-        idade_labels = [f"{v} ({p}%)" for v, p in zip(idade_counts.values, idade_percent.values)]
-        fig = px.bar(
-            x=idade_counts.index, y=idade_counts.values, text=idade_labels,
-            labels={'x': 'Idade', 'y': 'Quantidade'}, title="Distribuição de Idade"
-        )
-        fig.update_traces(textposition='outside')
-        st.plotly_chart(fig)
-
-
-        st.subheader("Distribuição por sexo")
-        sexo_counts = df_filtrado['sexo'].value_counts().reset_index()
-        sexo_counts.columns = ['sexo', 'quantidade']
-        fig = px.pie(
-            sexo_counts,
-            names='sexo',
-            values='quantidade',
-            title="Distribuição por Sexo",
-            hole=0.5,
-            color='sexo',
-            color_discrete_map={'F': 'red', 'M': 'blue'}
-        )
-        fig.update_traces(textinfo='percent+label+value')
-        st.plotly_chart(fig)
-
-        st.subheader("Evolução da proporção de sexo por ano letivo")
-
-        # Agrupa e conta o número de alunos por ano e sexo
-        sexo_ano = df_filtrado.groupby(['ano_letivo_ini', 'sexo']).size().reset_index(name='quantidade')
-
-        # Calcula o total de alunos por ano
-        total_ano = sexo_ano.groupby('ano_letivo_ini')['quantidade'].transform('sum')
-
-        # Calcula a proporção de cada sexo em cada ano
-        sexo_ano['proporcao'] = (sexo_ano['quantidade'] / total_ano * 100).round(2)
-
-        # Cria o rótulo personalizado: "xx.x% (N)"
-        sexo_ano['rotulo'] = sexo_ano['proporcao'].astype(str) + '% (' + sexo_ano['quantidade'].astype(str) + ')'
-
-        # Gráfico de linha com rótulos e sem linhas de grade
-        fig = px.line(
-            sexo_ano,
-            x='ano_letivo_ini',
-            y='proporcao',
-            color='sexo',
-            markers=True,
-            text='rotulo',
-            labels={'ano_letivo_ini': 'Ano Letivo Inicial', 'proporcao': 'Proporção (%)', 'sexo': 'Sexo'},
-            title="Proporção de Sexo por Ano Letivo",
-            color_discrete_map={'F': '#E31B1F', 'M': '#0068c9'}
-        )
-        fig.update_traces(textposition='top center')
-        fig.update_xaxes(showgrid=False)
-        fig.update_yaxes(showgrid=False)
-        fig.update_layout(yaxis_tickformat='.1f')
-        st.plotly_chart(fig)
-
-
-        st.subheader("Distribuição por raça/cor")
-        raca_counts = df_filtrado['grupo'].value_counts().reset_index()
-        raca_counts.columns = ['grupo', 'quantidade']
-        fig = px.pie(
-            raca_counts,
-            names='grupo',
-            values='quantidade',
-            title="Distribuição por Raça/Cor",
-            hole=0.5,
-            color='grupo',
-            color_discrete_map={'PPI': 'red', 'Branca e amarela': 'blue', 'Sem informação': 'gray'}
-        )
-        fig.update_traces(textinfo='percent+label+value')
-        st.plotly_chart(fig)
-
-        st.subheader("Evolução da proporção de raça/cor por ano letivo")
-
-        # Agrupa e conta o número de alunos por ano e sexo
-        cor_ano = df_filtrado.groupby(['ano_letivo_ini', 'desc_cor']).size().reset_index(name='quantidade')
-
-        # Calcula o total de alunos por ano
-        total_ano = cor_ano.groupby('ano_letivo_ini')['quantidade'].transform('sum')
-
-        # Calcula a proporção de cada sexo em cada ano
-        cor_ano['proporcao'] = (cor_ano['quantidade'] / total_ano * 100).round(2)
-
-        # Cria o rótulo personalizado: "xx.x% (N)"
-        cor_ano['rotulo'] = cor_ano['proporcao'].astype(str) + '% (' + cor_ano['quantidade'].astype(str) + ')'
-        #cor_ano['rotulo'] = cor_ano['proporcao'].astype(str) + '%' #+ cor_ano['quantidade'].astype(str) + ')'
-
-        # Gráfico de linha com rótulos e sem linhas de grade
-        fig = px.line(
-            cor_ano,
-            x='ano_letivo_ini',
-            y='proporcao',
-            color='desc_cor',
-            color_discrete_map={'Parda': 'red', 'Branca': 'blue', 'Preta': 'black', 'Amarela': 'yellow', 'Indígena': 'green', 'SI': 'gray'},
-            markers=True,
-            text='rotulo',
-            labels={'ano_letivo_ini': 'Ano Letivo Inicial', 'proporcao': 'Proporção (%)', 'grupo': 'Cor/Raça'},
-            #title="Proporção de cor/raça por Ano Letivo"
-            #color_discrete_map={'PPI': '#E31B1F', 'Branca e amarela': '#0068c9', 'Sem informação': 'gray'}
-        )
-        fig.update_traces(textposition='top center')
-        fig.update_xaxes(showgrid=False)
-        fig.update_yaxes(showgrid=False)
-        fig.update_layout(yaxis_tickformat='.1f')
-        st.plotly_chart(fig)
+        faltantes = em_cache(("sem_municipio", recorte_particoes), versao_dados, lambda: sem_municipio(df))
+        if len(faltantes):
+            with st.expander(f"{faltantes['matriculas'].sum()} matrículas sem município no mapa"):
+                st.dataframe(faltantes)
+        finalizar_trecho(rastreador, "mapa")
 
-        st.subheader("Distribuição por cor/raça")
-        cor_counts = df_filtrado['desc_cor'].value_counts()
-        st.plotly_chart(bar_with_percent(cor_counts, 'Cor/Raça', 'Quantidade', "Cor/Raça"))
+    # =========================
+    # Visualizações
+    # =========================
+    if escolha == perguntas[0]:
+        st.header("1. Perfil dos alunos")
 
-        st.subheader("Tipo de escola de origem")
-        escola_counts = df_filtrado['desc_tipo_escola_origem'].value_counts()
-        st.plotly_chart(bar_with_percent(escola_counts, 'Tipo de Escola', 'Quantidade', "Tipo de Escola de Origem"))
+        # Primeiro o conteúdo leve (KPI), depois os gráficos escolhidos e,
+        # por último, o mapa, que é o elemento mais pesado da seção.
+        st.subheader("Idade média dos alunos")
+        st.write(f"Idade média: {kpi('idade_media', lambda: idade_media(cubo, selecao)):.1f} anos")
+
+        graficos_sob_demanda("graficos_perfil", {
+            "Distribuição de idade": ("distribuicao_idade", distribuicao_idade),
+            "Distribuição por sexo": ("distribuicao_sexo", distribuicao_sexo),
+            "Evolução da proporção de sexo por ano letivo": ("proporcao_sexo_ano", proporcao_sexo_ano),
+            "Distribuição por raça/cor": ("distribuicao_grupo", distribuicao_grupo),
+            "Evolução da proporção de raça/cor por ano letivo": ("proporcao_cor_ano", proporcao_cor_ano),
+            "Distribuição por cor/raça": ("barras_cor", barras_cor),
+            "Tipo de escola de origem": ("barras_escola", barras_escola),
+        })
+
+        st.subheader("Distribuição dos alunos por município")
+        if st.toggle("Carregar mapa", value=True):
+            mapa_municipios()
 
     elif escolha == perguntas[1]:
         st.header("2. Situação acadêmica atual dos alunos")
 
-
         st.subheader("Abandono por letivo inicial")
-        ult_per_counts = df_filtrado[df_filtrado['desc_sit_matricula'] == "Abandono"]['ano_letivo_ini'].value_counts()
-        st.plotly_chart(bar_with_percent(ult_per_counts, 'Ano letivo', 'Quantidade', "Abandono por Período Letivo Inicial"))
+        mostrar("abandono_por_ano", lambda: abandono_por_ano(cubo, selecao))
 
         st.subheader("Cursando por ano letivo inicial")
-        per_counts = df_filtrado[df_filtrado['desc_sit_matricula'] == "Matriculado"]['ano_letivo_ini'].value_counts()
-        st.plotly_chart(bar_with_percent(per_counts, 'Situação no Período', 'Quantidade', "Cursando por ano letivo inicial"))
+        mostrar("cursando_por_ano", lambda: cursando_por_ano(cubo, selecao))
 
         st.subheader("Distribuição matriculas por situação")
-        raca_counts = df_filtrado['status'].value_counts().reset_index()
-        raca_counts.columns = ['status', 'quantidade']
-        fig = px.pie(
-            raca_counts,
-            names='status',
-            values='quantidade',
-            title="Distribuição por Situação Acadêmica",
-            hole=0.5,
-            color='status',
-            color_discrete_map={
-                'Sem êxito': "#E31B1F",
-                'Matriculado': "#0068c9",
-                'Egresso': 'green'
-            },
-        )
-        fig.update_traces(textinfo='percent+label+value')
-        st.plotly_chart(fig)
+        mostrar("distribuicao_status", lambda: distribuicao_status(cubo, selecao))
 
         st.subheader("Status dos alunos por Ano Letivo Inicial")
-
-        # Agrupa e conta
-        status_ano = df_filtrado.groupby(['ano_letivo_ini', 'status']).size().reset_index(name='quantidade')
-
-        # Define a ordem desejada para o status
-        ordem_status = ['Egresso', 'Matriculado', 'Sem êxito']
-        status_ano['status'] = pd.Categorical(status_ano['status'], categories=ordem_status, ordered=True)
-
-        # Calcula o total por ano
-        total_por_ano = status_ano.groupby('ano_letivo_ini')['quantidade'].transform('sum')
-        status_ano['percentual'] = (status_ano['quantidade'] / total_por_ano * 100).round(1)
-        status_ano['label'] = status_ano['percentual'].astype(str) + '%'
-
-        fig = px.bar(
-            status_ano,
-            x='ano_letivo_ini',
-            y='quantidade',
-            color='status',
-            category_orders={'status': ordem_status},
-            title="Distribuição do Status dos Alunos por Ano Letivo Inicial",
-            labels={'ano_letivo_ini': 'Ano Letivo Inicial', 'quantidade': 'Quantidade', 'status': 'Status'},
-            barmode='stack',
-            color_discrete_map={
-                'Sem êxito': "#E31B1F",
-                'Matriculado': "#0068c9",
-                'Egresso': 'green'
-            },
-            text='label'
-        )
-        fig.update_traces(textposition='outside', textangle=0)
-        st.plotly_chart(fig)
+        mostrar("status_por_ano", lambda: status_por_ano(cubo, selecao))
 
     elif escolha == perguntas[2]:
         st.header("3. Tempo médio de permanência no curso por perfil")
 
         st.subheader("Tempo médio de permanência (em anos)")
-        st.write(f"Tempo médio: {df_filtrado['tempo_permanencia'].mean():.1f} anos")
+        st.write(f"Tempo médio: {kpi('tempo_medio', lambda: df_filtrado()['tempo_permanencia'].mean()):.1f} anos")
 
         st.subheader("Tempo de permanência por sexo")
-        fig = px.box(
-            df_filtrado, x='sexo', y='tempo_permanencia', color='sexo',
-            points="all", title="Tempo de Permanência por Sexo"
-        )
-        st.plotly_chart(fig)
+        mostrar_box("box_tempo_sexo", 'sexo', 'tempo_permanencia', "Tempo de Permanência por Sexo")
 
         st.subheader("Tempo de permanência por tipo de escola de origem")
-        fig = px.box(
-            df_filtrado, x='desc_tipo_escola_origem', y='tempo_permanencia', color='desc_tipo_escola_origem',
-            points="all", title="Tempo de Permanência por Tipo de Escola de Origem"
+        mostrar_box(
+            "box_tempo_escola", 'desc_tipo_escola_origem', 'tempo_permanencia',
+            "Tempo de Permanência por Tipo de Escola de Origem"
         )
-        st.plotly_chart(fig)
 
         st.subheader("Tempo de permanência por situação da matrícula")
-        fig = px.box(
-            df_filtrado, x='status', y='tempo_permanencia', color='status',
-            points="all", title="Tempo de Permanência por Situação da Matrícula"
-        )
-        st.plotly_chart(fig)
+        mostrar_box("box_tempo_status", 'status', 'tempo_permanencia', "Tempo de Permanência por Situação da Matrícula")
 
     elif escolha == perguntas[3]:
         st.header("4. Relação entre tipo de escola de origem e rendimento acadêmico")
 
         st.subheader("Coeficiente de rendimento por tipo de escola de origem")
-        fig = px.box(
-            df_filtrado, x='desc_tipo_escola_origem', y='coeficiente_rendimento', color='desc_tipo_escola_origem',
-            points="all", title="Coeficiente de Rendimento por Tipo de Escola de Origem"
+        mostrar_box(
+            "box_cr_escola", 'desc_tipo_escola_origem', 'coeficiente_rendimento',
+            "Coeficiente de Rendimento por Tipo de Escola de Origem"
         )
-        st.plotly_chart(fig)
 
     elif escolha == perguntas[4]:
         st.header("5. Relação entre situação de matricula e rendimento acadêmico")
 
-
         st.subheader("Coeficiente de rendimento por situação de matricula.")
-        fig = px.box(
-            df_filtrado, x='status', y='coeficiente_rendimento', color='status',
-            points="all", title="Coeficiente de Rendimento por Situação de Matrícula"
+        mostrar_box("box_cr_status", 'status', 'coeficiente_rendimento', "Coeficiente de Rendimento por Situação de Matrícula")
+
+    elif escolha == perguntas[5]:
+        st.header("6. Permanência e desfechos por coorte e perfil")
+        st.caption(
+            "Curvas de Kaplan–Meier a partir de dt_matricula e dt_ultimo_evento. Egresso e Sem êxito "
+            "são desfechos concorrentes; quem segue Matriculado é censurado no último evento."
         )
-        st.plotly_chart(fig)
\ No newline at end of file
+
+        perfis = {
+            "Coorte (ano letivo inicial)": "ano_letivo_ini",
+            "Sexo": "sexo",
+            "Raça/cor": "grupo",
+            "Tipo de escola de origem": "desc_tipo_escola_origem",
+        }
+        perfil = st.radio("Comparar por", list(perfis), horizontal=True, key="perfil_sobrevivencia")
+        por = perfis[perfil]
+
+        def tabela():
+            # Uma tábua por (versão dos dados e partições lidas, filtros, perfil), compartilhada pelos gráficos
+            def construir():
+                with rastreio.etapa("tabela_vida") as etapa:
+                    resultado = tabela_vida(df_filtrado(), por=[por])
+                    etapa["linhas"] = len(resultado)
+                return resultado
+            return cache_figuras.obter(
+                (versao_recorte, "tabela_vida", chave_filtros, por), construir,
+                tamanho=lambda t: int(t.memory_usage(deep=True).sum())
+            )
+
+        st.subheader("Alunos ainda sem desfecho")
+        mostrar("curvas_permanencia", lambda: curvas_permanencia(tabela(), por, f"Permanência por {perfil.lower()}"), por)
+
+        st.subheader("Incidência acumulada de cada desfecho")
+        mostrar("incidencia_acumulada", lambda: incidencia_acumulada(tabela(), por, f"Desfechos por {perfil.lower()}"), por)
+
+        st.subheader("Resumo por grupo")
+        st.dataframe(resumo(tabela(), [por]), hide_index=True)
+
+# =========================
+# Painel de desempenho (tempos desta reexecução)
+# =========================
+registro = rastreio.finalizar(pagina=pagina, analise=st.session_state.get("escolha_analise"))
+exibir_desempenho(registro, st.sidebar)
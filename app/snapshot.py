@@ -0,0 +1,311 @@
+import argparse
+import os
+import tempfile
+from contextlib import contextmanager
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from compactacao import COLUNAS_CATEGORICAS, compactar
+from esquema import aplicar_esquema, ler_csv as ler_export, parametros_leitura
+from municipios import associar_ibge, codigos_por_nome
+from transformacoes import calcular_idade, derivar_colunas, snake_case
+
+CAMINHO_CSV = r"Data/matriculasFinal-phase2.csv"
+
+# Incrementar sempre que as colunas ou as derivações do snapshot mudarem,
+# para que snapshots antigos sejam reconstruídos automaticamente.
+VERSAO_SNAPSHOT = "7"
+
+# CSVs maiores que isso são convertidos em blocos, com memória limitada
+LIMITE_CSV_MB = float(os.environ.get("PAINEL_LIMITE_CSV_MB", 512))
+LINHAS_POR_BLOCO = 200_000
+
+# Colunas do CSV (já em snake_case) que os painéis realmente usam
+COLUNAS_USADAS = [
+    "cod_matricula",
+    "matriz_estrutura_curso",
+    "ano_letivo_ini",
+    "periodo_letivo_ini",
+    "ano_let_atual",
+    "dt_nascimento",
+    "sexo",
+    "cod_cidade",
+    "texto_cidade",
+    "desc_cor",
+    "coeficiente_rendimento",
+    "desc_tipo_escola_origem",
+    "desc_sit_matricula",
+    "dt_matricula",
+    "situacao_ultimo_periodo_letivo",
+    "ultimo_evento_matricula",
+]
+
+def caminho_snapshot(caminho_csv=CAMINHO_CSV):
+    """Data/arquivo.csv -> Data/arquivo.feather"""
+    return os.path.splitext(caminho_csv)[0] + ".feather"
+
+
+def ler_csv(caminho_csv=CAMINHO_CSV, **kwargs):
+    """Lê o CSV bruto só com as colunas usadas, já renomeadas para snake_case.
+
+    Os tipos saem do esquema declarado (ver esquema.py): vírgula decimal,
+    códigos como Int64 e o resto como texto.
+    """
+    return ler_export(caminho_csv, COLUNAS_USADAS, **kwargs)
+
+
+def ler_csv_em_blocos(caminho_csv=CAMINHO_CSV, linhas_por_bloco=LINHAS_POR_BLOCO, **kwargs):
+    """Como ler_csv, mas devolve o CSV em blocos de `linhas_por_bloco` linhas.
+
+    Se um bloco tem inteiro inválido, a leitura continua dali com as colunas
+    INTEIRO como texto (ver esquema.ler_csv).
+    """
+    lidas, como_texto = 0, False
+    while True:
+        leitor = pd.read_csv(
+            caminho_csv, **parametros_leitura(COLUNAS_USADAS, inteiros_como_texto=como_texto),
+            chunksize=linhas_por_bloco, skiprows=range(1, lidas + 1),
+            **kwargs
+        )
+        try:
+            with leitor:
+                for bloco in leitor:
+                    lidas += len(bloco)
+                    bloco.columns = [snake_case(col) for col in bloco.columns]
+                    yield aplicar_esquema(bloco)
+            return
+        except (ValueError, TypeError):
+            if como_texto:
+                raise
+            como_texto = True
+
+
+def hash_linhas(df):
+    """Hash (uint64) do conteúdo bruto de cada linha, antes das derivações.
+
+    Colunas numéricas entram como float64, para o hash não mudar só porque
+    o pandas leu a coluna como int64 num export e float64 (com vazios) no outro.
+    """
+    colunas = {
+        col: df[col].astype("float64") if pd.api.types.is_numeric_dtype(df[col]) else df[col]
+        for col in COLUNAS_USADAS if col in df.columns
+    }
+    return pd.util.hash_pandas_object(pd.DataFrame(colunas), index=False).to_numpy()
+
+
+def construir_tabela(df):
+    """Prepara o DataFrame para gravação: derivações, categorias e metadados."""
+    df["hash_linha"] = hash_linhas(df)
+    df = derivar_colunas(df)
+    df["cod_ibge"] = associar_ibge(df)
+    return tabela_arrow(df)
+
+
+def tabela_arrow(df):
+    """DataFrame já derivado -> tabela Arrow compacta (ver compactacao) com metadados."""
+    df = compactar(df)
+    tabela = pa.Table.from_pandas(df.reset_index(drop=True), preserve_index=False)
+    metadados = dict(tabela.schema.metadata or {})
+    metadados[b"versao_snapshot"] = VERSAO_SNAPSHOT.encode()
+    return tabela.replace_schema_metadata(metadados)
+
+
+@contextmanager
+def gravando(destino):
+    """Caminho temporário na pasta de `destino`, que o substitui no fim do bloco.
+
+    O nome é exclusivo (tempfile.mkstemp): processos gravando o mesmo destino
+    ao mesmo tempo não escrevem no mesmo arquivo, e o último os.replace vence
+    com um arquivo inteiro. Se o bloco levantar uma exceção, o temporário é
+    apagado e o destino fica como estava.
+    """
+    pasta, nome = os.path.split(os.path.abspath(destino))
+    descritor, temporario = tempfile.mkstemp(prefix=nome + ".", suffix=".tmp", dir=pasta)
+    os.close(descritor)
+    os.chmod(temporario, 0o644)   # mkstemp cria só com permissão do dono
+    try:
+        yield temporario
+        os.replace(temporario, destino)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+
+def gravar_atomico(tabela, destino):
+    """Grava o Feather sem compressão (permite leitura via memory map)."""
+    with gravando(destino) as temporario:
+        feather.write_feather(tabela, temporario, compression="uncompressed")
+
+
+def construir_snapshot(caminho_csv=CAMINHO_CSV, destino=None):
+    """Converte o CSV em um snapshot colunar tipado e podado."""
+    destino = destino or caminho_snapshot(caminho_csv)
+    gravar_atomico(construir_tabela(ler_csv(caminho_csv)), destino)
+    return destino
+
+
+def preparar_bloco(bloco, codigos, ano_minimo=None, por_cod_cidade=None):
+    """Derivações de construir_tabela aplicadas a um bloco do CSV.
+
+    `por_cod_cidade` é a tabela cod_cidade -> cod_ibge de quem não casou
+    pelo nome (ver municipios.associar_ibge); sem ela, vale a do bloco.
+    """
+    if ano_minimo is not None:
+        bloco = bloco[bloco["ano_letivo_ini"] >= ano_minimo]
+    bloco = bloco.reset_index(drop=True)
+    bloco["hash_linha"] = hash_linhas(bloco)
+    bloco = derivar_colunas(bloco)
+    bloco["cod_ibge"] = associar_ibge(bloco, codigos, por_cod_cidade=por_cod_cidade)
+    # Inteiros mantêm a largura: todos os blocos precisam do mesmo tipo
+    return compactar(bloco, inteiros=False)
+
+
+def esquema_blocos(caminho_csv=CAMINHO_CSV, codigos=None):
+    """Esquema fixo do snapshot gravado em blocos, a partir do cabeçalho do CSV.
+
+    Os inteiros ficam com a largura cheia, as categorias viram
+    dictionary<int32, string> (o dicionário cresce entre blocos) e colunas
+    sem tipo próprio viram texto.
+    """
+    codigos = codigos_por_nome() if codigos is None else codigos
+    vazio = preparar_bloco(ler_csv(caminho_csv, nrows=0), codigos)
+    amostra = vazio.astype({col: "category" for col in COLUNAS_CATEGORICAS})
+    esquema = pa.Schema.from_pandas(amostra, preserve_index=False)
+    for i, campo in enumerate(esquema):
+        if campo.name in COLUNAS_CATEGORICAS:
+            esquema = esquema.set(i, pa.field(campo.name, pa.dictionary(pa.int32(), pa.string())))
+        elif pa.types.is_null(campo.type):
+            esquema = esquema.set(i, pa.field(campo.name, pa.string()))
+    metadados = dict(esquema.metadata or {})
+    metadados[b"versao_snapshot"] = VERSAO_SNAPSHOT.encode()
+    return esquema.with_metadata(metadados)
+
+
+def _lote_arrow(bloco, esquema, categorias):
+    """Converte o bloco em RecordBatch, estendendo os dicionários em `categorias`.
+
+    Cada dicionário só ganha valores no fim, então o escritor grava apenas
+    o delta do bloco em vez de repetir as categorias.
+    """
+    colunas = []
+    for campo in esquema:
+        serie = bloco[campo.name]
+        if campo.name in categorias:
+            posicoes = categorias[campo.name]
+            valores = serie.astype(object)
+            for valor in pd.unique(valores.dropna()):
+                posicoes.setdefault(valor, len(posicoes))
+            codigos = pd.Categorical(valores, categories=list(posicoes)).codes
+            colunas.append(pa.DictionaryArray.from_arrays(
+                pa.array(codigos, type=pa.int32(), mask=codigos < 0),
+                pa.array(list(posicoes), type=pa.string())
+            ))
+        else:
+            colunas.append(pa.Array.from_pandas(serie, type=campo.type))
+    return pa.RecordBatch.from_arrays(colunas, schema=esquema)
+
+
+def gravar_blocos(blocos, destino, esquema):
+    """Grava os DataFrames de `blocos` (já preparados) um lote por vez.
+
+    Todos são convertidos para `esquema` (ver esquema_blocos), então só o
+    bloco atual fica em memória. O destino só é trocado no fim; se `blocos`
+    levantar uma exceção, o arquivo antigo continua lá. Devolve as linhas
+    gravadas.
+    """
+    categorias = {col: {} for col in COLUNAS_CATEGORICAS}
+    linhas = 0
+    opcoes = pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+    with gravando(destino) as temporario, pa.ipc.new_file(temporario, esquema, options=opcoes) as escritor:
+        for bloco in blocos:
+            if len(bloco):
+                escritor.write_batch(_lote_arrow(bloco, esquema, categorias))
+                linhas += len(bloco)
+    return linhas
+
+
+def construir_snapshot_em_blocos(caminho_csv=CAMINHO_CSV, destino=None, linhas_por_bloco=LINHAS_POR_BLOCO,
+                                 ano_minimo=None, cubo=None):
+    """Converte o CSV em snapshot bloco a bloco, sem carregá-lo inteiro.
+
+    O pico de memória depende de `linhas_por_bloco`, não do tamanho do
+    arquivo. Com `ano_minimo`, só entram matrículas a partir desse ano; com
+    `cubo` (um CuboContagens), as contagens são acumuladas na mesma passada.
+
+    Diferença em relação a construir_snapshot: o cod_ibge de quem não casou
+    pelo nome é herdado do cod_cidade mais comum dentro do próprio bloco.
+    """
+    destino = destino or caminho_snapshot(caminho_csv)
+    codigos = codigos_por_nome()
+
+    def blocos():
+        for bloco in ler_csv_em_blocos(caminho_csv, linhas_por_bloco):
+            bloco = preparar_bloco(bloco, codigos, ano_minimo)
+            if cubo is not None and len(bloco):
+                cubo.acumular(calcular_idade(bloco))
+            yield bloco
+
+    gravar_blocos(blocos(), destino, esquema_blocos(caminho_csv, codigos))
+    return destino
+
+
+def snapshot_atualizado(caminho_csv=CAMINHO_CSV, destino=None):
+    """True se o snapshot existe, é desta versão e é mais novo que o CSV."""
+    destino = destino or caminho_snapshot(caminho_csv)
+    if not os.path.exists(destino):
+        return False
+    if os.path.getmtime(destino) < os.path.getmtime(caminho_csv):
+        return False
+    metadados = feather.read_table(destino, memory_map=True).schema.metadata or {}
+    return metadados.get(b"versao_snapshot") == VERSAO_SNAPSHOT.encode()
+
+
+def garantir_snapshot(caminho_csv=CAMINHO_CSV, destino=None):
+    """Reconstrói o snapshot se o CSV for mais novo e devolve o caminho dele.
+
+    CSVs acima de LIMITE_CSV_MB são convertidos em blocos.
+    """
+    destino = destino or caminho_snapshot(caminho_csv)
+    if not snapshot_atualizado(caminho_csv, destino):
+        if os.path.getsize(caminho_csv) > LIMITE_CSV_MB * 1024 * 1024:
+            construir_snapshot_em_blocos(caminho_csv, destino)
+        else:
+            construir_snapshot(caminho_csv, destino)
+    return destino
+
+
+def carregar_snapshot(caminho_csv=CAMINHO_CSV, destino=None):
+    """Lê o snapshot via memory map, reconstruindo-o se o CSV for mais novo.
+
+    Com split_blocks as colunas numéricas sem vazios viram arrays somente
+    leitura apontando direto para o arquivo mapeado: vários processos do
+    Streamlit na mesma máquina dividem essas páginas pelo cache do sistema.
+    """
+    destino = garantir_snapshot(caminho_csv, destino)
+    return feather.read_table(destino, memory_map=True).to_pandas(split_blocks=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera o snapshot colunar das matrículas")
+    parser.add_argument("--csv", default=CAMINHO_CSV, help="CSV exportado pelo sistema acadêmico")
+    parser.add_argument("--saida", default=None, help="arquivo .feather de destino")
+    parser.add_argument("--forcar", action="store_true", help="reconstrói mesmo se estiver atualizado")
+    parser.add_argument("--blocos", type=int, default=None,
+                        help="lê o CSV em blocos com esse número de linhas (memória limitada)")
+    parser.add_argument("--ano-minimo", type=int, default=None,
+                        help="só grava matrículas a partir desse ano (exige --blocos)")
+    args = parser.parse_args()
+    if args.ano_minimo is not None and not args.blocos:
+        parser.error("--ano-minimo só é aplicado na leitura em blocos; informe também --blocos")
+
+    if args.forcar or not snapshot_atualizado(args.csv, args.saida):
+        if args.blocos:
+            destino = construir_snapshot_em_blocos(args.csv, args.saida, args.blocos, args.ano_minimo)
+        else:
+            destino = construir_snapshot(args.csv, args.saida)
+        print(f"Snapshot gravado em {destino}")
+    else:
+        print("Snapshot já está atualizado")
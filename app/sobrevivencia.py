@@ -0,0 +1,109 @@
+"""Curvas de permanência (Kaplan–Meier) e incidência acumulada por desfecho.
+
+Cada matrícula sai do curso por um de dois desfechos concorrentes, Egresso
+ou Sem êxito, no tempo entre dt_matricula e dt_ultimo_evento
+(tempo_permanencia_meses). Quem ainda está Matriculado é censurado no
+último evento registrado.
+
+Todas as curvas de todos os grupos saem de uma passada só: o tempo é
+discretizado em períodos de `passo` meses, e (grupo, período, desfecho) vira
+um índice único contado com np.bincount (uma ordenação por contagem). Em
+risco, sobrevivência e incidência são somas e produtos acumulados ao longo
+do eixo do tempo de uma matriz grupos x períodos, sem laço por grupo.
+"""
+import numpy as np
+import pandas as pd
+
+from transformacoes import STATUS_PADRAO
+
+EGRESSO = "Egresso"
+SEM_EXITO = STATUS_PADRAO
+DESFECHOS = [EGRESSO, SEM_EXITO]   # códigos 1 e 2; qualquer outro status é censura
+
+COLUNA_TEMPO = "tempo_permanencia_meses"
+
+
+def _codigos_grupo(df, por):
+    """Código do grupo de cada linha (-1 se falta alguma chave) e os rótulos das colunas."""
+    codigos = np.zeros(len(df), dtype=np.int64)
+    valido = np.ones(len(df), dtype=bool)
+    distintos = []
+    for col in por:
+        codigos_col, distintos_col = pd.factorize(df[col], sort=True)
+        valido &= codigos_col >= 0
+        codigos = codigos * len(distintos_col) + codigos_col
+        distintos.append(distintos_col)
+    return np.where(valido, codigos, -1), distintos
+
+
+def tabela_vida(df, por=("ano_letivo_ini",), passo=1, coluna_tempo=COLUNA_TEMPO):
+    """Tábua de vida de cada grupo de `por`, um registro por (grupo, período).
+
+    Colunas: as de `por`, meses (início do período), em_risco, egressos,
+    sem_exito, censurados, sobrevivencia (ainda sem desfecho ao fim do
+    período), incidencia_egresso e incidencia_sem_exito (Aalen–Johansen).
+    Linhas sem tempo válido ou sem chave de grupo ficam de fora.
+    """
+    por = list(por)
+    tempo = df[coluna_tempo].to_numpy(dtype="float64", na_value=np.nan)
+    grupo, distintos = _codigos_grupo(df, por)
+    validos = np.isfinite(tempo) & (tempo >= 0) & (grupo >= 0)
+
+    periodo = (tempo[validos] // passo).astype(np.int64)
+    grupo = grupo[validos]
+    desfecho = pd.Categorical(df["status"].to_numpy()[validos], categories=DESFECHOS).codes + 1
+
+    n_grupos = int(np.prod([len(d) for d in distintos]))
+    n_periodos = int(periodo.max()) + 1 if len(periodo) else 0
+    contagens = np.bincount(
+        (grupo * n_periodos + periodo) * 3 + desfecho,
+        minlength=n_grupos * n_periodos * 3
+    ).reshape(n_grupos, n_periodos, 3)
+
+    # Quem sai no período (por desfecho ou censura) ainda estava em risco nele
+    saidas = contagens.sum(axis=2)
+    em_risco = saidas[:, ::-1].cumsum(axis=1)[:, ::-1]
+    egressos, sem_exito = contagens[:, :, 1], contagens[:, :, 2]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        risco_egresso = np.where(em_risco > 0, egressos / em_risco, 0.0)
+        risco_sem_exito = np.where(em_risco > 0, sem_exito / em_risco, 0.0)
+    sobrevivencia = np.cumprod(1 - risco_egresso - risco_sem_exito, axis=1)
+    antes = np.hstack([np.ones((n_grupos, min(n_periodos, 1))), sobrevivencia[:, :-1]])
+
+    # Rótulos de cada linha da matriz achatada (grupo-major, tempo crescente)
+    codigos = np.unravel_index(np.repeat(np.arange(n_grupos), n_periodos), [len(d) for d in distintos])
+    tabela = {col: distintos[i].take(codigos[i]) for i, col in enumerate(por)}
+    tabela.update({
+        "meses": np.tile(np.arange(n_periodos) * passo, n_grupos),
+        "em_risco": em_risco.ravel(),
+        "egressos": egressos.ravel(),
+        "sem_exito": sem_exito.ravel(),
+        "censurados": contagens[:, :, 0].ravel(),
+        "sobrevivencia": sobrevivencia.ravel(),
+        "incidencia_egresso": np.cumsum(antes * risco_egresso, axis=1).ravel(),
+        "incidencia_sem_exito": np.cumsum(antes * risco_sem_exito, axis=1).ravel(),
+    })
+    tabela = pd.DataFrame(tabela)
+    # Depois da última saída o grupo não tem mais ninguém em risco
+    return tabela[tabela["em_risco"] > 0].reset_index(drop=True)
+
+
+def resumo(tabela, por=("ano_letivo_ini",)):
+    """Por grupo: alunos, desfechos, mediana de permanência e incidências finais.
+
+    A mediana (meses) é o início do primeiro período em que a sobrevivência
+    chega a 50%; fica vazia enquanto mais da metade do grupo segue sem desfecho.
+    """
+    por = list(por)
+    grupos = tabela.groupby(por, observed=True, sort=True)
+    resultado = grupos.agg(
+        alunos=("em_risco", "first"),
+        egressos=("egressos", "sum"),
+        sem_exito=("sem_exito", "sum"),
+        censurados=("censurados", "sum"),
+        incidencia_egresso=("incidencia_egresso", "last"),
+        incidencia_sem_exito=("incidencia_sem_exito", "last"),
+    )
+    abaixo = tabela[tabela["sobrevivencia"] <= 0.5]
+    resultado["mediana_meses"] = abaixo.groupby(por, observed=True)["meses"].min()
+    return resultado.reset_index()
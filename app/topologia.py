@@ -0,0 +1,331 @@
+"""Simplificação topológica e codificação TopoJSON dos municípios.
+
+As bordas compartilhadas entre municípios viram um único arco, simplificado
+uma vez só (Douglas-Peucker), então vizinhos continuam encaixados sem
+frestas. As coordenadas são quantizadas numa grade inteira e os arcos são
+gravados em deltas, como no formato TopoJSON.
+
+Uso: python app/topologia.py  (gera um arquivo por nível de detalhe)
+"""
+import argparse
+import json
+import math
+import os
+
+from geo import CAMADAS, MUNICIPIOS_CE, ler_json
+
+CAMINHO_GEOJSON = CAMADAS[MUNICIPIOS_CE]["arquivo"]
+NOME_OBJETO = "municipios"
+QUANTIZACAO = 100000
+
+# Tolerância de simplificação (em graus) e grade de quantização de cada
+# nível de detalhe. Níveis mais grosseiros usam grades menores, já que o
+# erro da grade fica abaixo da própria tolerância.
+NIVEIS = {
+    "alto": (0.0003, 100000),
+    "medio": (0.0015, 30000),
+    "baixo": (0.0075, 10000),
+}
+
+
+def caminho_nivel(nivel, caminho_geojson=CAMINHO_GEOJSON):
+    """geojson/geojs-23-mun.json -> geojson/geojs-23-mun.medio.topojson"""
+    return f"{os.path.splitext(caminho_geojson)[0]}.{nivel}.topojson"
+
+
+def nivel_para_zoom(zoom):
+    """Nível mais leve cuja tolerância não passa de um pixel no zoom dado."""
+    graus_por_pixel = 360 / (256 * 2 ** zoom)
+    tolerancia = lambda nome: NIVEIS[nome][0]
+    candidatos = [nome for nome in NIVEIS if tolerancia(nome) <= graus_por_pixel]
+    if not candidatos:
+        return min(NIVEIS, key=tolerancia)
+    return max(candidatos, key=tolerancia)
+
+
+# -------------------------------------------------------------------------
+# Construção da topologia
+# -------------------------------------------------------------------------
+def _aneis(geometria):
+    """Lista de polígonos (cada um uma lista de anéis) da geometria."""
+    if geometria["type"] == "Polygon":
+        return [geometria["coordinates"]]
+    if geometria["type"] == "MultiPolygon":
+        return geometria["coordinates"]
+    raise ValueError(f"Geometria não suportada: {geometria['type']}")
+
+
+def _quantizar(geojson, q):
+    xs, ys = [], []
+    for feature in geojson["features"]:
+        for poligono in _aneis(feature["geometry"]):
+            for anel in poligono:
+                for x, y in anel:
+                    xs.append(x)
+                    ys.append(y)
+    x0, y0 = min(xs), min(ys)
+    kx = (max(xs) - x0) / (q - 1) or 1
+    ky = (max(ys) - y0) / (q - 1) or 1
+
+    poligonos_por_feature = []
+    for feature in geojson["features"]:
+        poligonos = []
+        for poligono in _aneis(feature["geometry"]):
+            aneis = []
+            for anel in poligono:
+                pontos = []
+                for x, y in anel:
+                    ponto = (round((x - x0) / kx), round((y - y0) / ky))
+                    if not pontos or pontos[-1] != ponto:
+                        pontos.append(ponto)
+                if pontos[0] != pontos[-1]:
+                    pontos.append(pontos[0])
+                if len(pontos) >= 4:
+                    aneis.append(pontos)
+            if aneis:
+                poligonos.append(aneis)
+        poligonos_por_feature.append(poligonos)
+    transformacao = {"scale": [kx, ky], "translate": [x0, y0]}
+    return poligonos_por_feature, transformacao
+
+
+def _juncoes(poligonos_por_feature):
+    """Pontos em que anéis vizinhos deixam de compartilhar a borda."""
+    vizinhos = {}
+    juncoes = set()
+    for poligonos in poligonos_por_feature:
+        for aneis in poligonos:
+            for anel in aneis:
+                n = len(anel) - 1
+                for i in range(n):
+                    ponto = anel[i]
+                    par = frozenset((anel[i - 1], anel[i + 1]))
+                    anterior = vizinhos.setdefault(ponto, par)
+                    if anterior != par:
+                        juncoes.add(ponto)
+    return juncoes
+
+
+def _cortar_anel(anel, juncoes):
+    """Quebra o anel fechado em arcos que começam e terminam em junções."""
+    n = len(anel) - 1
+    inicio = next((i for i in range(n) if anel[i] in juncoes), None)
+    if inicio is None:
+        return [anel]
+    rodado = anel[inicio:n] + anel[:inicio + 1]
+    arcos, atual = [], [rodado[0]]
+    for ponto in rodado[1:]:
+        atual.append(ponto)
+        if ponto in juncoes:
+            arcos.append(atual)
+            atual = [ponto]
+    return arcos
+
+
+def _chave_anel_fechado(arco):
+    # Anéis sem junção podem começar em qualquer ponto: normaliza o início
+    corpo = arco[:-1]
+    i = corpo.index(min(corpo))
+    rodado = corpo[i:] + corpo[:i]
+    return tuple(rodado + [rodado[0]])
+
+
+def _indexar_arcos(poligonos_por_feature, juncoes):
+    arcos, indices = [], {}
+    referencias = []
+    for poligonos in poligonos_por_feature:
+        ref_poligonos = []
+        for aneis in poligonos:
+            ref_aneis = []
+            for anel in aneis:
+                ref_anel = []
+                for arco in _cortar_anel(anel, juncoes):
+                    fechado = arco[0] == arco[-1] and arco[0] not in juncoes
+                    chave = _chave_anel_fechado(arco) if fechado else tuple(arco)
+                    reverso = _chave_anel_fechado(arco[::-1]) if fechado else tuple(arco[::-1])
+                    if chave in indices:
+                        ref_anel.append(indices[chave])
+                    elif reverso in indices:
+                        ref_anel.append(~indices[reverso])
+                    else:
+                        indices[chave] = len(arcos)
+                        ref_anel.append(len(arcos))
+                        arcos.append(list(chave))
+                ref_aneis.append(ref_anel)
+            ref_poligonos.append(ref_aneis)
+        referencias.append(ref_poligonos)
+    return arcos, referencias
+
+
+# -------------------------------------------------------------------------
+# Simplificação
+# -------------------------------------------------------------------------
+def _distancia_segmento(p, a, b):
+    (px, py), (ax, ay), (bx, by) = p, a, b
+    dx, dy = bx - ax, by - ay
+    if dx == 0 and dy == 0:
+        return math.hypot(px - ax, py - ay)
+    t = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / (dx * dx + dy * dy)))
+    return math.hypot(px - (ax + t * dx), py - (ay + t * dy))
+
+
+def _douglas_peucker(pontos, tolerancia, minimo=2):
+    """Índices mantidos pelo Douglas-Peucker (iterativo), com pelo menos `minimo` pontos."""
+    n = len(pontos)
+    if n <= 2:
+        return list(range(n))
+    importancia = [0.0] * n
+    importancia[0] = importancia[-1] = math.inf
+    pilha = [(0, n - 1, math.inf)]
+    while pilha:
+        i, j, limite = pilha.pop()
+        maior, k = -1.0, None
+        for m in range(i + 1, j):
+            d = _distancia_segmento(pontos[m], pontos[i], pontos[j])
+            if d > maior:
+                maior, k = d, m
+        if k is None:
+            continue
+        # Um ponto nunca é mais importante que o que dividiu o trecho antes dele
+        importancia[k] = min(maior, limite)
+        pilha.append((i, k, importancia[k]))
+        pilha.append((k, j, importancia[k]))
+    # Com a importância de cada ponto, o corte por tolerância e o mínimo de
+    # pontos saem da mesma ordenação.
+    ordem = sorted(range(n), key=lambda idx: -importancia[idx])
+    mantidos = {idx for idx in ordem if importancia[idx] > tolerancia}
+    mantidos.update(ordem[:min(minimo, n)])
+    return sorted(mantidos)
+
+
+def _simplificar_arco(arco, tolerancia, minimo=2):
+    if arco[0] == arco[-1]:
+        # Arco fechado: corta no ponto mais distante do início e garante
+        # ao menos um triângulo
+        distancias = [math.hypot(x - arco[0][0], y - arco[0][1]) for x, y in arco]
+        k = max(range(len(arco)), key=distancias.__getitem__)
+        ida = _douglas_peucker(arco[:k + 1], tolerancia, max(3, minimo))
+        volta = _douglas_peucker(arco[k:], tolerancia, max(3, minimo))
+        return [arco[i] for i in ida] + [arco[k + i] for i in volta[1:]]
+    return [arco[i] for i in _douglas_peucker(arco, tolerancia, minimo)]
+
+
+def _simplificar(arcos, referencias, tolerancia):
+    simplificados = [_simplificar_arco(arco, tolerancia) for arco in arcos]
+    # Anéis que viraram menos que um triângulo recebem pontos de volta nos
+    # seus arcos (o que também vale para o vizinho, mantendo a borda igual)
+    for ref_poligonos in referencias:
+        for ref_aneis in ref_poligonos:
+            for ref_anel in ref_aneis:
+                indices = [i if i >= 0 else ~i for i in ref_anel]
+                distintos = sum(len(simplificados[i]) - 1 for i in indices)
+                if distintos < 3:
+                    for i in indices:
+                        simplificados[i] = _simplificar_arco(arcos[i], tolerancia, minimo=3)
+    return simplificados
+
+
+def construir_topologia(geojson, tolerancia, quantizacao=QUANTIZACAO, objeto=NOME_OBJETO):
+    """GeoJSON de polígonos -> dicionário TopoJSON simplificado e quantizado."""
+    poligonos_por_feature, transformacao = _quantizar(geojson, quantizacao)
+    juncoes = _juncoes(poligonos_por_feature)
+    arcos, referencias = _indexar_arcos(poligonos_por_feature, juncoes)
+
+    escala = min(transformacao["scale"])
+    simplificados = _simplificar(arcos, referencias, tolerancia / escala)
+
+    geometrias = []
+    for feature, ref_poligonos in zip(geojson["features"], referencias):
+        geometria = {"properties": feature.get("properties", {})}
+        if "id" in feature:
+            geometria["id"] = feature["id"]
+        if len(ref_poligonos) == 1:
+            geometria.update(type="Polygon", arcs=ref_poligonos[0])
+        else:
+            geometria.update(type="MultiPolygon", arcs=ref_poligonos)
+        geometrias.append(geometria)
+
+    return {
+        "type": "Topology",
+        "transform": transformacao,
+        "objects": {objeto: {"type": "GeometryCollection", "geometries": geometrias}},
+        "arcs": [_delta(arco) for arco in simplificados],
+    }
+
+
+def _delta(arco):
+    x0, y0 = arco[0]
+    codificado = [[x0, y0]]
+    for x, y in arco[1:]:
+        codificado.append([x - x0, y - y0])
+        x0, y0 = x, y
+    return codificado
+
+
+# -------------------------------------------------------------------------
+# Decodificação
+# -------------------------------------------------------------------------
+def decodificar(topologia, objeto=NOME_OBJETO):
+    """TopoJSON -> GeoJSON FeatureCollection, com coordenadas arredondadas
+    para a precisão da quantização."""
+    (kx, ky), (x0, y0) = topologia["transform"]["scale"], topologia["transform"]["translate"]
+    casas = max(0, -math.floor(math.log10(min(kx, ky))))
+
+    arcos = []
+    for arco in topologia["arcs"]:
+        x = y = 0
+        pontos = []
+        for dx, dy in arco:
+            x += dx
+            y += dy
+            pontos.append([round(x * kx + x0, casas), round(y * ky + y0, casas)])
+        arcos.append(pontos)
+
+    def anel(refs):
+        pontos = []
+        for i in refs:
+            trecho = arcos[i] if i >= 0 else arcos[~i][::-1]
+            pontos.extend(trecho if not pontos else trecho[1:])
+        return pontos
+
+    features = []
+    for geometria in topologia["objects"][objeto]["geometries"]:
+        if geometria["type"] == "Polygon":
+            coordenadas = [anel(refs) for refs in geometria["arcs"]]
+        else:
+            coordenadas = [[anel(refs) for refs in poligono] for poligono in geometria["arcs"]]
+        feature = {
+            "type": "Feature",
+            "properties": geometria.get("properties", {}),
+            "geometry": {"type": geometria["type"], "coordinates": coordenadas},
+        }
+        if "id" in geometria:
+            feature["id"] = geometria["id"]
+        features.append(feature)
+    return {"type": "FeatureCollection", "features": features}
+
+
+def gerar_niveis(caminho_geojson=CAMINHO_GEOJSON, niveis=NIVEIS):
+    """Grava um TopoJSON por nível de detalhe ao lado do GeoJSON original."""
+    geojson = ler_json(caminho_geojson)
+    gerados = {}
+    for nivel, (tolerancia, quantizacao) in niveis.items():
+        destino = caminho_nivel(nivel, caminho_geojson)
+        topologia = construir_topologia(geojson, tolerancia, quantizacao)
+        temporario = destino + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(topologia, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(temporario, destino)
+        gerados[nivel] = destino
+    return gerados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera TopoJSON simplificado dos municípios")
+    parser.add_argument("--geojson", default=CAMINHO_GEOJSON)
+    args = parser.parse_args()
+
+    original = os.path.getsize(args.geojson)
+    for nivel, destino in gerar_niveis(args.geojson).items():
+        tamanho = os.path.getsize(destino)
+        print(f"{nivel:>6}: {destino} ({tamanho / 1024:.0f} KB, {original / tamanho:.1f}x menor)")
@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+
+from datas import decodificar_datas
+
+# Tabelas de tradução das colunas derivadas. Valores fora das tabelas caem
+# no valor padrão de cada coluna.
+STATUS_POR_SITUACAO = {
+    'Matriculado': 'Matriculado',
+    'Concludente': 'Matriculado',
+    'Estagiario (Concludente)': 'Matriculado',
+    'Trancado': 'Matriculado',
+    'Formado': 'Egresso',
+}
+STATUS_PADRAO = 'Sem êxito'
+
+COR_AGRUPADA = {
+    'Não dispõe da informação': 'SI',
+    'Não quis declarar cor/raça': 'SI',
+}
+
+GRUPO_POR_COR = {
+    'Preta': 'PPI',
+    'Parda': 'PPI',
+    'Indígena': 'PPI',
+    'Branca': 'Branca e amarela',
+    'Amarela': 'Branca e amarela',
+}
+GRUPO_PADRAO = 'Sem informação'
+
+
+# Função para converter colunas para snake_case
+def snake_case(s):
+    return s.strip().lower().replace(" ", "_").replace("-", "_")
+
+
+def mapear_categorias(serie, tabela, padrao=None):
+    """Aplica a tabela apenas nos valores distintos e espalha o resultado
+    pelos códigos, sem chamar Python por linha.
+
+    Sem `padrao`, valores fora da tabela (e nulos) são mantidos como estão.
+    Com `padrao`, tudo que não está na tabela, inclusive nulos, vira `padrao`.
+    """
+    codigos, distintos = pd.factorize(serie)
+    if padrao is None:
+        traduzidos = np.array([tabela.get(v, v) for v in distintos] + [np.nan], dtype=object)
+    else:
+        traduzidos = np.array([tabela.get(v, padrao) for v in distintos] + [padrao], dtype=object)
+    # factorize marca nulos com -1, que aponta para a última posição
+    return pd.Series(traduzidos[codigos], index=serie.index, name=serie.name)
+
+
+def cortar_uf(texto_cidade):
+    """'Fortaleza - CE' -> 'Fortaleza' (remove os 5 últimos caracteres)."""
+    tamanho = texto_cidade.str.len()
+    return texto_cidade.where(~(tamanho > 5), texto_cidade.str[:-5])
+
+
+def separar_evento(ultimo_evento):
+    """Quebra 'Evento: dd/mm/aaaa' em (evento, data) com um único split."""
+    partes = ultimo_evento.str.split(":", n=2, expand=True)
+    # Sem nenhum ":" (ou sem linhas) o expand não cria a coluna da data
+    partes = partes.reindex(columns=[0, 1]).astype(object)
+    return partes[0], partes[1]
+
+
+def normalizar_colunas(df):
+    """Limpa os valores do export: cidade sem UF, cor agrupada, evento
+    separado da data, datas e coeficiente tipados."""
+    df["cidade"] = cortar_uf(df["texto_cidade"])
+    df["desc_cor"] = mapear_categorias(df["desc_cor"], COR_AGRUPADA)
+
+    evento, data_evento = separar_evento(df["ultimo_evento_matricula"])
+    df["ultimo_evento_matricula"] = evento
+    df["dt_ultimo_evento"] = data_evento
+    # Formato explícito (dd/mm/aaaa); as falhas ficam em df.attrs para relatório
+    df.attrs["falhas_datas"] = decodificar_datas(df)
+
+    # O CSV usa vírgula decimal ("8,97"). ler_csv já lê como número (ver
+    # esquema.py); leituras sem o esquema ainda trazem a coluna como texto
+    if df['coeficiente_rendimento'].dtype == object:
+        df['coeficiente_rendimento'] = pd.to_numeric(
+            df['coeficiente_rendimento'].str.replace(',', '.', regex=False), errors='coerce'
+        )
+    return df
+
+
+def derivar_indicadores(df):
+    """Status, grupo de raça/cor e tempo de permanência (colunas já normalizadas)."""
+    df["status"] = mapear_categorias(df["desc_sit_matricula"], STATUS_POR_SITUACAO, STATUS_PADRAO)
+    df["grupo"] = mapear_categorias(df["desc_cor"], GRUPO_POR_COR, GRUPO_PADRAO)
+
+    dias = (df["dt_ultimo_evento"] - df["dt_matricula"]).dt.days
+    df["tempo_permanencia"] = dias / 365.25
+    df['tempo_permanencia_meses'] = dias / 30.44
+    return df
+
+
+def derivar_colunas(df):
+    """Cria as colunas derivadas do painel (exceto idade) de forma vetorizada."""
+    return derivar_indicadores(normalizar_colunas(df))
+
+
+def calcular_idade(df, hoje=None):
+    """Idade em anos completos (aproximada por 365 dias) a partir de dt_nascimento."""
+    hoje = pd.Timestamp('today') if hoje is None else hoje
+    df['idade'] = (hoje - df['dt_nascimento']).dt.days // 365
+    return df
+
+
+def preparar(df):
+    """Pipeline completo de colunas derivadas usado pelos painéis."""
+    return calcular_idade(derivar_colunas(df))
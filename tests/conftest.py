@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Os módulos do painel são importados como no Streamlit (from carga import ...),
+# e os caminhos de dados são relativos à raiz do repositório
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RAIZ, "app"))
+os.chdir(RAIZ)
@@ -0,0 +1,43 @@
+"""Conversão das colunas de data com formato explícito (datas.py)."""
+import pandas as pd
+
+from datas import DATA, DATA_HORA, converter_datas, decodificar_datas
+
+
+def test_converter_datas_formato_desconhecido_conta_como_falha():
+    serie = pd.Series(["01/02/2020", "2020-02-01", "01/02/2020", "", None, " 15/03/2021 "])
+
+    datas, falhas = converter_datas(serie)
+
+    assert falhas == 1                       # só o ISO; vazio e nulo não contam
+    assert datas.iloc[0] == datas.iloc[2] == pd.Timestamp("2020-02-01")
+    assert datas.iloc[5] == pd.Timestamp("2021-03-15")
+    assert datas.iloc[[1, 3, 4]].isna().all()
+    assert datas.index.equals(serie.index)
+
+
+def test_converter_datas_formatos_em_ordem():
+    serie = pd.Series(["01/02/2020", "01/02/2020 08:30:00", "31/02/2020"])
+
+    so_data, falhas_so_data = converter_datas(serie, (DATA,))
+    datas, falhas = converter_datas(serie, (DATA, DATA_HORA))
+
+    assert falhas_so_data == 2 and pd.isna(so_data.iloc[1])
+    assert falhas == 1                       # 31/02 não existe em nenhum formato
+    assert datas.iloc[1] == pd.Timestamp("2020-02-01 08:30:00")
+
+
+def test_decodificar_datas_conta_por_coluna():
+    df = pd.DataFrame({
+        "dt_nascimento": ["10/05/2001", "xx"],
+        "dt_cadastro": ["01/02/2020 08:30:00", "01/02/2020"],
+        "outra": ["a", "b"],
+    })
+
+    falhas = decodificar_datas(df)
+
+    assert falhas == {"dt_nascimento": 1, "dt_cadastro": 0}
+    assert pd.api.types.is_datetime64_any_dtype(df["dt_cadastro"])
+    assert df["outra"].tolist() == ["a", "b"]
+    # Já convertidas não são tocadas de novo
+    assert decodificar_datas(df) == {}
@@ -0,0 +1,61 @@
+"""Leitura tipada pelo esquema do export (esquema.py)."""
+import pandas as pd
+import pytest
+
+from esquema import ler_csv, validar
+from snapshot import CAMINHO_CSV, ler_csv_em_blocos
+
+COLUNAS = ["cod_matricula", "ano_letivo_ini", "cod_cidade", "coeficiente_rendimento"]
+
+
+def _export(tmp_path, alterar=None, nome="export.csv"):
+    bruto = pd.read_csv(CAMINHO_CSV, sep=";", encoding="latin", dtype=str, keep_default_na=False, nrows=300)
+    if alterar:
+        alterar(bruto)
+    caminho = tmp_path / nome
+    bruto.to_csv(caminho, sep=";", encoding="latin", index=False)
+    return str(caminho)
+
+
+def test_ler_csv_tipos_direto_do_parser(tmp_path):
+    df = ler_csv(_export(tmp_path), COLUNAS)
+
+    assert df["cod_matricula"].dtype == "int64"         # obrigatória
+    assert df["cod_cidade"].dtype == "Int64"            # aceita vazio
+    assert df["coeficiente_rendimento"].dtype == "float64"
+    assert df.attrs["falhas_inteiros"] == {}
+
+
+def _quebrar(bruto):
+    bruto.loc[7, "Cod_cidade"] = "abc"
+    bruto.loc[250, "Cod_cidade"] = "168.5"
+    bruto.loc[9, "Cod_cidade"] = ""                      # vazio não é falha
+
+
+def test_ler_csv_inteiro_invalido_vira_na_e_conta(tmp_path):
+    caminho = _export(tmp_path, _quebrar)
+    integro = ler_csv(_export(tmp_path, nome="integro.csv"), COLUNAS)
+
+    df = ler_csv(caminho, COLUNAS)
+
+    assert df.attrs["falhas_inteiros"] == {"cod_cidade": 2}
+    assert df["cod_cidade"].dtype == "Int64"
+    assert df.loc[[7, 9, 250], "cod_cidade"].isna().all()
+    assert df["cod_cidade"].notna().sum() == integro["cod_cidade"].notna().sum() - 3
+
+    relatorio = validar(caminho)
+    formato = relatorio[(relatorio["coluna"] == "Cod_cidade") & (relatorio["regra"] == "formato")]
+    assert formato["linhas"].tolist() == [2]
+    assert set(formato["exemplos"].iloc[0]) == {"abc", "168.5"}
+
+
+@pytest.mark.parametrize("linhas_por_bloco", [100, 1000])
+def test_ler_csv_em_blocos_continua_como_texto(tmp_path, linhas_por_bloco):
+    caminho = _export(tmp_path, _quebrar)
+
+    blocos = list(ler_csv_em_blocos(caminho, linhas_por_bloco))
+    df = pd.concat(blocos, ignore_index=True)
+
+    assert len(df) == 300
+    pd.testing.assert_series_equal(df["cod_cidade"], ler_csv(caminho, COLUNAS)["cod_cidade"])
+    assert sum(b.attrs["falhas_inteiros"].get("cod_cidade", 0) for b in blocos) == 2
@@ -0,0 +1,141 @@
+"""Cache das camadas geográficas (geo.baixar) e junção por código IBGE (municipios)."""
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.error import URLError
+
+import pandas as pd
+import pytest
+
+from geo import baixar
+from municipios import associar_ibge, codigos_por_nome, ibge_por_cod_cidade
+
+# -------------------------------------------------------------------------
+# geo.baixar: cópia por sha256 e revalidação condicional
+# -------------------------------------------------------------------------
+ETAG = '"v1"'
+
+
+class _Origem(BaseHTTPRequestHandler):
+    conteudo = b'{"type": "FeatureCollection", "features": []}'
+    pedidos = []
+
+    def do_GET(self):
+        self.pedidos.append(dict(self.headers))
+        if self.headers.get("If-None-Match") == ETAG and self.conteudo == _Origem.conteudo_v1:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", ETAG if self.conteudo == _Origem.conteudo_v1 else '"v2"')
+        self.send_header("Content-Length", str(len(self.conteudo)))
+        self.end_headers()
+        self.wfile.write(self.conteudo)
+
+    def log_message(self, *args):
+        pass
+
+
+_Origem.conteudo_v1 = _Origem.conteudo
+
+
+@pytest.fixture()
+def origem():
+    _Origem.pedidos = []
+    _Origem.conteudo = _Origem.conteudo_v1
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), _Origem)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    yield servidor, f"http://127.0.0.1:{servidor.server_address[1]}/camada.json"
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def test_baixar_guarda_pelo_sha256_e_nao_repete_dentro_da_validade(origem, tmp_path):
+    _, url = origem
+    caminho = baixar(url, pasta=str(tmp_path))
+
+    with open(caminho, "rb") as f:
+        assert f.read() == _Origem.conteudo_v1
+    indice = json.load(open(tmp_path / "indice.json"))
+    assert os.path.basename(caminho) == indice[url]["sha256"] + ".json"
+    assert indice[url]["etag"] == ETAG
+
+    assert baixar(url, pasta=str(tmp_path)) == caminho
+    assert len(_Origem.pedidos) == 1
+
+
+def test_baixar_revalida_com_etag(origem, tmp_path):
+    _, url = origem
+    caminho = baixar(url, pasta=str(tmp_path))
+    verificado = json.load(open(tmp_path / "indice.json"))[url]["verificado"]
+
+    # Vencida e sem mudança na origem: 304, mesma cópia, verificação renovada
+    assert baixar(url, pasta=str(tmp_path), max_idade_horas=0) == caminho
+    assert _Origem.pedidos[-1].get("If-None-Match") == ETAG
+    assert json.load(open(tmp_path / "indice.json"))[url]["verificado"] >= verificado
+
+    # A origem mudou: cópia nova com outro nome, a antiga continua no disco
+    _Origem.conteudo = b'{"type": "FeatureCollection", "features": [], "versao": 2}'
+    novo = baixar(url, pasta=str(tmp_path), max_idade_horas=0)
+    assert novo != caminho and os.path.exists(caminho)
+    with open(novo, "rb") as f:
+        assert f.read() == _Origem.conteudo
+
+
+def test_baixar_sem_rede_usa_a_ultima_copia(origem, tmp_path):
+    servidor, url = origem
+    caminho = baixar(url, pasta=str(tmp_path))
+    servidor.shutdown()
+    servidor.server_close()
+
+    assert baixar(url, pasta=str(tmp_path), max_idade_horas=0) == caminho
+    with pytest.raises(URLError):
+        baixar(url + "?outra", pasta=str(tmp_path))
+
+
+# -------------------------------------------------------------------------
+# municipios.associar_ibge
+# -------------------------------------------------------------------------
+@pytest.fixture(scope="module")
+def codigos():
+    return codigos_por_nome()
+
+
+def _cidades(*linhas):
+    return pd.DataFrame(linhas, columns=["texto_cidade", "cod_cidade"]).astype({"cod_cidade": "Int64"})
+
+
+def test_associar_ibge_nome_normalizado_e_apelido(codigos):
+    # O GeoJSON ainda grava Itapajé como "Itapagé"
+    df = _cidades(("Itapajé - CE", 1), ("  maracanaú - ce", 2), ("Fortaleza - SP", 3))
+    ibge = associar_ibge(df, codigos)
+
+    assert ibge.iloc[0] == codigos["itapage"]
+    assert ibge.iloc[1] == codigos["maracanau"]
+    assert pd.isna(ibge.iloc[2])      # outra UF não entra no mapa do Ceará
+
+
+def test_associar_ibge_herda_pelo_cod_cidade(codigos):
+    df = _cidades(
+        ("Fortaleza - CE", 168), ("Fortaleza - CE", 168), ("Sobral - CE", 168),
+        ("Fortaleza (grafia errada) - CE", 168),   # herda o mais comum entre os 168
+        ("Lugar Nenhum - CE", 999),                # cod_cidade sem ninguém resolvido
+    )
+    ibge = associar_ibge(df, codigos)
+
+    assert ibge.iloc[3] == codigos["fortaleza"]
+    assert pd.isna(ibge.iloc[4])
+
+
+def test_associar_ibge_tabela_externa_tem_precedencia(codigos):
+    # Num lote pequeno (linhas alteradas) a tabela vem da base inteira
+    base = _cidades(("Sobral - CE", 168), ("Sobral - CE", 168), ("Fortaleza - CE", 999))
+    tabela = ibge_por_cod_cidade(base, codigos)
+    lote = _cidades(("Fortaleza - CE", 168), ("Grafia Errada - CE", 168), ("Outra Errada - CE", 999))
+
+    ibge = associar_ibge(lote, codigos, por_cod_cidade=tabela)
+
+    assert ibge.iloc[1] == codigos["sobral"]
+    assert ibge.iloc[2] == codigos["fortaleza"]
+    assert associar_ibge(lote, codigos).iloc[1] == codigos["fortaleza"]
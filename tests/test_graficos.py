@@ -0,0 +1,77 @@
+import pandas as pd
+import pytest
+
+import graficos
+from cubo import CuboContagens
+from graficos import MODOS_BOX, bar_with_percent, box_plot, estatisticas_box
+
+
+def _recorte(status, valores):
+    return pd.DataFrame({
+        "status": pd.Series(status, dtype="category"),
+        "coeficiente_rendimento": pd.Series(valores, dtype="float64"),
+    })
+
+
+def test_estatisticas_box_quartis_e_bigodes():
+    df = _recorte(["Egresso"] * 5 + ["Sem êxito"] * 2, [1, 2, 3, 4, 100, 5, 7])
+    stats, outliers = estatisticas_box(df, "status", "coeficiente_rendimento")
+
+    assert list(stats.index) == ["Egresso", "Sem êxito"]
+    egresso = stats.loc["Egresso"]
+    assert (egresso["q1"], egresso["mediana"], egresso["q3"]) == (2, 3, 4)
+    assert egresso["bigode_sup"] == 4
+    assert outliers["coeficiente_rendimento"].tolist() == [100]
+    assert stats.loc["Sem êxito", "n"] == 2
+
+
+def test_estatisticas_box_recorte_vazio():
+    stats, outliers = estatisticas_box(_recorte([], []), "status", "coeficiente_rendimento")
+
+    assert stats.empty and outliers.empty
+    assert {"q1", "mediana", "q3", "bigode_inf", "bigode_sup"} <= set(stats.columns)
+
+
+@pytest.mark.parametrize("modo", MODOS_BOX)
+def test_box_plot_recorte_vazio(modo):
+    fig = box_plot(_recorte([], []), "status", "coeficiente_rendimento", "Vazio", modo=modo, pontos_por_grupo=50)
+    assert fig.layout.title.text == "Vazio"
+
+
+def test_bar_with_percent_rotulos():
+    fig = bar_with_percent(pd.Series([3, 1], index=["F", "M"]), "Sexo", "Qtd", "Por sexo")
+    assert list(fig.data[0].text) == ["3 (75.0%)", "1 (25.0%)"]
+
+
+def test_bar_with_percent_contagem_vazia():
+    fig = bar_with_percent(pd.Series([], dtype="int64"), "Sexo", "Qtd", "Vazio")
+    assert fig.layout.title.text == "Vazio"
+    assert len(fig.data[0].x) == 0
+
+
+def _cubo():
+    return CuboContagens(pd.DataFrame({
+        "sexo": ["F", "M"], "desc_cor": ["Parda", "Branca"], "status": ["Egresso", "Matriculado"],
+        "ano_letivo_ini": [2020, 2021], "periodo_letivo_ini": [1, 2],
+        "cidade": ["Fortaleza", "Sobral"], "cod_ibge": [2304400, 2312908], "grupo": ["PPI", "Branca e amarela"],
+        "idade": [20, 31], "desc_tipo_escola_origem": ["Pública", "Privada"],
+        "desc_sit_matricula": ["Formado", "Matriculado"],
+    }))
+
+
+@pytest.mark.parametrize("grafico", [
+    graficos.distribuicao_idade, graficos.distribuicao_sexo, graficos.proporcao_sexo_ano,
+    graficos.distribuicao_grupo, graficos.proporcao_cor_ano, graficos.barras_cor, graficos.barras_escola,
+    graficos.abandono_por_ano, graficos.cursando_por_ano, graficos.distribuicao_status, graficos.status_por_ano,
+], ids=lambda grafico: grafico.__name__)
+def test_graficos_do_cubo_recorte_vazio(grafico):
+    # Nenhuma matrícula no ano escolhido (p.ex. último ano + status Egresso)
+    fig = grafico(_cubo(), {"ano_letivo_ini": [2021], "status": ["Egresso"]})
+    for trace in fig.data:
+        assert len(trace.values if trace.type == "pie" else trace.x) == 0
+
+
+def test_distribuicao_idade_rotulos():
+    fig = graficos.distribuicao_idade(_cubo(), {})
+    assert list(fig.data[0].x) == [20, 31]
+    assert list(fig.data[0].text) == ["1 (50.0%)", "1 (50.0%)"]
@@ -0,0 +1,158 @@
+"""Atualização incremental do snapshot (incremental.py) e do cubo de contagens."""
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+import pytest
+from pandas.testing import assert_frame_equal
+
+from cubo import CuboContagens
+from incremental import ChaveRepetida, atualizar_snapshot, comparar
+from snapshot import CAMINHO_CSV, construir_snapshot
+from transformacoes import calcular_idade
+
+HOJE = pd.Timestamp("2026-01-01")
+
+
+def test_comparar_mantidas_alteradas_e_novas():
+    chaves_antigas = np.array([10, 20, 30, 40])
+    hashes_antigos = np.array([1, 2, 3, 4], dtype="uint64")
+    chaves_novas = np.array([40, 20, 50, 30])
+    hashes_novos = np.array([4, 2, 5, 99], dtype="uint64")
+
+    mantidas, alteradas, novas = comparar(chaves_antigas, hashes_antigos, chaves_novas, hashes_novos)
+
+    assert sorted(mantidas) == [1, 3]          # 20 e 40, posições no snapshot antigo
+    assert list(alteradas) == [2, 3]           # 50 (inédita) e 30 (hash mudou), posições no export
+    assert novas == 1
+
+
+@pytest.mark.parametrize("antigas, novas", [([1, 1, 2], [1, 2]), ([1, 2], [2, 2])])
+def test_comparar_chave_repetida(antigas, novas):
+    hashes = lambda chaves: np.zeros(len(chaves), dtype="uint64")
+    with pytest.raises(ChaveRepetida):
+        comparar(np.array(antigas), hashes(antigas), np.array(novas), hashes(novas))
+
+
+def _cubo(linhas):
+    return CuboContagens(pd.DataFrame(linhas, columns=["sexo", "status"]), filtros=["sexo"], graficos=["status"])
+
+
+def _celulas(cubo, dim):
+    corte = cubo.cortes[dim]
+    return corte.sort_values(list(corte.columns)).reset_index(drop=True)
+
+
+def test_aplicar_delta_equivale_a_recontar():
+    antes = [("F", "Egresso"), ("F", "Egresso"), ("M", "Matriculado"), ("M", "Sem êxito")]
+    # Sai um F/Egresso (exclusão), M/Sem êxito vira M/Egresso (alteração), entra F/Matriculado
+    removidas = pd.DataFrame([("F", "Egresso"), ("M", "Sem êxito")], columns=["sexo", "status"])
+    inseridas = pd.DataFrame([("M", "Egresso"), ("F", "Matriculado")], columns=["sexo", "status"])
+    depois = [("F", "Egresso"), ("M", "Matriculado"), ("M", "Egresso"), ("F", "Matriculado")]
+
+    cubo = _cubo(antes).aplicar_delta(removidas, inseridas)
+    esperado = _cubo(depois)
+    for dim in [None, "status"]:
+        assert_frame_equal(_celulas(cubo, dim), _celulas(esperado, dim), check_dtype=False)
+    # Célula que zerou some do corte
+    assert not ((cubo.cortes["status"]["sexo"] == "M") & (cubo.cortes["status"]["status"] == "Sem êxito")).any()
+    assert cubo.total({"sexo": ["M"]}) == 2
+
+
+# -------------------------------------------------------------------------
+# atualizar_snapshot contra uma reconstrução completa
+# -------------------------------------------------------------------------
+def _ler_bruto(linhas):
+    return pd.read_csv(CAMINHO_CSV, sep=";", encoding="latin", dtype=str, keep_default_na=False, nrows=linhas)
+
+
+def _gravar_csv(df, caminho):
+    df.to_csv(caminho, sep=";", encoding="latin", index=False)
+    return str(caminho)
+
+
+def _normalizado(caminho):
+    """Snapshot lido como DataFrame comparável, independente de larguras e dicionários."""
+    df = feather.read_table(caminho).to_pandas()
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(object)
+        elif pd.api.types.is_integer_dtype(df[col]) and col != "hash_linha":
+            df[col] = df[col].astype("Int64")
+    return df.sort_values("cod_matricula").reset_index(drop=True)
+
+
+@pytest.fixture()
+def exports(tmp_path):
+    antigo = _ler_bruto(400)
+    novo = antigo.copy()
+    novo.loc[1, "Desc_Sit_Matricula"] = "Formado"                 # alterada
+    nova = novo.loc[[3]].assign(cod_matricula="999999999", Texto_cidade="Cidade Fora do Mapa - CE")
+    novo = pd.concat([novo.drop(index=0), nova], ignore_index=True)  # excluída e inédita
+    return _gravar_csv(antigo, tmp_path / "antigo.csv"), _gravar_csv(novo, tmp_path / "novo.csv"), tmp_path
+
+
+def test_atualizar_snapshot_igual_a_reconstrucao(exports):
+    csv_antigo, csv_novo, pasta = exports
+    destino = str(pasta / "snapshot.feather")
+    construir_snapshot(csv_antigo, destino)
+
+    delta = atualizar_snapshot(csv_novo, destino, linhas_por_bloco=150)
+
+    assert delta.resumo() == {"mantidas": 398, "novas": 1, "alteradas": 1, "excluidas": 1}
+    # Saem a linha excluída (0) e a versão antiga da alterada (1)
+    assert sorted(delta.chaves_removidas) == sorted(_ler_bruto(2)["cod_matricula"].astype(int))
+    assert len(delta.inseridas) == 2
+
+    completo = construir_snapshot(csv_novo, str(pasta / "completo.feather"))
+    assert_frame_equal(_normalizado(destino), _normalizado(completo), check_dtype=False)
+
+
+def test_atualizar_snapshot_cod_ibge_pela_tabela_do_snapshot(exports):
+    csv_antigo, csv_novo, pasta = exports
+    destino = str(pasta / "snapshot.feather")
+    construir_snapshot(csv_antigo, destino)
+
+    delta = atualizar_snapshot(csv_novo, destino)
+
+    # A inédita não casa pelo nome; o cod_cidade dela não aparece em nenhuma
+    # outra linha alterada, então só a tabela do snapshot resolve
+    inedita = delta.inseridas.set_index("cod_matricula").loc[999999999]
+    antigo = _normalizado(destino)
+    mesma_cidade = antigo[(antigo["cod_cidade"] == inedita["cod_cidade"]) & (antigo["cod_matricula"] != 999999999)]
+    assert inedita["cod_ibge"] == mesma_cidade["cod_ibge"].mode().iloc[0]
+
+
+def test_atualizar_snapshot_cubo_pelo_delta(exports):
+    csv_antigo, csv_novo, pasta = exports
+    destino = str(pasta / "snapshot.feather")
+    construir_snapshot(csv_antigo, destino)
+    antes = calcular_idade(feather.read_table(destino).to_pandas(), HOJE)
+
+    delta = atualizar_snapshot(csv_novo, destino)
+    removidas = antes[antes["cod_matricula"].isin(delta.chaves_removidas)]
+    cubo = CuboContagens(antes).aplicar_delta(removidas, calcular_idade(delta.inseridas, HOJE))
+
+    esperado = CuboContagens(calcular_idade(feather.read_table(destino).to_pandas(), HOJE))
+    for dim, corte in esperado.cortes.items():
+        assert cubo.cortes[dim]["quantidade"].sum() == corte["quantidade"].sum()
+        colunas = list(corte.columns)
+        assert_frame_equal(
+            cubo.cortes[dim].astype(object).sort_values(colunas, key=lambda s: s.astype(str)).reset_index(drop=True),
+            corte.astype(object).sort_values(colunas, key=lambda s: s.astype(str)).reset_index(drop=True),
+        )
+
+
+def test_atualizar_snapshot_chave_repetida_nao_altera_o_arquivo(exports):
+    csv_antigo, _, pasta = exports
+    destino = str(pasta / "snapshot.feather")
+    construir_snapshot(csv_antigo, destino)
+    original = open(destino, "rb").read()
+
+    bruto = _ler_bruto(400)
+    repetido = _gravar_csv(pd.concat([bruto, bruto.iloc[[0]]], ignore_index=True), pasta / "repetido.csv")
+
+    assert atualizar_snapshot(repetido, destino, linhas_por_bloco=150) is None
+    assert open(destino, "rb").read() == original
+    assert not [nome for nome in os.listdir(pasta) if nome.endswith(".tmp")]
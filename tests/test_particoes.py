@@ -0,0 +1,144 @@
+"""Partições do snapshot (particoes.py): poda, estatísticas e regravação parcial."""
+import os
+
+import pandas as pd
+import pyarrow.feather as feather
+import pytest
+from pandas.testing import assert_frame_equal
+
+from carga import concatenar_particoes
+from incremental import atualizar_snapshot
+from particoes import (ARQUIVO_ESTATISTICAS, CHAVES, construir_particoes, garantir_particoes, ler_estatisticas,
+                       ler_particao, podar, valores_chave)
+from snapshot import CAMINHO_CSV, caminho_snapshot, gravando
+
+
+def _particao(curso, ano, semestre):
+    return {"matriz_estrutura_curso": curso, "ano_letivo_ini": ano, "periodo_letivo_ini": semestre}
+
+
+PARTICOES = [
+    _particao(32, 2013, 2), _particao(32, 2014, 1), _particao(32, 2020, 2),
+    _particao(40, 2020, 1), _particao(40, None, 1),
+]
+
+
+@pytest.mark.parametrize("argumentos, esperadas", [
+    ({}, [0, 1, 2, 3, 4]),
+    ({"ano_minimo": 2014}, [1, 2, 3]),                          # ano vazio não passa do piso
+    ({"selecao": {"ano_letivo_ini": [2020]}}, [2, 3]),
+    ({"selecao": {"ano_letivo_ini": [2020], "periodo_letivo_ini": ["2"]}}, [2]),
+    ({"selecao": {"ano_letivo_ini": [], "sexo": ["F"]}}, [0, 1, 2, 3, 4]),   # lista vazia e não-chave não podam
+    ({"ano_minimo": 2014, "matrizes": [40]}, [3]),
+    ({"selecao": {"ano_letivo_ini": [1999]}}, []),
+])
+def test_podar(argumentos, esperadas):
+    assert podar(PARTICOES, **argumentos) == [PARTICOES[i] for i in esperadas]
+
+
+def test_valores_chave():
+    estatisticas = {"particoes": PARTICOES}
+    assert valores_chave(estatisticas, "ano_letivo_ini") == [2013, 2014, 2020]
+    assert valores_chave(estatisticas, "ano_letivo_ini", ano_minimo=2014, matrizes=[32]) == [2014, 2020]
+
+
+# -------------------------------------------------------------------------
+# Gravação a partir de um export pequeno
+# -------------------------------------------------------------------------
+def _ler_bruto(linhas):
+    return pd.read_csv(CAMINHO_CSV, sep=";", encoding="latin", dtype=str, keep_default_na=False, nrows=linhas)
+
+
+def _gravar_csv(df, caminho):
+    df.to_csv(caminho, sep=";", encoding="latin", index=False)
+    # Garante o CSV mais novo que o snapshot mesmo em sistemas de arquivos com mtime grosseiro
+    if os.path.exists(caminho_snapshot(str(caminho))):
+        mtime = os.stat(caminho_snapshot(str(caminho))).st_mtime_ns + 10**9
+        os.utime(caminho, ns=(mtime, mtime))
+    return str(caminho)
+
+
+@pytest.fixture()
+def export(tmp_path):
+    bruto = _ler_bruto(400)
+    return bruto, _gravar_csv(bruto, tmp_path / "export.csv"), str(tmp_path / "export.particoes")
+
+
+def _por_chave(estatisticas):
+    return {tuple(p[col] for col in CHAVES): p for p in estatisticas["particoes"]}
+
+
+def test_estatisticas_ida_e_volta(export):
+    bruto, csv, pasta = export
+
+    estatisticas = construir_particoes(csv, pasta)
+
+    assert ler_estatisticas(pasta) == estatisticas
+    assert sum(p["linhas"] for p in estatisticas["particoes"]) == len(bruto)
+    assert not [nome for nome in os.listdir(pasta) if nome.endswith(".tmp")]
+    for particao in estatisticas["particoes"]:
+        parte = ler_particao(os.path.join(pasta, particao["arquivo"]))
+        assert len(parte) == particao["linhas"]
+        assert (parte["ano_letivo_ini"] == particao["ano_letivo_ini"]).all()
+        assert particao["minimos"]["ano_let_atual"] == parte["ano_let_atual"].min()
+        assert particao["maximos"]["dt_matricula"] == str(parte["dt_matricula"].max())
+    # Mesma origem: garantir_particoes não recorta de novo
+    assert garantir_particoes(csv, pasta) == ler_estatisticas(pasta)
+
+
+def test_ler_estatisticas_sem_arquivo_ou_corrompido(tmp_path):
+    assert ler_estatisticas(str(tmp_path)) is None
+    (tmp_path / ARQUIVO_ESTATISTICAS).write_text("{incompleto", encoding="utf-8")
+    assert ler_estatisticas(str(tmp_path)) is None
+
+
+def test_garantir_particoes_regrava_so_as_alteradas(export):
+    bruto, csv, pasta = export
+    antes = _por_chave(construir_particoes(csv, pasta))
+
+    novo = bruto.copy()
+    novo.loc[1, "Desc_Sit_Matricula"] = "Formado"
+    novo.loc[1, "Ultimo_Evento_Matricula"] = "Evento inédito: 01/02/2025"   # categoria nova
+    _gravar_csv(novo, csv)
+    atualizar_snapshot(csv)
+    depois = _por_chave(garantir_particoes(csv, pasta))
+
+    alterada = tuple(int(novo.loc[1, col]) for col in ["Matriz_Estrutura_Curso", "ano_letivo_ini", "Periodo_letivo_ini"])
+    regravadas = {chave for chave, p in depois.items() if p["arquivo"] != antes[chave]["arquivo"]}
+    assert regravadas == {alterada}
+    assert not os.path.exists(os.path.join(pasta, antes[alterada]["arquivo"]))
+    assert all(os.path.exists(os.path.join(pasta, p["arquivo"])) for p in depois.values())
+
+    # Gerações misturadas: a concatenação continua category e igual ao snapshot
+    partes = [ler_particao(os.path.join(pasta, p["arquivo"])) for p in depois.values()]
+    df = concatenar_particoes(partes)
+    assert isinstance(df["ultimo_evento_matricula"].dtype, pd.CategoricalDtype)
+    snapshot = feather.read_table(caminho_snapshot(csv)).to_pandas()
+    ordenar = lambda d: d.astype({col: object for col in d.select_dtypes("category")}) \
+        .sort_values("cod_matricula").reset_index(drop=True)
+    assert_frame_equal(ordenar(df), ordenar(snapshot))
+
+
+def test_construir_particoes_sem_reaproveitar_regrava_tudo(export):
+    _, csv, pasta = export
+    antes = construir_particoes(csv, pasta)
+    os.utime(caminho_snapshot(csv), ns=(1, 1))     # outra origem, mesmo conteúdo
+
+    assert construir_particoes(csv, pasta)["particoes"] == antes["particoes"]
+    depois = construir_particoes(csv, pasta, reaproveitar=False)
+    assert all(p["arquivo"].startswith(depois["geracao"]) for p in depois["particoes"])
+    assert set(os.listdir(pasta)) == {ARQUIVO_ESTATISTICAS, depois["geracao"]}
+
+
+def test_gravando_falha_mantem_o_destino(tmp_path):
+    destino = tmp_path / "arquivo.json"
+    destino.write_text("antigo")
+
+    with pytest.raises(RuntimeError):
+        with gravando(str(destino)) as temporario:
+            assert os.path.dirname(temporario) == str(tmp_path) and temporario != str(destino) + ".tmp"
+            open(temporario, "w").write("pela metade")
+            raise RuntimeError
+
+    assert destino.read_text() == "antigo"
+    assert os.listdir(tmp_path) == ["arquivo.json"]
@@ -0,0 +1,49 @@
+"""Tábua de vida com desfechos concorrentes (sobrevivencia.py) contra contas feitas à mão."""
+import numpy as np
+import pandas as pd
+from numpy.testing import assert_allclose
+
+from sobrevivencia import resumo, tabela_vida
+
+
+def _matriculas():
+    return pd.DataFrame({
+        "ano_letivo_ini": [2020, 2020, 2020, 2020, 2021, 2021, 2021, 2021],
+        "status": ["Egresso", "Sem êxito", "Matriculado", "Egresso",
+                   "Egresso", "Matriculado", "Matriculado", "Egresso"],
+        "tempo_permanencia_meses": [1.5, 2.2, 2.7, 3.1, 0.5, 4.0, 4.2, np.nan],
+    })
+
+
+def test_tabela_vida_kaplan_meier_e_aalen_johansen():
+    tabela = tabela_vida(_matriculas())
+    grupo = tabela[tabela["ano_letivo_ini"] == 2020]
+
+    # 4 alunos; sai um Egresso no mês 1, um Sem êxito no mês 2 (com 3 em
+    # risco, o Matriculado é censurado no mesmo período) e o último Egresso no 3
+    assert grupo["meses"].tolist() == [0, 1, 2, 3]
+    assert grupo["em_risco"].tolist() == [4, 4, 3, 1]
+    assert grupo["censurados"].tolist() == [0, 0, 1, 0]
+    assert_allclose(grupo["sobrevivencia"], [1, 0.75, 0.5, 0])
+    assert_allclose(grupo["incidencia_egresso"], [0, 0.25, 0.25, 0.75])
+    assert_allclose(grupo["incidencia_sem_exito"], [0, 0, 0.25, 0.25])
+    # Sem censura no fim, sobrevivência e incidências somam 1
+    assert_allclose(grupo[["sobrevivencia", "incidencia_egresso", "incidencia_sem_exito"]].sum(axis=1), 1)
+
+
+def test_tabela_vida_ignora_tempo_ausente():
+    grupo = tabela_vida(_matriculas()).query("ano_letivo_ini == 2021")
+
+    assert grupo["em_risco"].iloc[0] == 3          # a linha sem tempo fica de fora
+    assert grupo["egressos"].sum() == 1
+    assert grupo["meses"].tolist() == [0, 1, 2, 3, 4]
+    assert_allclose(grupo["sobrevivencia"], 2 / 3)
+
+
+def test_resumo_mediana():
+    res = resumo(tabela_vida(_matriculas())).set_index("ano_letivo_ini")
+
+    assert res.loc[2020, "mediana_meses"] == 2
+    assert res.loc[2020, ["alunos", "egressos", "sem_exito", "censurados"]].tolist() == [4, 2, 1, 1]
+    # Mais da metade de 2021 segue sem desfecho: mediana indeterminada
+    assert pd.isna(res.loc[2021, "mediana_meses"])
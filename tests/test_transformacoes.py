@@ -0,0 +1,108 @@
+"""Paridade das derivações vetorizadas com as lambdas por linha originais
+da segunda_analise.py, no CSV do repositório (a partir de 2014, como a página).
+
+Diferenças esperadas, ambas de datas (datas.py):
+- dt_matricula: 59 valores com hora ("02/08/2017 12:53:00") viravam NaT
+  e agora são lidos, o que também preenche o tempo de permanência;
+- dt_nascimento: era lida sem dayfirst (mês/dia trocados ou NaT quando o
+  dia passava de 12); agora é dd/mm/aaaa, e a idade acompanha.
+"""
+import pandas as pd
+import pytest
+from pandas.testing import assert_series_equal
+
+from snapshot import CAMINHO_CSV, ler_csv
+from transformacoes import calcular_idade, derivar_colunas, snake_case
+
+ANO_INICIAL = 2014
+HOJE = pd.Timestamp("2026-01-01")
+DATAS_COM_HORA = 59
+
+
+def derivar_com_lambdas(df):
+    """Derivações como estavam em segunda_analise.py, uma chamada Python por linha."""
+    df["cidade"] = df["texto_cidade"].apply(lambda x: x[:-5] if isinstance(x, str) and len(x) > 5 else x)
+    df["status"] = df["desc_sit_matricula"].apply(
+        lambda x: 'Matriculado' if x in ['Matriculado', 'Concludente', 'Estagiario (Concludente)', 'Trancado']
+        else 'Egresso' if x == 'Formado'
+        else 'Sem êxito'
+    )
+    df["desc_cor"] = df["desc_cor"].apply(
+        lambda x: 'SI' if x in ['Não dispõe da informação', 'Não quis declarar cor/raça']
+        else x
+    )
+    df["grupo"] = df["desc_cor"].apply(
+        lambda x: 'PPI' if x in ['Preta', 'Parda', 'Indígena']
+        else 'Branca e amarela' if x in['Branca', 'Amarela']
+        else 'Sem informação'
+    )
+    df["dt_ultimo_evento"] = df["ultimo_evento_matricula"].apply(lambda x: x.split(":")[1] if isinstance(x, str) else x)
+    df["ultimo_evento_matricula"] = df["ultimo_evento_matricula"].apply(lambda x: x.split(":")[0] if isinstance(x, str) else x)
+    df['dt_ultimo_evento'] = pd.to_datetime(df['dt_ultimo_evento'], dayfirst=True, errors='coerce')
+    df['dt_matricula'] = pd.to_datetime(df['dt_matricula'], dayfirst=True, errors='coerce')
+    df["tempo_permanencia"] = (df["dt_ultimo_evento"] - df["dt_matricula"]).dt.days / 365.25
+    df['tempo_permanencia_meses'] = (df['dt_ultimo_evento'] - df['dt_matricula']).dt.days / 30.44
+    df['dt_nascimento'] = pd.to_datetime(df['dt_nascimento'], errors='coerce')
+    df['idade'] = (HOJE - df['dt_nascimento']).dt.days // 365
+    return df
+
+
+def _ler_bruto(**kwargs):
+    df = pd.read_csv(CAMINHO_CSV, sep=';', encoding='latin', **kwargs)
+    df.columns = [snake_case(col) for col in df.columns]
+    return df
+
+
+@pytest.fixture(scope="module")
+def frames():
+    antigo = _ler_bruto()
+    antigo = derivar_com_lambdas(antigo[antigo["ano_letivo_ini"] >= ANO_INICIAL].copy())
+
+    novo = ler_csv()
+    novo = calcular_idade(derivar_colunas(novo[novo["ano_letivo_ini"] >= ANO_INICIAL].copy()), HOJE)
+
+    texto = _ler_bruto(dtype=str)
+    texto = texto.loc[antigo.index]
+    return antigo, novo, texto
+
+
+def _comparar(antigo, novo, coluna):
+    assert_series_equal(novo[coluna], antigo[coluna], check_dtype=False, check_names=False)
+
+
+@pytest.mark.parametrize("coluna", [
+    "cidade", "status", "desc_cor", "grupo", "ultimo_evento_matricula", "dt_ultimo_evento",
+])
+def test_colunas_identicas(frames, coluna):
+    antigo, novo, _ = frames
+    assert list(novo.index) == list(antigo.index)
+    _comparar(antigo, novo, coluna)
+
+
+def test_dt_matricula_com_hora_passa_a_ser_lida(frames):
+    antigo, novo, texto = frames
+    com_hora = texto["dt_matricula"].str.contains(":", na=False)
+
+    assert com_hora.sum() == DATAS_COM_HORA
+    assert antigo.loc[com_hora, "dt_matricula"].isna().all()
+    esperado = pd.to_datetime(texto.loc[com_hora, "dt_matricula"], format="%d/%m/%Y %H:%M:%S")
+    assert_series_equal(novo.loc[com_hora, "dt_matricula"], esperado, check_names=False, check_dtype=False)
+
+    # Fora dessas linhas, data e tempo de permanência são os mesmos de antes
+    for coluna in ["dt_matricula", "tempo_permanencia", "tempo_permanencia_meses"]:
+        _comparar(antigo[~com_hora], novo[~com_hora], coluna)
+    assert novo.loc[com_hora, "tempo_permanencia"].notna().all()
+
+
+def test_dt_nascimento_dia_primeiro(frames):
+    antigo, novo, texto = frames
+    esperado = pd.to_datetime(texto["dt_nascimento"], format="%d/%m/%Y")
+    assert_series_equal(novo["dt_nascimento"], esperado, check_names=False, check_dtype=False)
+
+    # A leitura antiga trocava dia e mês; o que ela conseguia ler bate com a troca
+    lidas = antigo["dt_nascimento"].notna()
+    trocadas = pd.to_datetime(texto.loc[lidas, "dt_nascimento"], format="%m/%d/%Y")
+    assert_series_equal(antigo.loc[lidas, "dt_nascimento"], trocadas, check_names=False, check_dtype=False)
+
+    # A idade é a mesma conta de antes, sobre a data corrigida
+    _comparar(pd.DataFrame({"idade": (HOJE - esperado).dt.days // 365}), novo, "idade")